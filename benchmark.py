@@ -0,0 +1,271 @@
+"""
+凯迪仕DMS系统 - 端到端压测脚本
+功能：在本地模拟服务（mock_dms_server.py）上运行 KaadasAutomation，
+      统计每个步骤的 p50/p95 耗时和端到端吞吐量（次/分钟），并与基线对比发现性能回退
+"""
+
+from collections import defaultdict
+import argparse
+import importlib.util
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+from mock_dms_server import MockDmsServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+
+# 步骤耗时回退判定时允许的绝对误差（秒），避免毫秒级抖动被判为回退
+ABSOLUTE_SLACK = 0.05
+
+
+def load_automation_module():
+    """加载 create_pwd_repeat-optimize.py（文件名含连字符，不能直接 import）"""
+    path = os.path.join(BASE_DIR, "create_pwd_repeat-optimize.py")
+    spec = importlib.util.spec_from_file_location("kaadas_automation", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, pct):
+    """最近秩法百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StepTimer:
+    """给 KaadasAutomation 实例的步骤方法计时"""
+
+    # 方法名 -> 报告中的步骤名
+    STEPS = {
+        'login': "login",
+        'wait_for_page_load': "page_load",
+        'click_authorization_tab': "tab_click",
+        'click_add_authorization_button': "add_button",
+        'select_installer': "select_installer",
+        'fast_fill_form': "fast_fill",
+        'click_confirm_button': "confirm",
+        'perform_authorization_operation': "operation",
+    }
+
+    def __init__(self, bot):
+        self.samples = defaultdict(list)
+        for method_name, step in self.STEPS.items():
+            self._wrap(bot, method_name, lambda *args, step=step, **kwargs: step)
+        # 每个下拉框按标签分别统计
+        self._wrap(bot, 'select_dropdown_by_label',
+                   lambda label_text, *args, **kwargs: f"dropdown:{label_text}")
+
+    def _wrap(self, bot, method_name, step_name):
+        original = getattr(bot, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.samples[step_name(*args, **kwargs)].append(time.perf_counter() - start)
+
+        setattr(bot, method_name, timed)
+
+    def summary(self):
+        """各步骤的次数、p50、p95（秒）"""
+        return {
+            step: {
+                'count': len(values),
+                'p50': round(percentile(values, 50), 4),
+                'p95': round(percentile(values, 95), 4),
+            }
+            for step, values in sorted(self.samples.items())
+        }
+
+
+def run_benchmark(ops=20, devices=5, latency_ms=50, installers=2000, headless=True, command_budget=None,
+                  lean=False):
+    """
+    启动模拟服务并执行压测
+    :param ops: 授权操作次数
+    :param devices: 轮流使用的设备数量
+    :param latency_ms: 模拟服务接口延迟（毫秒）
+    :param installers: 安装师傅列表长度
+    :param command_budget: 每次授权允许的最大 WebDriver 往返次数，None 表示不限制
+    :param lean: 使用性能浏览器配置
+    :return: 压测报告字典
+    """
+    automation = load_automation_module()
+    server = MockDmsServer(latency_ms=latency_ms, installer_count=installers, captcha_mode="any").start()
+    print(f"✅ 模拟服务已启动: {server.base_url}")
+
+    # 缓存与登录态放在临时目录，保证每次压测从冷启动开始、互不影响
+    work_dir = tempfile.mkdtemp(prefix="kaadas_bench_")
+    bot = automation.KaadasAutomation(
+        headless=headless,
+        base_url=server.base_url,
+        session_file=os.path.join(work_dir, "session.json"),
+        locator_cache_file=os.path.join(work_dir, "locator_cache.json"),
+        lean=lean,
+        # 模拟服务实现了默认的新增授权接口路径，压测时按接口响应判定
+        capture_responses=True,
+    )
+    bot.captcha_stats = automation.CaptchaStats(os.path.join(work_dir, "captcha_stats.jsonl"))
+    timer = StepTimer(bot)
+
+    try:
+        bot.setup_driver()
+        if not bot.ensure_logged_in(server.state.username, server.state.password):
+            raise RuntimeError("模拟服务登录失败")
+
+        reported_success = 0
+        start_time = time.perf_counter()
+        for i in range(ops):
+            if bot.authorize_device(f"BENCH{i % devices:06d}"):
+                reported_success += 1
+        elapsed = time.perf_counter() - start_time
+        browser = bot.browser_stats()
+
+    finally:
+        bot.close()
+        server.stop()
+
+    created = server.state.stats['authorizations']
+    op_commands = [record['commands'] for record in bot.metrics.spans
+                   if record['name'] == "perform_authorization_operation"]
+    budget_violations = len(bot.tracer.budget_violations(command_budget)) if command_budget else 0
+    return {
+        'config': {'ops': ops, 'devices': devices, 'latency_ms': latency_ms,
+                   'installers': installers, 'headless': headless, 'lean': lean},
+        'steps': timer.summary(),
+        'ops': ops,
+        'reported_success': reported_success,
+        'server_created': created,
+        'elapsed': round(elapsed, 2),
+        'ops_per_min': round(created / elapsed * 60, 2) if elapsed else 0,
+        'commands_per_op': {
+            'p50': percentile(op_commands, 50),
+            'p95': percentile(op_commands, 95),
+            'max': max(op_commands) if op_commands else None,
+        },
+        'browser': browser,
+        'command_budget': command_budget,
+        'budget_violations': budget_violations,
+        'top_offenders': [
+            {'step': step, 'call_site': call_site, 'command': command, 'count': count, 'seconds': round(elapsed, 3)}
+            for step, call_site, command, count, elapsed in bot.tracer.top_offenders(limit=10)
+        ],
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    与基线对比
+    :param tolerance: 允许的相对退化比例（例如 0.25 表示 25%）
+    :return: 回退描述列表，空列表表示没有回退
+    """
+    regressions = []
+    for step, stats in baseline.get('steps', {}).items():
+        current = report['steps'].get(step)
+        if not current:
+            regressions.append(f"{step}: 本次压测缺少该步骤")
+            continue
+        limit = stats['p95'] * (1 + tolerance) + ABSOLUTE_SLACK
+        if current['p95'] > limit:
+            regressions.append(f"{step}: p95 {current['p95']:.3f}s > 基线 {stats['p95']:.3f}s (上限 {limit:.3f}s)")
+
+    baseline_commands = (baseline.get('commands_per_op') or {}).get('p95')
+    current_commands = (report.get('commands_per_op') or {}).get('p95')
+    if baseline_commands and current_commands and current_commands > baseline_commands * (1 + tolerance):
+        regressions.append(f"WebDriver 往返: 每次授权 p95 {current_commands} 次 > 基线 {baseline_commands} 次")
+
+    baseline_rate = baseline.get('ops_per_min')
+    if baseline_rate and report['ops_per_min'] < baseline_rate * (1 - tolerance):
+        regressions.append(f"吞吐量: {report['ops_per_min']:.1f} 次/分钟 < 基线 {baseline_rate:.1f} 次/分钟")
+    return regressions
+
+
+def print_report(report):
+    """打印压测报告"""
+    print(f"\n{'=' * 60}")
+    print("📊 压测报告")
+    print(f"{'=' * 60}")
+    print(f"   {'步骤':<28}{'次数':>6}{'p50(秒)':>10}{'p95(秒)':>10}")
+    for step, stats in report['steps'].items():
+        print(f"   {step:<28}{stats['count']:>6}{stats['p50']:>10.3f}{stats['p95']:>10.3f}")
+    print(f"\n   授权次数: {report['ops']}  脚本判定成功: {report['reported_success']}  "
+          f"服务端实际创建: {report['server_created']}")
+    print(f"   总耗时: {report['elapsed']:.1f}秒")
+    print(f"   吞吐量: {report['ops_per_min']:.1f} 次/分钟")
+    commands = report['commands_per_op']
+    print(f"   每次授权 WebDriver 往返: p50 {commands['p50']}  p95 {commands['p95']}  最多 {commands['max']}")
+    browser = report['browser']
+    rss = f"{browser['rss_mb']}MB" if browser['rss_mb'] is not None else "未知（需要 psutil）"
+    print(f"   页面就绪: p50 {browser['page_ready_p50'] or 0:.3f}秒  p95 {browser['page_ready_p95'] or 0:.3f}秒  "
+          f"DOMContentLoaded {browser['dom_content_loaded_ms']}ms")
+    print(f"   浏览器内存: JS堆 {browser['js_heap_mb']}MB  DOM节点 {browser['dom_nodes']}  进程常驻内存 {rss}")
+    if report['command_budget']:
+        print(f"   往返预算 {report['command_budget']}: 超出 {report['budget_violations']} 次")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="凯迪仕DMS系统 - 端到端压测")
+    parser.add_argument("--ops", type=int, default=20, help="授权操作次数")
+    parser.add_argument("--devices", type=int, default=5, help="轮流使用的设备数量")
+    parser.add_argument("--latency-ms", type=int, default=50, help="模拟服务接口延迟（毫秒）")
+    parser.add_argument("--installers", type=int, default=2000, help="安装师傅列表长度")
+    parser.add_argument("--headed", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--lean", action="store_true", help="使用性能浏览器配置（与不加该参数的结果对比）")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的相对退化比例")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--output", help="压测报告输出文件（JSON）")
+    parser.add_argument("--max-commands-per-op", type=int,
+                        help="每次授权允许的最大 WebDriver 往返次数，超出时压测失败")
+    args = parser.parse_args()
+
+    report = run_benchmark(ops=args.ops, devices=args.devices, latency_ms=args.latency_ms,
+                           installers=args.installers, headless=not args.headed,
+                           command_budget=args.max_commands_per_op, lean=args.lean)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"   报告已保存: {args.output}")
+
+    if report['budget_violations']:
+        print(f"\n❌ {report['budget_violations']} 次授权超出往返预算 {report['command_budget']}")
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ 未找到基线文件 {args.baseline}，使用 --update-baseline 生成")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 项性能回退:")
+        for item in regressions:
+            print(f"   - {item}")
+        return 1
+
+    print("\n✅ 与基线相比没有性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
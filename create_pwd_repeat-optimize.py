@@ -9,83 +9,2375 @@
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
 import ddddocr
+import urllib3
+import argparse
 import base64
+import csv
+import functools
+import ipaddress
+import json
+import multiprocessing
+import os
+import queue
+import subprocess
+import sys
 import time
 import re
+import socket
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，缓存文件仅依赖原子替换
+    fcntl = None
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，仅用于统计浏览器进程内存
+    psutil = None
+
+# 运行时数据文件默认与脚本放在同一目录
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# DMS 地址（可通过环境变量指向本地模拟服务，工作进程会继承该变量）
+DMS_BASE_URL = os.environ.get("DMS_BASE_URL", "https://dms.kaadas.com").rstrip('/')
+DOOR_LOCK_DETAIL_PATH = "/#/deviceList/detail/doorLockDetail/{device_sn}"
+DEFAULT_DEVICE_SN = "W5575A2401230AA1011195"
+
+# 验证码识别配置：字符集与长度需与 DMS 验证码保持一致
+CAPTCHA_CONFIG = {
+    'charset': "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ",
+    'length': 4,
+    'min_confidence': 0.6,
+    # 识别不可信时直接刷新验证码重新识别的最大次数（不计入登录尝试次数）
+    'max_refreshes': 5,
+}
+
+# 新增授权的默认参数（界面操作与接口模式共用）
+AUTH_DEFAULTS = {
+    'auth_type': "密码",
+    'role': "安装师傅",
+    'installer': "尹传清(18566227407)",
+    'duration': "一个月",
+}
+
+# 接口模式配置：接口路径、字段名和选项取值需与 DMS 前端实际发出的请求保持一致（以抓包结果为准）
+DMS_API_CONFIG = {
+    'base_url': DMS_BASE_URL,
+    'create_path': os.environ.get("DMS_CREATE_PATH", "/api/device/authorization/add"),
+    # 新增授权接口路径是否已按抓包结果确认（设置环境变量 DMS_CREATE_PATH 即视为已确认）；
+    # 未确认时界面操作不捕获接口响应，只按界面信号判定结果，避免路径不对时每次白等响应
+    'create_path_confirmed': bool(os.environ.get("DMS_CREATE_PATH")),
+    # token 在 localStorage / sessionStorage 中可能使用的键名
+    'token_keys': ["token", "Authorization", "accessToken", "access_token", "Admin-Token"],
+    'token_header': "Authorization",
+    'token_prefix': "",
+    # 表单项 -> 请求字段名
+    'fields': {
+        'device_sn': "deviceSn",
+        'auth_type': "authType",
+        'role': "roleType",
+        'installer': "installerPhone",
+        'duration': "duration",
+    },
+    # 界面选项文本 -> 接口取值；未配置的选项原样提交（安装师傅默认提交括号中的手机号）
+    'value_map': {
+        'auth_type': {"密码": 1},
+        'role': {"安装师傅": 2},
+        'duration': {"一个月": 1},
+    },
+    'success_codes': [0, 200],
+    # 表示 token 失效的 HTTP 状态码 / 业务码（接口模式据此改用浏览器重新登录）
+    'auth_failed_codes': [401],
+}
+
+
+# 性能浏览器配置（--lean）
+LEAN_PROFILE = {
+    # 通过 CDP Network.setBlockedURLs 屏蔽的地址模式；
+    # 验证码是 data URI 图片，不经过网络请求，不受影响
+    'blocked_urls': [
+        "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+        "*.mp4", "*.mp3", "*.webm",
+        "*google-analytics.com*", "*googletagmanager.com*", "*hm.baidu.com*", "*cnzz.com*",
+    ],
+    # 精简渲染进程和后台功能
+    'chrome_args': [
+        "--disable-extensions",
+        "--disable-background-networking",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--no-first-run",
+        "--mute-audio",
+        "--disable-features=Translate,OptimizationHints,MediaRouter,AutofillServerCommunication",
+        "--window-size=1280,800",
+    ],
+}
+
+
+# 浏览器回收阈值：长时间运行时 SPA 的 JS 堆和渲染进程内存持续增长、操作变慢，超过阈值即重启浏览器
+BROWSER_RECYCLE = {
+    'max_heap_mb': 512,            # 页面 JS 堆
+    'max_renderer_rss_mb': 1536,   # 渲染进程常驻内存合计（需要 psutil）
+    'latency_window': 10,          # 耗时对比窗口：重启后前 N 次操作作为基准，与最近 N 次比较
+    'latency_factor': 1.8,         # 最近耗时中位数超过基准的倍数
+    'max_operations': 2000,        # 单个浏览器实例最多执行的操作数
+    'check_every': 5,              # 每隔多少次操作采样一次内存
+}
 
 
 class CaptchaOCR:
     """验证码识别类"""
 
-    def __init__(self):
+    def __init__(self, charset=None, length=None, min_confidence=0.0):
+        """
+        :param charset: 验证码字符集，指定后识别结果限定在该字符集内
+        :param length: 验证码长度，识别结果长度不符时拒绝
+        :param min_confidence: 最低置信度（逐字符概率的最小值），低于该值时拒绝
+        """
         self.ocr = ddddocr.DdddOcr(show_ad=False)
+        self.charset = charset
+        self.length = length
+        self.min_confidence = min_confidence
+
+        # 较新版本的 ddddocr 支持限定字符集并返回逐字符概率
+        self.ranges_enabled = False
+        if charset:
+            try:
+                self.ocr.set_ranges(charset)
+                self.ranges_enabled = True
+            except Exception as e:
+                print(f"⚠️ 当前 ddddocr 不支持限定字符集，改为识别后过滤: {e}")
         print("✅ OCR识别器初始化完成")
 
-    def recognize_base64(self, base64_str):
-        """识别Base64编码的验证码"""
+    def solve_base64(self, base64_str):
+        """
+        识别Base64编码的验证码并校验字符集、长度和置信度
+        :return: (验证码, 置信度)；不可信时验证码为 None，置信度不可用时为 None
+        """
         try:
             if ',' in base64_str:
                 base64_str = base64_str.split(',')[1]
-
             image_bytes = base64.b64decode(base64_str)
-            result = self.ocr.classification(image_bytes)
 
-            print(f"✅ 验证码识别结果: {result}")
-            return result
+            confidence = None
+            if self.ranges_enabled:
+                result = self.ocr.classification(image_bytes, probability=True)
+                code, confidence = self.decode_probability(result['probability'], result['charsets'])
+            else:
+                code = self.ocr.classification(image_bytes) or ''
+                if self.charset:
+                    code = ''.join(c for c in code if c in self.charset)
+
+            print(f"✅ 验证码识别结果: {code} (置信度: {confidence if confidence is None else round(confidence, 3)})")
+
+            if self.length and len(code) != self.length:
+                print(f"   ⚠️ 长度不符（期望{self.length}位），放弃本次识别")
+                return None, confidence
+            if confidence is not None and confidence < self.min_confidence:
+                print(f"   ⚠️ 置信度低于 {self.min_confidence}，放弃本次识别")
+                return None, confidence
+            return code, confidence
 
         except Exception as e:
             print(f"❌ 验证码识别失败: {str(e)}")
+            return None, None
+
+    @staticmethod
+    def decode_probability(probability, charsets):
+        """
+        CTC 贪心解码：逐帧取概率最大的字符，连续重复的帧合并为一个字符，再去掉空白占位
+        （与 ddddocr 自身的解码一致）
+        :param probability: 逐帧概率矩阵（classification(probability=True) 返回的 probability）
+        :param charsets: 字符表，下标与概率矩阵的列对应，空字符串为空白占位
+        :return: (验证码, 置信度)；置信度为保留字符概率的最小值
+        """
+        chars = []
+        confidence = 1.0
+        last = None
+        for row in probability:
+            best = max(range(len(row)), key=row.__getitem__)
+            if best == last:  # 同一字符跨多帧
+                continue
+            last = best
+            char = charsets[best]
+            if not char:  # 空白占位
+                continue
+            chars.append(char)
+            confidence = min(confidence, row[best])
+        return ''.join(chars), confidence
+
+
+class CaptchaStats:
+    """
+    验证码识别统计
+    每次识别/提交记录一行 JSON，用于长期观察首次识别成功率和每次登录的尝试次数
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: 统计文件路径，默认为脚本目录下的 captcha_stats.jsonl
+        """
+        self.path = path or os.path.join(BASE_DIR, "captcha_stats.jsonl")
+
+    def record(self, code, confidence, outcome):
+        """
+        记录一次识别结果
+        :param outcome: rejected（识别不可信，直接刷新）/ accepted（登录成功）/ server_rejected（提交后被拒）
+        """
+        entry = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'code': code,
+            'confidence': confidence,
+            'outcome': outcome,
+        }
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"⚠️ 验证码统计写入失败: {e}")
+
+    def summary(self):
+        """汇总统计：识别次数、提交次数、登录成功次数、每次登录平均提交次数"""
+        counts = {'rejected': 0, 'accepted': 0, 'server_rejected': 0}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        outcome = json.loads(line).get('outcome')
+                    except ValueError:
+                        continue
+                    if outcome in counts:
+                        counts[outcome] += 1
+        except OSError:
+            pass
+
+        submitted = counts['accepted'] + counts['server_rejected']
+        return {
+            'recognitions': submitted + counts['rejected'],
+            'submitted': submitted,
+            'logins': counts['accepted'],
+            'submit_accuracy': counts['accepted'] / submitted if submitted else None,
+            'attempts_per_login': submitted / counts['accepted'] if counts['accepted'] else None,
+        }
+
+
+class Instrumentation:
+    """
+    步骤耗时埋点
+    以嵌套 span 记录各步骤的耗时、期间发出的 WebDriver 命令数和重试次数，
+    每次运行导出一份 JSON Lines 明细和一份 Prometheus 文本指标
+    """
+
+    # Prometheus 直方图分桶（秒）
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+    def __init__(self, run_id=None, output_dir=None):
+        """
+        :param run_id: 运行标识，默认为时间戳 + 进程号
+        :param output_dir: 指标输出目录，默认为脚本目录下的 metrics/
+        """
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.output_dir = output_dir or os.path.join(BASE_DIR, "metrics")
+        self.stack = []
+        self.spans = []
+
+    def count_command(self):
+        """记一条 WebDriver 命令（嵌套 span 逐层累计），由 CommandTracer 调用"""
+        for record in self.stack:
+            record['commands'] += 1
+
+    def current_step(self):
+        """当前（最内层）span 名称"""
+        return self.stack[-1]['name'] if self.stack else "-"
+
+    @contextmanager
+    def span(self, name):
+        """记录一个步骤 span"""
+        record = {
+            'run_id': self.run_id,
+            'name': name,
+            'parent': self.stack[-1]['name'] if self.stack else None,
+            'depth': len(self.stack),
+            'start': time.time(),
+            'duration': 0.0,
+            'commands': 0,
+            'retries': 0,
+            'ok': True,
+            'error': None,
+        }
+        self.stack.append(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['ok'] = False
+            record['error'] = str(e)
+            raise
+        finally:
+            record['duration'] = round(time.perf_counter() - started, 4)
+            self.stack.remove(record)
+            self.spans.append(record)
+
+    def retry(self, count=1):
+        """给当前（最内层）span 记一次重试"""
+        if self.stack:
+            self.stack[-1]['retries'] += count
+
+    def export(self):
+        """导出本次运行的 JSON Lines 明细与 Prometheus 文本指标，返回两个文件路径"""
+        if not self.spans:
+            return None, None
+        os.makedirs(self.output_dir, exist_ok=True)
+        jsonl_path = os.path.join(self.output_dir, f"{self.run_id}.jsonl")
+        prom_path = os.path.join(self.output_dir, f"{self.run_id}.prom")
+
+        with open(jsonl_path, 'w', encoding='utf-8') as f:
+            for record in self.spans:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+        print(f"📈 步骤指标已导出: {jsonl_path}, {prom_path}")
+        return jsonl_path, prom_path
+
+    def to_prometheus(self):
+        """按步骤名聚合为 Prometheus 文本格式"""
+        steps = {}
+        for record in self.spans:
+            step = steps.setdefault(record['name'], {'durations': [], 'commands': 0, 'retries': 0, 'errors': 0})
+            step['durations'].append(record['duration'])
+            step['commands'] += record['commands']
+            step['retries'] += record['retries']
+            step['errors'] += 0 if record['ok'] else 1
+
+        def label(name):
+            return 'step="%s",run_id="%s"' % (name.replace('\\', '\\\\').replace('"', '\\"'), self.run_id)
+
+        lines = [
+            "# HELP kaadas_step_duration_seconds 自动化步骤耗时",
+            "# TYPE kaadas_step_duration_seconds histogram",
+        ]
+        for name, step in steps.items():
+            for bucket in self.BUCKETS:
+                count = sum(1 for d in step['durations'] if d <= bucket)
+                lines.append(f'kaadas_step_duration_seconds_bucket{{{label(name)},le="{bucket}"}} {count}')
+            lines.append(f'kaadas_step_duration_seconds_bucket{{{label(name)},le="+Inf"}} {len(step["durations"])}')
+            lines.append(f'kaadas_step_duration_seconds_sum{{{label(name)}}} {sum(step["durations"]):.4f}')
+            lines.append(f'kaadas_step_duration_seconds_count{{{label(name)}}} {len(step["durations"])}')
+
+        for metric, key, help_text in (
+                ("kaadas_step_webdriver_commands_total", 'commands', "步骤内发出的 WebDriver 命令数"),
+                ("kaadas_step_retries_total", 'retries', "步骤内的重试次数"),
+                ("kaadas_step_errors_total", 'errors', "步骤失败次数")):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, step in steps.items():
+                lines.append(f"{metric}{{{label(name)}}} {step[key]}")
+
+        return "\n".join(lines) + "\n"
+
+
+class CommandTracer:
+    """
+    WebDriver 命令追踪
+    包装 driver.execute，按调用位置统计每条命令的次数和耗时并归属到当前步骤，
+    用于找出往返次数最多的代码位置，以及在压测中限制每次授权的往返预算
+    """
+
+    def __init__(self, metrics):
+        """
+        :param metrics: Instrumentation 实例（提供当前步骤并累计 span 命令数）
+        """
+        self.metrics = metrics
+        # (步骤, 调用位置, 命令) -> [次数, 累计耗时]
+        self.calls = defaultdict(lambda: [0, 0.0])
+
+    def attach(self, driver):
+        """包装 driver.execute（WebElement 的命令同样经过这里）"""
+        original_execute = driver.execute
+
+        def execute(driver_command, params=None):
+            step = self.metrics.current_step()
+            call_site = self._call_site()
+            self.metrics.count_command()
+            started = time.perf_counter()
+            try:
+                return original_execute(driver_command, params)
+            finally:
+                entry = self.calls[(step, call_site, driver_command)]
+                entry[0] += 1
+                entry[1] += time.perf_counter() - started
+
+        driver.execute = execute
+
+    @staticmethod
+    def _call_site():
+        """本脚本中发出该命令的代码位置（跳过 selenium 内部帧）"""
+        frame = sys._getframe(2)
+        while frame is not None and frame.f_code.co_filename != __file__:
+            frame = frame.f_back
+        if frame is None:
+            return "?"
+        return f"{frame.f_code.co_name}:{frame.f_lineno}"
+
+    def top_offenders(self, step=None, limit=10):
+        """
+        往返次数最多的调用位置
+        :param step: 只看指定步骤，None 表示全部
+        :return: [(步骤, 调用位置, 命令, 次数, 累计耗时), ...]
+        """
+        rows = [(key[0], key[1], key[2], count, elapsed)
+                for key, (count, elapsed) in self.calls.items()
+                if step is None or key[0] == step]
+        rows.sort(key=lambda row: (row[3], row[4]), reverse=True)
+        return rows[:limit]
+
+    def report(self, per_step=3):
+        """打印每个步骤往返最多的调用位置"""
+        if not self.calls:
+            return
+        totals = defaultdict(lambda: [0, 0.0])
+        for (step, _, _), (count, elapsed) in self.calls.items():
+            totals[step][0] += count
+            totals[step][1] += elapsed
+
+        print(f"\n{'=' * 60}")
+        print("🔬 WebDriver 往返统计（按步骤）")
+        print(f"{'=' * 60}")
+        for step, (count, elapsed) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+            print(f"   {step}: {count} 次, {elapsed:.2f}秒")
+            for _, call_site, command, calls, calls_elapsed in self.top_offenders(step, per_step):
+                print(f"      {calls:>5} 次 {calls_elapsed:>7.2f}秒  {call_site}  {command}")
+
+    def budget_violations(self, budget, span_name="perform_authorization_operation"):
+        """
+        检查每次授权的往返预算
+        :param budget: 单个 span 允许的最大 WebDriver 命令数
+        :return: 超出预算的 span 列表
+        """
+        return [record for record in self.metrics.spans
+                if record['name'] == span_name and record['commands'] > budget]
+
+
+def returned_false(result):
+    """步骤以返回 False 表示失败"""
+    return result is False
+
+
+def returned_none(result):
+    """步骤以返回 None 表示失败"""
+    return result is None
+
+
+def timed_step(name, failure=None):
+    """
+    方法装饰器：在 self.metrics 的 span 中执行步骤
+    :param name: span 名称；也可以是接收方法参数、返回名称的函数
+    :param failure: 接收返回值、判断步骤是否失败的函数；None 表示只有抛出异常才记为失败
+                    （返回 False 不一定是失败，例如 open_target_page 返回 False 表示已登录）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            span_name = name(*args, **kwargs) if callable(name) else name
+            with self.metrics.span(span_name) as record:
+                result = func(self, *args, **kwargs)
+                if failure is not None and failure(result):
+                    record['ok'] = False
+                return result
+        return wrapper
+    return decorator
+
+
+class WaitEngine:
+    """
+    事件驱动等待引擎
+    以页面真实状态（下拉框、对话框、加载遮罩、URL）为条件轮询，
+    条件成立立即返回，每个等待都有可配置的超时上限
+    """
+
+    # 元素可见性判断（所有条件脚本共用）
+    JS_HELPERS = """
+    function isVisible(el) {
+        if (!el) return false;
+        var style = window.getComputedStyle(el);
+        if (style.display === 'none' || style.visibility === 'hidden') return false;
+        return !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    }
+    function inTransition(el) {
+        return /-enter-active|-leave-active/.test(el.className || '');
+    }
+    function visibleNodes(selector) {
+        var nodes = document.querySelectorAll(selector), result = [];
+        for (var i = 0; i < nodes.length; i++) {
+            if (isVisible(nodes[i])) result.push(nodes[i]);
+        }
+        return result;
+    }
+    """
+
+    def __init__(self, driver, timeout=10, poll_frequency=0.05):
+        """
+        :param driver: WebDriver实例
+        :param timeout: 默认超时上限（秒）
+        :param poll_frequency: 轮询间隔（秒）
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+
+    def until(self, condition, timeout=None):
+        """
+        等待条件成立
+        :param condition: 接收driver的可调用对象，返回真值即视为成立
+        :param timeout: 超时上限，None 使用默认值
+        :return: 条件的返回值；超时返回 False
+        """
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            return False
+
+    def until_js(self, script, *args, timeout=None):
+        """等待一段JS条件脚本返回真值（脚本可直接使用 JS_HELPERS 中的函数）"""
+        full_script = self.JS_HELPERS + script
+        return self.until(lambda d: d.execute_script(full_script, *args), timeout)
+
+    def page_ready(self, timeout=None):
+        """等待 document.readyState 为 complete"""
+        return self.until_js("return document.readyState === 'complete';", timeout=timeout)
+
+    def loading_done(self, timeout=None):
+        """等待 el-loading-mask 全部消失"""
+        return self.until_js("return visibleNodes('.el-loading-mask').length === 0;", timeout=timeout)
+
+    def dropdown_open(self, timeout=None):
+        """等待下拉面板展开完成（可见且不在过渡动画中）"""
+        return self.until_js("""
+            var items = visibleNodes('.el-select-dropdown');
+            for (var i = 0; i < items.length; i++) {
+                if (!inTransition(items[i])) return true;
+            }
+            return false;
+        """, timeout=timeout)
+
+    def dropdown_closed(self, timeout=None):
+        """等待所有下拉面板收起（包括关闭动画结束）"""
+        return self.until_js("return visibleNodes('.el-select-dropdown').length === 0;", timeout=timeout)
+
+    def dialog_open(self, timeout=None):
+        """等待对话框打开且打开动画结束"""
+        return self.until_js("""
+            var wrappers = visibleNodes('.el-dialog__wrapper');
+            for (var i = 0; i < wrappers.length; i++) {
+                if (!inTransition(wrappers[i])) return true;
+            }
+            return false;
+        """, timeout=timeout)
+
+    def dialog_closed(self, timeout=None):
+        """等待对话框关闭（包括关闭动画结束）"""
+        return self.until_js("return visibleNodes('.el-dialog__wrapper').length === 0;", timeout=timeout)
+
+    def tab_active(self, tab_text, timeout=None):
+        """等待指定文本的 el-tabs 标签处于激活状态"""
+        return self.until_js("""
+            var tabs = document.querySelectorAll('.el-tabs__item.is-active');
+            for (var i = 0; i < tabs.length; i++) {
+                if (tabs[i].textContent.indexOf(arguments[0]) !== -1) return true;
+            }
+            return false;
+        """, tab_text, timeout=timeout)
+
+    def mark_feedback(self):
+        """
+        标记当前已显示的消息提示，并返回表格快照（行数 + 首行文本）
+        供 operation_settled 区分本次操作产生的新反馈
+        """
+        return self.driver.execute_script(self.JS_HELPERS + """
+            document.querySelectorAll('.el-message').forEach(function (el) {
+                el.setAttribute('data-kaadas-seen', '1');
+            });
+            var rows = visibleNodes('.el-table__row');
+            return rows.length + '|' + (rows.length ? rows[0].textContent : '');
+        """)
+
+    def operation_settled(self, table_snapshot, timeout=None):
+        """
+        等待操作结果落定：出现新的消息提示，或加载结束后表格内容发生变化
+        :param table_snapshot: mark_feedback 返回的表格快照
+        :return: 新消息的类型（success / error / ...），表格刷新返回 'table'；超时返回 False
+        """
+        return self.until_js("""
+            var messages = visibleNodes('.el-message:not([data-kaadas-seen])');
+            if (messages.length) {
+                var match = /el-message--(\\w+)/.exec(messages[0].className);
+                return match ? match[1] : 'info';
+            }
+            if (visibleNodes('.el-loading-mask').length) return false;
+            var rows = visibleNodes('.el-table__row');
+            var snapshot = rows.length + '|' + (rows.length ? rows[0].textContent : '');
+            return snapshot !== arguments[0] ? 'table' : false;
+        """, table_snapshot, timeout=timeout)
+
+    def xpath_present(self, xpath, timeout=None):
+        """等待XPath匹配到可见元素"""
+        return self.until_js("""
+            var result = document.evaluate(arguments[0], document, null,
+                                           XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            for (var i = 0; i < result.snapshotLength; i++) {
+                if (isVisible(result.snapshotItem(i))) return true;
+            }
+            return false;
+        """, xpath, timeout=timeout)
+
+    def attribute_changed(self, element, name, old_value, timeout=None):
+        """等待元素属性值变化（例如验证码图片 src 刷新）"""
+        return self.until(lambda d: element.get_attribute(name) != old_value, timeout)
+
+
+class LocatorCache:
+    """
+    定位器学习缓存
+    按步骤名记录上次命中的候选定位器下标，下次优先尝试该候选；
+    结果持久化到磁盘，多次运行、多个工作进程共享同一份缓存
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: 缓存文件路径，默认为脚本目录下的 locator_cache.json
+        """
+        self.path = path or os.path.join(BASE_DIR, "locator_cache.json")
+        self.entries = self._read()
+        self.pending = {}  # 待写盘的变更：步骤名 -> 条目（None 表示淘汰）
+
+    def _read(self):
+        """读取磁盘上的缓存，文件不存在或损坏时返回空缓存"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def lookup(self, step, locators):
+        """
+        查询步骤上次命中的候选下标
+        :return: 下标；无缓存或定位器链长度已变化时返回 None
+        """
+        entry = self.entries.get(step)
+        if not entry or entry.get('size') != len(locators):
+            return None
+        index = entry.get('index')
+        if isinstance(index, int) and 0 <= index < len(locators):
+            return index
+        return None
+
+    def record(self, step, locators, index):
+        """记录步骤命中的候选；与缓存一致时不写盘"""
+        if self.lookup(step, locators) == index:
+            return
+        self.entries[step] = {
+            'index': index,
+            'size': len(locators),
+            'locator': str(locators[index]),
+            'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self.pending[step] = self.entries[step]
+        self.save()
+
+    def evict(self, step):
+        """淘汰失效的缓存条目（例如前端发版后候选不再匹配）"""
+        if self.entries.pop(step, None) is not None:
+            print(f"   🗑️ 定位器缓存失效，已淘汰: {step}")
+            self.pending[step] = None
+            self.save()
+
+    def save(self):
+        """加锁后与磁盘内容合并并原子写入，避免多进程互相覆盖"""
+        if not self.pending:
+            return
+        lock_file = None
+        try:
+            if fcntl:
+                lock_file = open(self.path + ".lock", 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            merged = self._read()
+            for step, entry in self.pending.items():
+                if entry is None:
+                    merged.pop(step, None)
+                else:
+                    merged[step] = entry
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+            self.entries = merged
+            self.pending = {}
+        except OSError as e:
+            print(f"⚠️ 定位器缓存写入失败: {e}")
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+
+class LocatorResolver:
+    """
+    定位器解析器
+    一次 execute_script 按优先级评估整条备选定位器链，返回第一个可见匹配；
+    未命中立即返回，不受隐式等待影响
+    """
+
+    JS_RESOLVE = WaitEngine.JS_HELPERS + """
+    var candidates = arguments[0], root = arguments[1] || document, requireEnabled = arguments[2];
+    // 查找范围已被移除或隐藏（例如对话框已关闭）：交给调用方重新解析
+    if (arguments[1] && (!root.isConnected || !isVisible(root))) return 'stale';
+    for (var i = 0; i < candidates.length; i++) {
+        var by = candidates[i][0], value = candidates[i][1], nodes = [];
+        try {
+            if (by === 'xpath') {
+                var result = document.evaluate(value, root, null,
+                                               XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+                for (var j = 0; j < result.snapshotLength; j++) nodes.push(result.snapshotItem(j));
+            } else {
+                nodes = root.querySelectorAll(value);
+            }
+        } catch (e) {
+            continue;
+        }
+        for (var k = 0; k < nodes.length; k++) {
+            var node = nodes[k];
+            if (node.nodeType !== 1 || !isVisible(node)) continue;
+            if (requireEnabled && (node.disabled || node.classList.contains('is-disabled'))) continue;
+            return [node, i];
+        }
+    }
+    return null;
+    """
+
+    def __init__(self, driver, waiter, cache=None):
+        """
+        :param driver: WebDriver实例
+        :param waiter: WaitEngine实例（用于带超时的解析）
+        :param cache: LocatorCache实例，None 表示不使用学习缓存
+        """
+        self.driver = driver
+        self.waiter = waiter
+        self.cache = cache
+
+    @staticmethod
+    def normalize(locator, scoped=False):
+        """
+        统一为 (by, value)，纯字符串视为XPath；By.ID / By.CLASS_NAME 等转换为CSS选择器
+        :param scoped: 在指定查找范围内评估时，把以 // 开头的XPath改为相对查找范围的 .//
+        """
+        if isinstance(locator, str):
+            locator = (By.XPATH, locator)
+        by, value = locator
+        if by == By.ID:
+            return By.CSS_SELECTOR, f"[id='{value}']"
+        if by == By.CLASS_NAME:
+            return By.CSS_SELECTOR, f".{value}"
+        if by == By.NAME:
+            return By.CSS_SELECTOR, f"[name='{value}']"
+        if by == By.TAG_NAME:
+            return By.CSS_SELECTOR, value
+        if scoped and by == By.XPATH and value.startswith("//"):
+            return by, "." + value
+        return by, value
+
+    def resolve(self, locators, root=None, enabled=False, step=None):
+        """
+        单次往返评估整条定位器链
+        :param locators: 定位器列表（(By, value) 元组或XPath字符串），按优先级排列
+        :param root: 查找范围（WebElement），None 表示整个文档；以 // 开头的XPath在范围内相对查找
+        :param enabled: 是否要求元素可用（非 disabled）
+        :param step: 步骤名；提供时使用学习缓存，上次命中的候选排在最前
+        :return: (元素, 命中的定位器下标)；未命中返回 (None, -1)
+        :raises StaleElementReferenceException: 查找范围已被移除或隐藏
+        """
+        order = list(range(len(locators)))
+        cached = self.cache.lookup(step, locators) if (self.cache and step) else None
+        if cached is not None:
+            order.remove(cached)
+            order.insert(0, cached)
+
+        candidates = [list(self.normalize(locators[i], scoped=root is not None)) for i in order]
+        result = self.driver.execute_script(self.JS_RESOLVE, candidates, root, enabled)
+        if result == 'stale':
+            raise StaleElementReferenceException("查找范围已失效")
+        if not result:
+            return None, -1
+
+        index = order[result[1]]
+        if self.cache and step and index != cached:
+            # 缓存的候选已不再匹配（或尚无缓存），改记新的命中候选
+            if cached is not None:
+                self.cache.evict(step)
+            self.cache.record(step, locators, index)
+        return result[0], index
+
+    def wait_resolve(self, locators, timeout=None, root=None, enabled=False, step=None, fallbacks=None):
+        """
+        在超时上限内反复单次评估定位器链，任一候选出现即返回
+        :param fallbacks: 兜底定位器（宽泛，可能先匹配到其他已渲染的元素）；只有 locators 等满超时仍未命中时
+                          才评估一次，命中结果不写入学习缓存
+        :return: (元素, 命中的定位器下标)；兜底命中时下标为 len(locators) + 兜底下标；超时返回 (None, -1)
+        """
+        def condition(driver):
+            element, index = self.resolve(locators, root=root, enabled=enabled, step=step)
+            return (element, index) if element is not None else False
+
+        result = self.waiter.until(condition, timeout)
+        if result:
+            return result
+        # 整条链都未命中：缓存的候选同样失效
+        if self.cache and step and self.cache.lookup(step, locators) is not None:
+            self.cache.evict(step)
+        return self.resolve_fallbacks(locators, fallbacks, root=root, enabled=enabled)
+
+    def resolve_fallbacks(self, locators, fallbacks, root=None, enabled=False):
+        """评估一次兜底定位器（不使用学习缓存）；返回的下标接在 locators 之后"""
+        if not fallbacks:
+            return None, -1
+        element, index = self.resolve(fallbacks, root=root, enabled=enabled)
+        if element is None:
+            return None, -1
+        return element, len(locators) + index
+
+
+class DialogScope:
+    """
+    对话框查找范围
+    以当前打开的 el-dialog 及下拉框挂在 body 下的弹出层为根执行定位，不扫描整个页面，
+    也不会命中之前残留的下拉面板；根节点在对话框生命周期内缓存，失效（被移除或隐藏）时重新解析
+    """
+
+    # 当前打开的对话框：取层级最高、打开动画已结束的 el-dialog
+    JS_DIALOG = """
+    var wrappers = visibleNodes('.el-dialog__wrapper'), best = null, bestZ = -Infinity;
+    for (var i = 0; i < wrappers.length; i++) {
+        var dialog = wrappers[i].querySelector('.el-dialog');
+        if (!dialog || !isVisible(dialog) || inTransition(wrappers[i])) continue;
+        var z = parseInt(window.getComputedStyle(wrappers[i]).zIndex, 10) || 0;
+        if (z >= bestZ) { best = dialog; bestZ = z; }
+    }
+    return best;
+    """
+
+    # 下拉框的弹出层：优先取 el-select 组件实例记录的 popperElm，没有组件实例时取最后一个可见的下拉面板
+    JS_POPPER = WaitEngine.JS_HELPERS + """
+    var el = arguments[0], root = el && el.closest ? el.closest('.el-select') : null;
+    var vm = root && root.__vue__;
+    var popper = vm && (vm.popperElm || (vm.$refs && vm.$refs.popper && vm.$refs.popper.$el));
+    if (popper && popper.nodeType === 1) return popper;
+    var poppers = visibleNodes('.el-select-dropdown');
+    return poppers[poppers.length - 1] || null;
+    """
+
+    def __init__(self, driver, waiter, locator):
+        """
+        :param driver: WebDriver实例
+        :param waiter: WaitEngine实例
+        :param locator: LocatorResolver实例
+        """
+        self.driver = driver
+        self.waiter = waiter
+        self.locator = locator
+        self._dialog = None
+        # 下拉框名称 -> (下拉框元素, 弹出层元素)
+        self._poppers = {}
+
+    def reset(self):
+        """丢弃缓存的根节点（新对话框打开前、对话框关闭后或切换标签页时调用）"""
+        self._dialog = None
+        self._poppers.clear()
+
+    def dialog(self, timeout=0):
+        """
+        当前打开的对话框
+        :param timeout: 没有缓存时等待对话框打开的上限（秒），0 表示只查找一次
+        :return: el-dialog 元素，没有打开的对话框返回 None
+        """
+        if self._dialog is None:
+            self._dialog = self.waiter.until_js(self.JS_DIALOG, timeout=timeout) or None
+        return self._dialog
+
+    def popper(self, name, select_element):
+        """
+        下拉框的弹出层（展开下拉框后调用）
+        :param name: 下拉框名称，作为缓存键
+        :param select_element: 下拉框内的任一元素
+        :return: 弹出层元素，找不到返回 None
+        """
+        cached = self._poppers.get(name)
+        if cached and cached[0] == select_element:
+            return cached[1]
+        try:
+            popper = self.driver.execute_script(self.JS_POPPER, select_element)
+        except (StaleElementReferenceException, NoSuchElementException):
+            popper = None
+        if popper is None:
+            self._poppers.pop(name, None)
+            return None
+        self._poppers[name] = (select_element, popper)
+        return popper
+
+    def find(self, locators, timeout=0, popper=None, enabled=False, step=None, fallbacks=None):
+        """
+        在对话框（或已展开下拉框的弹出层）内按定位器链查找
+        :param locators: 定位器列表，以 // 开头的XPath在范围内相对查找
+        :param timeout: 等待上限（秒），0 表示只评估一次
+        :param popper: 下拉框名称；提供时在 popper() 缓存的弹出层内查找，否则在对话框内查找
+        :param fallbacks: 兜底定位器，见 LocatorResolver.wait_resolve
+        :return: (元素, 命中的定位器下标)；没有查找范围或未命中返回 (None, -1)
+        """
+        for _ in range(2):
+            root = self._root(popper, timeout)
+            if root is None:
+                return None, -1
+            try:
+                if timeout:
+                    return self.locator.wait_resolve(locators, timeout=timeout, root=root, enabled=enabled,
+                                                     step=step, fallbacks=fallbacks)
+                element, index = self.locator.resolve(locators, root=root, enabled=enabled, step=step)
+                if element is None:
+                    return self.locator.resolve_fallbacks(locators, fallbacks, root=root, enabled=enabled)
+                return element, index
+            except (StaleElementReferenceException, NoSuchElementException):
+                # 根节点已失效：丢弃缓存，重新解析一次
+                if popper is None:
+                    self.reset()
+                elif popper in self._poppers:
+                    select_element, _ = self._poppers.pop(popper)
+                    self.popper(popper, select_element)
+        return None, -1
+
+    def find_all(self, css):
+        """对话框内全部匹配CSS选择器的元素，没有打开的对话框返回空列表"""
+        for _ in range(2):
+            dialog = self.dialog()
+            if dialog is None:
+                return []
+            try:
+                return dialog.find_elements(By.CSS_SELECTOR, css)
+            except (StaleElementReferenceException, NoSuchElementException):
+                self.reset()
+        return []
+
+    def _root(self, popper, timeout):
+        """查找根节点：对话框（没有缓存时解析）或已缓存的弹出层"""
+        if popper is None:
+            return self.dialog(timeout=timeout)
+        cached = self._poppers.get(popper)
+        return cached[1] if cached else None
+
+
+class InstallerDirectory:
+    """
+    安装师傅目录（会话级）
+    一次脚本调用读取安装师傅下拉框的全部选项，按手机号、姓名和完整名称建立索引，
+    过期（TTL）或未命中时重新读取
+    """
+
+    # 读取下拉框全部选项（异步脚本）：读 el-select 组件实例的 options（不受虚拟滚动影响）；
+    # 没有组件实例或为远程搜索下拉框（输入关键字前没有选项）时立即返回，选项异步加载时等待到出现或超时
+    JS_READ_OPTIONS = """
+    var input = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+    var root = input && input.closest ? input.closest('.el-select') : null;
+    var vm = root && root.__vue__;
+    var deadline = Date.now() + timeoutMs;
+    if (!vm || !vm.options) return done({source: null, options: []});
+    if (vm.remote) return done({source: 'remote', options: []});
+
+    (function poll() {
+        var options = vm.options.map(function (opt) {
+            return [String(opt.currentLabel || opt.label || ''), opt.value];
+        });
+        if (options.length || Date.now() > deadline) return done({source: 'vue', options: options});
+        setTimeout(poll, 20);
+    })();
+    """
+
+    def __init__(self, ttl=600):
+        """
+        :param ttl: 目录有效期（秒）
+        """
+        self.ttl = ttl
+        self.loaded_at = None
+        self.source = None
+        # 目录不可用（没有组件实例、远程搜索或选项为空）的截止时间，期间不再读取
+        self.unavailable_until = 0
+        self.by_phone = {}
+        self.by_label = {}
+        self.by_name = defaultdict(list)
+
+    @staticmethod
+    def parse(label):
+        """
+        拆分安装师傅名称
+        :param label: 例如 "尹传清(18566227407)"
+        :return: (姓名, 手机号)；没有手机号时手机号为 None
+        """
+        match = re.match(r"^\s*(.*?)\s*[(（]\s*(\d+)\s*[)）]\s*$", label)
+        if match:
+            return match.group(1), match.group(2)
+        return label.strip(), None
+
+    def is_fresh(self):
+        """目录已加载且未过期"""
+        return self.loaded_at is not None and time.time() - self.loaded_at < self.ttl
+
+    def available(self):
+        """目录可以读取（未被标记为不可用）"""
+        return time.time() >= self.unavailable_until
+
+    def invalidate(self):
+        """作废目录（缓存的选项已不在下拉框中），下次查找前重新读取"""
+        self.loaded_at = None
+
+    def load(self, driver, select_input, timeout_ms=3000):
+        """
+        读取安装师傅下拉框的全部选项并重建索引
+        :param select_input: 安装师傅下拉框的输入框
+        :return: 选项数量
+        """
+        result = driver.execute_async_script(self.JS_READ_OPTIONS, select_input, timeout_ms)
+        self.by_phone, self.by_label, self.by_name = {}, {}, defaultdict(list)
+        for label, value in result['options']:
+            name, phone = self.parse(label)
+            entry = {'label': label, 'value': value, 'name': name, 'phone': phone}
+            self.by_label[label] = entry
+            self.by_name[name].append(entry)
+            if phone:
+                self.by_phone[phone] = entry
+        self.source = result['source']
+        self.loaded_at = time.time() if self.by_label else None
+        if self.source in (None, 'remote'):
+            # 页面结构不会在会话中改变：本会话不再读取
+            self.unavailable_until = float('inf')
+        elif not self.by_label:
+            # 选项为空：有效期内不再读取，直接走点击选择
+            self.unavailable_until = time.time() + self.ttl
+        return len(self.by_label)
+
+    def find(self, installer_name):
+        """
+        查找安装师傅（依次按手机号、完整名称、唯一姓名匹配）
+        :return: {'label', 'value', 'name', 'phone'}；目录过期或未命中返回 None
+        """
+        if not self.is_fresh():
             return None
+        name, phone = self.parse(installer_name)
+        if phone and phone in self.by_phone:
+            return self.by_phone[phone]
+        if installer_name in self.by_label:
+            return self.by_label[installer_name]
+        candidates = self.by_name.get(name, [])
+        return candidates[0] if len(candidates) == 1 else None
+
+
+class SessionStore:
+    """
+    登录态持久化
+    保存 cookies 以及 localStorage / sessionStorage（DMS token 所在位置），
+    后续运行和其它工作进程在打开目标页面前恢复，跳过验证码登录
+    """
+
+    def __init__(self, path=None, max_age=12 * 3600):
+        """
+        :param path: 登录态文件路径，默认为脚本目录下的 dms_session.json
+        :param max_age: 登录态最长复用时间（秒），超过后视为失效
+        """
+        self.path = path or os.path.join(BASE_DIR, "dms_session.json")
+        self.max_age = max_age
+
+    def load(self):
+        """读取登录态，文件不存在、损坏或已过期时返回 None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - data.get('saved_at', 0) > self.max_age:
+            print("⚠️ 保存的登录态已过期")
+            return None
+        return data
+
+    def save(self, data):
+        """原子写入登录态文件（仅当前用户可读写，其中包含 token）"""
+        data = dict(data, saved_at=time.time())
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+            print(f"💾 登录态已保存: {self.path}")
+        except OSError as e:
+            print(f"⚠️ 登录态保存失败: {e}")
+
+    def clear(self):
+        """删除失效的登录态"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def parse_api_result(status, body, success_codes):
+    """
+    解析 DMS 接口返回
+    :param status: HTTP 状态码
+    :param body: 响应体文本
+    :param success_codes: 视为成功的业务码
+    :return: (是否成功, 业务码, 提示信息)；响应体不是 JSON 对象（例如网关或登录页 HTML）时视为失败
+    """
+    try:
+        result = json.loads(body) if body else None
+    except ValueError:
+        result = None
+    if not isinstance(result, dict):
+        return False, status, f"HTTP {status}"
+    code = result.get('code', status)
+    success = status == 200 and (result.get('success') is True or code in success_codes)
+    message = result.get('msg') or result.get('message') or f"HTTP {status}"
+    return success, code, message
+
+
+class ResponseCapture:
+    """
+    接口响应捕获
+    读取 Chrome 性能日志（goog:loggingPrefs）中的网络事件，匹配指定路径的请求，
+    请求完成后通过 CDP Network.getResponseBody 取回响应内容，以服务端返回作为操作结果。
+    性能日志由所有标签页共用，事件按所属标签页（webview）分别记录，多标签页并发时互不干扰
+    """
+
+    def __init__(self, driver, path, method="POST", success_codes=None, poll_frequency=0.05):
+        """
+        :param driver: WebDriver实例（需开启 performance 日志）
+        :param path: 要匹配的接口路径片段
+        :param method: 请求方法（排除跨域预检等其他请求）
+        :param success_codes: 视为成功的业务码
+        :param poll_frequency: 轮询间隔（秒）
+        """
+        self.driver = driver
+        self.path = path
+        self.method = method
+        self.success_codes = success_codes if success_codes is not None else DMS_API_CONFIG['success_codes']
+        self.poll_frequency = poll_frequency
+        # requestId -> {webview, status（收到响应头之前为 None）, finished, error}
+        self.pending = {}
+
+    @staticmethod
+    def same_tab(webview, handle):
+        """性能日志中的 webview 是否属于指定窗口句柄；任一方未知时视为匹配"""
+        if not webview or not handle:
+            return True
+        return handle.replace("CDwindow-", "").upper() == webview.upper()
+
+    def _events(self):
+        """读取并清空性能日志中累积的事件"""
+        for entry in self.driver.get_log('performance'):
+            try:
+                payload = json.loads(entry['message'])
+                message = payload['message']
+            except (KeyError, ValueError):
+                continue
+            yield payload.get('webview'), message.get('method'), message.get('params', {})
+
+    def collect(self):
+        """读取性能日志，更新匹配请求的状态（不阻塞）"""
+        for webview, method, params in self._events():
+            request_id = params.get('requestId')
+            if method == 'Network.requestWillBeSent':
+                request = params.get('request', {})
+                if self.path in request.get('url', '') and request.get('method') == self.method:
+                    self.pending[request_id] = {'webview': webview, 'status': None, 'finished': False,
+                                                'error': None}
+                continue
+            record = self.pending.get(request_id)
+            if record is None:
+                continue
+            if method == 'Network.responseReceived':
+                record['status'] = params.get('response', {}).get('status')
+            elif method == 'Network.loadingFinished':
+                record['finished'] = True
+            elif method == 'Network.loadingFailed':
+                record['finished'] = True
+                record['error'] = params.get('errorText', "请求失败")
+
+    def finished(self, handle=None):
+        """是否已有完成的匹配请求（不阻塞，不取走结果）"""
+        self.collect()
+        return any(record['finished'] and self.same_tab(record['webview'], handle)
+                   for record in self.pending.values())
+
+    def reset(self, handle=None):
+        """
+        丢弃之前累积的网络事件（在发起操作前调用）
+        :param handle: 只丢弃该标签页的请求，None 表示全部丢弃
+        """
+        self.collect()
+        for request_id, record in list(self.pending.items()):
+            if handle is None or self.same_tab(record['webview'], handle):
+                del self.pending[request_id]
+
+    def result(self, handle=None):
+        """
+        已完成的匹配请求的结果（不阻塞；需在请求所属的标签页内调用，以便取回响应体）
+        :param handle: 只取该标签页的请求，None 表示任意标签页
+        :return: {success, code, message, status, source}；还没有完成的请求返回 None
+        """
+        self.collect()
+        for request_id, record in list(self.pending.items()):
+            if not record['finished'] or not self.same_tab(record['webview'], handle):
+                continue
+            del self.pending[request_id]
+            if record['error']:
+                return {'success': False, 'code': None, 'status': None, 'message': record['error'],
+                        'source': 'network'}
+            return self._outcome(request_id, record['status'])
+        return None
+
+    def _outcome(self, request_id, status):
+        """取回响应体并解析结果"""
+        try:
+            response = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            body = response.get('body', '')
+            if response.get('base64Encoded'):
+                body = base64.b64decode(body).decode('utf-8', 'replace')
+        except Exception:
+            body = ""
+        success, code, message = parse_api_result(status, body, self.success_codes)
+        return {'success': success, 'code': code, 'status': status, 'message': message, 'source': 'network'}
+
+
+class DmsApiClient:
+    """
+    接口模式授权引擎
+    复用浏览器登录（或恢复的登录态）得到的 DMS token，
+    通过连接池长连接直接调用新增授权接口，不再驱动浏览器
+    """
+
+    def __init__(self, token, cookies=None, config=None, pool_size=8, timeout=10):
+        """
+        :param token: DMS 认证 token
+        :param cookies: 随请求发送的 cookies（名称 -> 值）
+        :param config: 接口配置，默认使用 DMS_API_CONFIG
+        :param pool_size: 连接池大小（同时也是最大并发连接数）
+        :param timeout: 单次请求超时（秒）
+        """
+        self.config = config or DMS_API_CONFIG
+        self.timeout = timeout
+        self.http = urllib3.PoolManager(
+            maxsize=pool_size,
+            block=True,
+            # 新增授权不是幂等操作，只重试连接阶段的错误，请求发出后不再重试
+            retries=urllib3.Retry(connect=2, read=0, redirect=0, status=0, backoff_factor=0.2),
+        )
+        self.headers = {
+            'Content-Type': "application/json;charset=UTF-8",
+            'Accept': "application/json, text/plain, */*",
+            'Connection': "keep-alive",
+            self.config['token_header']: self.config['token_prefix'] + token,
+        }
+        if cookies:
+            self.headers['Cookie'] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+    @classmethod
+    def from_session(cls, session_data, config=None, **kwargs):
+        """
+        从导出的登录态（KaadasAutomation.export_session / SessionStore.load）创建客户端
+        :return: DmsApiClient；登录态中找不到 token 时返回 None
+        """
+        config = config or DMS_API_CONFIG
+        token = cls.find_token(session_data, config['token_keys'])
+        if not token:
+            print("❌ 登录态中未找到 DMS token")
+            return None
+        cookies = {c['name']: c['value'] for c in session_data.get('cookies', [])}
+        return cls(token, cookies=cookies, config=config, **kwargs)
+
+    @staticmethod
+    def find_token(session_data, token_keys):
+        """在 localStorage / sessionStorage / cookies 中查找 token（兼容JSON包装的值）"""
+        sources = [session_data.get('local_storage', {}), session_data.get('session_storage', {}),
+                   {c['name']: c['value'] for c in session_data.get('cookies', [])}]
+        for source in sources:
+            for key in token_keys:
+                value = source.get(key)
+                if not value:
+                    continue
+                try:
+                    parsed = json.loads(value)
+                except ValueError:
+                    return value
+                if isinstance(parsed, str):
+                    return parsed
+                if isinstance(parsed, dict):
+                    for inner_key in token_keys + ['value', 'data']:
+                        if isinstance(parsed.get(inner_key), str):
+                            return parsed[inner_key]
+        return None
+
+    def build_payload(self, device_sn, auth_type, role, installer, duration):
+        """按配置把界面选项转换为接口请求体"""
+        values = {'device_sn': device_sn, 'auth_type': auth_type, 'role': role,
+                  'installer': installer, 'duration': duration}
+        value_map = self.config['value_map']
+
+        payload = {}
+        for name, field in self.config['fields'].items():
+            value = values[name]
+            if value in value_map.get(name, {}):
+                value = value_map[name][value]
+            elif name == 'installer':
+                phone = re.search(r'\((\d+)\)', value)
+                value = phone.group(1) if phone else value
+            payload[field] = value
+        return payload
+
+    def create_authorization(self, device_sn, auth_type=AUTH_DEFAULTS['auth_type'], role=AUTH_DEFAULTS['role'],
+                             installer=AUTH_DEFAULTS['installer'], duration=AUTH_DEFAULTS['duration']):
+        """
+        新增一条授权
+        :return: 结果字典 {device_sn, success, code, message, duration}；请求未完成时 code 为 None
+        """
+        start_time = time.time()
+        url = self.config['base_url'] + self.config['create_path']
+        body = json.dumps(self.build_payload(device_sn, auth_type, role, installer, duration)).encode('utf-8')
+
+        try:
+            response = self.http.request("POST", url, body=body, headers=self.headers, timeout=self.timeout)
+            success, code, message = parse_api_result(response.status, response.data.decode('utf-8'),
+                                                      self.config['success_codes'])
+            if response.status in self.config['auth_failed_codes']:
+                code = response.status
+        except Exception as e:
+            success, code, message = False, None, str(e)
+
+        return {
+            'device_sn': device_sn,
+            'success': success,
+            'code': code,
+            'message': message,
+            'duration': round(time.time() - start_time, 3),
+        }
+
+    def create_authorizations(self, device_sns, concurrency=8, **params):
+        """
+        并发新增授权（共享连接池）
+        :param device_sns: 设备序列号列表
+        :param concurrency: 并发请求数
+        :param params: 授权参数（auth_type / role / installer / duration）
+        :return: 逐设备结果列表（与输入顺序一致）
+        """
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(lambda sn: self.create_authorization(sn, **params), device_sns))
+
+    def token_rejected(self, result):
+        """结果是否因 token 失效被拒绝（请求未被受理，可以换新 token 后重试）"""
+        return not result['success'] and result.get('code') in self.config['auth_failed_codes']
+
+
+class JobQueue:
+    """
+    授权任务队列（SQLite）
+    每个任务的状态持久化到磁盘：成功结果立即提交，失败结果按批提交；中断后重新运行只处理未完成和失败的任务，
+    已成功的任务不会重复执行（失败结果尚未提交时进程被强杀，该任务会作为未完成任务重新执行）。
+    去重范围是导入批次：需要对同一设备重新授权时使用新的批次导入。
+    任务可以带租约领取（多主机分发），租约过期的任务重新排队
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        batch TEXT NOT NULL DEFAULT '',
+        device_sn TEXT NOT NULL,
+        installer TEXT NOT NULL,
+        auth_type TEXT NOT NULL,
+        role TEXT NOT NULL,
+        duration TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        message TEXT NOT NULL DEFAULT '',
+        updated_at REAL NOT NULL,
+        worker TEXT,
+        lease_expires REAL,
+        UNIQUE (batch, device_sn, installer, auth_type, role, duration)
+    );
+    CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+    """
+
+    def __init__(self, path=None, commit_every=10, commit_interval=2.0, max_attempts=3):
+        """
+        :param path: 数据库文件路径，默认为脚本目录下的 jobs.db
+        :param commit_every: 累计多少个失败结果提交一次（成功结果总是立即提交）
+        :param commit_interval: 距上次提交超过该秒数时立即提交
+        :param max_attempts: 单个任务的最大执行次数（失败任务重新运行时才会重试）
+        """
+        self.path = path or os.path.join(BASE_DIR, "jobs.db")
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.max_attempts = max_attempts
+        # 协调服务在多个请求线程中使用同一连接，由调用方加锁串行访问
+        self.conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.SCHEMA)
+        # 兼容没有租约字段的旧数据库
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (('worker', 'TEXT'), ('lease_expires', 'REAL')):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        if 'batch' not in columns:
+            self._migrate_batch()
+        self.buffer = []  # 待提交的任务结果：(状态, 提示信息, 时间, 任务ID, 工作进程)
+        self.last_commit = time.time()
+
+    COLUMNS = "device_sn, installer, auth_type, role, duration, status, attempts, message, updated_at, " \
+              "worker, lease_expires"
+
+    def _migrate_batch(self):
+        """旧数据库的唯一约束不含批次，重建表后已有任务归入默认批次"""
+        self.conn.executescript(f"""
+        BEGIN;
+        DROP INDEX IF EXISTS jobs_status;
+        ALTER TABLE jobs RENAME TO jobs_old;
+        {self.SCHEMA}
+        INSERT INTO jobs (id, {self.COLUMNS}) SELECT id, {self.COLUMNS} FROM jobs_old;
+        DROP TABLE jobs_old;
+        COMMIT;
+        """)
+
+    def add(self, jobs, batch=""):
+        """
+        导入任务（同一批次内同一设备、同一组授权参数只导入一次，重复导入同一文件不会产生重复任务）
+        批次内已成功的任务会被跳过并给出提示；需要重新授权时指定新的批次
+        :param jobs: load_jobs 返回的任务列表
+        :param batch: 导入批次标识，默认批次为空字符串
+        :return: 新增任务数
+        """
+        now = time.time()
+        keys = [(batch, job['device_sn'], job['installer'], job['auth_type'], job['role'], job['duration'])
+                for job in jobs]
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO jobs (batch, device_sn, installer, auth_type, role, duration, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", [key + (now,) for key in keys]
+        )
+        self.conn.execute("COMMIT")
+        added = self.conn.total_changes - before
+        done = sum(1 for key in set(keys) if self.conn.execute(
+            "SELECT 1 FROM jobs WHERE batch = ? AND device_sn = ? AND installer = ? AND auth_type = ? "
+            "AND role = ? AND duration = ? AND status = 'done'", key).fetchone())
+        if done:
+            print(f"⚠️ {done} 个任务在批次【{batch or '默认'}】中已授权成功，本次不再执行；"
+                  f"需要重新授权时使用 --batch 指定新的批次")
+        return added
+
+    def recover(self):
+        """
+        恢复上次运行中断的任务：执行中（running）的任务和未达重试上限的失败任务重新排队
+        :return: 重新排队的任务数
+        """
+        cursor = self.conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'running' OR (status = 'failed' AND attempts < ?)",
+            (time.time(), self.max_attempts)
+        )
+        return cursor.rowcount
+
+    def claim(self, limit=10, worker=None, lease_seconds=None):
+        """
+        领取一批待执行任务并标记为执行中（一次提交）
+        领取前先把租约已过期的任务重新排队（工作进程失联后其任务自动重新分配），
+        已达最大执行次数的过期任务标记为失败，不再分配
+        :param worker: 工作进程标识
+        :param lease_seconds: 租约时长（秒），None 表示不过期
+        :return: 任务字典列表，没有待执行任务时为空列表
+        """
+        self.flush()
+        now = time.time()
+        lease_expires = now + lease_seconds if lease_seconds else None
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            exhausted = self.conn.execute(
+                "UPDATE jobs SET status = 'failed', message = ?, worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_expires IS NOT NULL AND lease_expires < ? AND attempts >= ?",
+                ("租约过期且已达最大执行次数", now, now, self.max_attempts)
+            ).rowcount
+            if exhausted:
+                print(f"❌ {exhausted} 个任务租约过期且已达最大执行次数（{self.max_attempts}），标记为失败")
+            expired = self.conn.execute(
+                "UPDATE jobs SET status = 'pending', worker = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_expires IS NOT NULL AND lease_expires < ?", (now, now)
+            ).rowcount
+            if expired:
+                print(f"♻️ {expired} 个任务租约过期，重新分配")
+            rows = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            self.conn.executemany(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_expires = ?, "
+                "updated_at = ? WHERE id = ?",
+                [(worker, lease_expires, now, row['id']) for row in rows]
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [dict(row) for row in rows]
+
+    def heartbeat(self, worker, job_ids, lease_seconds):
+        """
+        续约工作进程持有的任务
+        :return: 续约成功的任务ID列表（租约已过期并被重新分配的任务不在其中）
+        """
+        if not job_ids:
+            return []
+        placeholders = ",".join("?" * len(job_ids))
+        params = [worker] + list(job_ids)
+        self.conn.execute(
+            f"UPDATE jobs SET lease_expires = ? WHERE status = 'running' AND worker = ? AND id IN ({placeholders})",
+            [time.time() + lease_seconds] + params
+        )
+        return [row['id'] for row in self.conn.execute(
+            f"SELECT id FROM jobs WHERE status = 'running' AND worker = ? AND id IN ({placeholders})", params)]
+
+    def owns(self, job_id, worker):
+        """任务是否仍由该工作进程持有（执行中且租约未被重新分配）"""
+        return self.conn.execute(
+            "SELECT 1 FROM jobs WHERE id = ? AND status = 'running' AND worker IS ?", (job_id, worker)
+        ).fetchone() is not None
+
+    def complete(self, job_id, success, message="", worker=None):
+        """
+        记录任务结果
+        成功结果立即写盘（授权已创建，强杀后不能再次执行）；失败结果攒够一批或距上次提交超过
+        commit_interval 秒时写盘，强杀时未提交的失败任务会重新执行
+        :param worker: 领取任务时的工作进程标识
+        :return: 是否接受该结果；任务已被重新分配给其他工作进程时返回 False
+        """
+        if worker is not None and not self.owns(job_id, worker):
+            return False
+        self.buffer.append(('done' if success else 'failed', message or "", time.time(), job_id, worker))
+        if (success or len(self.buffer) >= self.commit_every
+                or time.time() - self.last_commit >= self.commit_interval):
+            self.flush()
+        return True
+
+    def flush(self):
+        """提交缓冲中的任务结果"""
+        if self.buffer:
+            self.conn.execute("BEGIN")
+            # 只更新仍由上报者持有的执行中任务，租约过期后被重新分配的任务不会被迟到的结果覆盖
+            self.conn.executemany(
+                "UPDATE jobs SET status = ?, message = ?, updated_at = ?, lease_expires = NULL "
+                "WHERE id = ? AND status = 'running' AND worker IS ?", self.buffer
+            )
+            self.conn.execute("COMMIT")
+            self.buffer = []
+        self.last_commit = time.time()
+
+    def summary(self):
+        """各状态的任务数"""
+        return {row['status']: row['count'] for row in self.conn.execute(
+            "SELECT status, COUNT(*) AS count FROM jobs GROUP BY status")}
+
+    def close(self):
+        """提交剩余结果并关闭数据库"""
+        self.flush()
+        self.conn.close()
+
+
+class JsonServiceHandler(BaseHTTPRequestHandler):
+    """
+    本地 HTTP 服务（任务协调服务、常驻浏览器服务）的 JSON 接口
+    路由表把请求路径映射到服务对象的方法，方法接收请求体字典并返回响应字典
+    """
+
+    # 由服务对象注入
+    service = None
+    get_routes = {}
+    post_routes = {}
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """静默访问日志"""
+        pass
+
+    @staticmethod
+    def is_loopback(host):
+        """监听地址是否只允许本机访问"""
+        if host == "localhost":
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    def _json(self, payload, status=200):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json;charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self):
+        token = self.service.token
+        if not token or self.headers.get("X-Kaadas-Token") == token:
+            return True
+        self._json({'error': "unauthorized"}, status=401)
+        return False
+
+    def _dispatch(self, routes, payload):
+        method = routes.get(self.path)
+        if method is None:
+            self._json({'error': "not found"}, status=404)
+            return
+        try:
+            self._json(getattr(self.service, method)(payload))
+        except (KeyError, TypeError, ValueError) as e:
+            self._json({'error': f"bad request: {e}"}, status=400)
+
+    def do_GET(self):
+        if self._authorized():
+            self._dispatch(self.get_routes, {})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+        except ValueError:
+            self._json({'error': "invalid json"}, status=400)
+            return
+        self._dispatch(self.post_routes, payload)
+
+
+class Coordinator:
+    """
+    任务协调服务
+    通过 HTTP 把 JobQueue 中的任务分发给多台主机上的工作进程：任务以租约形式领取，
+    工作进程定期心跳续约，租约过期（工作进程失联）的任务自动重新分配；结果集中写入队列和结果文件
+    """
+
+    def __init__(self, job_queue, host="127.0.0.1", port=8765, lease_seconds=60, token=None, results_file=None):
+        """
+        :param job_queue: JobQueue 实例
+        :param host: 监听地址，默认只允许本机访问；监听其他地址时必须设置 token
+        :param port: 监听端口，0 表示自动分配
+        :param lease_seconds: 任务租约时长（秒）
+        :param token: 共享口令，工作进程需在 X-Kaadas-Token 请求头中携带，None 表示不校验
+        :param results_file: 逐任务结果输出文件（JSON Lines，追加写入），None 表示不输出
+        :raises ValueError: 监听非本机地址但没有设置 token
+        """
+        if not token and not JsonServiceHandler.is_loopback(host):
+            raise ValueError(f"监听 {host} 会把任务分发接口暴露给其他主机，必须设置共享口令（--token）")
+        self.job_queue = job_queue
+        self.lease_seconds = lease_seconds
+        self.token = token
+        self.results_file = results_file
+        self.results = []
+        self.workers = {}  # 工作进程 -> 最近一次请求时间
+        self.lock = threading.Lock()
+        handler = type("CoordinatorHandler", (JsonServiceHandler,), {
+            'service': self,
+            'get_routes': {"/status": 'status'},
+            'post_routes': {"/lease": 'lease', "/heartbeat": 'heartbeat', "/complete": 'complete'},
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """本机访问地址"""
+        host, port = self.httpd.server_address[:2]
+        if host in ("0.0.0.0", ""):
+            host = "127.0.0.1"
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程启动服务"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="coordinator", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _seen(self, worker):
+        self.workers[worker] = time.time()
+
+    def remaining(self):
+        """未完成的任务数（待执行 + 执行中）"""
+        self.job_queue.flush()
+        summary = self.job_queue.summary()
+        return summary.get('pending', 0) + summary.get('running', 0)
+
+    def lease(self, payload):
+        """领取任务：{worker, limit} -> {jobs, lease_seconds, remaining}"""
+        with self.lock:
+            self._seen(payload['worker'])
+            jobs = self.job_queue.claim(int(payload.get('limit', 1)), worker=payload['worker'],
+                                        lease_seconds=self.lease_seconds)
+            return {'jobs': jobs, 'lease_seconds': self.lease_seconds, 'remaining': self.remaining()}
+
+    def heartbeat(self, payload):
+        """续约：{worker, job_ids} -> {renewed}"""
+        with self.lock:
+            self._seen(payload['worker'])
+            renewed = self.job_queue.heartbeat(payload['worker'], payload.get('job_ids', []), self.lease_seconds)
+            return {'renewed': renewed}
+
+    def complete(self, payload):
+        """
+        上报结果：{worker, job_id, success, message, device_sn, duration} -> {ok}
+        任务已不归上报者持有（租约过期后被重新分配）时拒绝该结果，不写入队列和结果文件
+        """
+        with self.lock:
+            self._seen(payload['worker'])
+            if not self.job_queue.complete(payload['job_id'], bool(payload['success']), payload.get('message', ""),
+                                           worker=payload['worker']):
+                print(f"⚠️ [{payload['worker']}] 任务 {payload['job_id']} 租约已失效，丢弃迟到的结果")
+                return {'ok': False, 'error': "lease lost"}
+            result = {
+                'job_id': payload['job_id'],
+                'worker': payload['worker'],
+                'device_sn': payload.get('device_sn'),
+                'success': bool(payload['success']),
+                'duration': payload.get('duration', 0),
+                'error': "" if payload['success'] else payload.get('message', ""),
+            }
+            self.results.append(result)
+            if self.results_file:
+                with open(self.results_file, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        status = "✅" if result['success'] else "❌"
+        print(f"{status} [{result['worker']}] {result['device_sn']} {result['duration']:.2f}秒 "
+              f"{result['error']}".rstrip())
+        return {'ok': True}
+
+    def status(self, payload=None):
+        """队列状态与各工作进程最近活跃时间"""
+        with self.lock:
+            now = time.time()
+            return {
+                'jobs': self.job_queue.summary(),
+                'workers': {worker: round(now - seen, 1) for worker, seen in self.workers.items()},
+            }
+
+
+class CoordinatorClient:
+    """工作进程访问任务协调服务的客户端"""
+
+    def __init__(self, base_url, worker, token=None, timeout=10):
+        """
+        :param base_url: 协调服务地址，例如 http://10.0.0.5:8765
+        :param worker: 工作进程标识（主机名-编号）
+        :param token: 共享口令
+        """
+        self.base_url = base_url.rstrip('/')
+        self.worker = worker
+        self.headers = {'Content-Type': "application/json"}
+        if token:
+            self.headers['X-Kaadas-Token'] = token
+        self.http = urllib3.PoolManager(
+            num_pools=1,
+            maxsize=2,
+            timeout=urllib3.Timeout(total=timeout),
+            retries=urllib3.Retry(connect=3, read=0, redirect=0, status=0, backoff_factor=0.5),
+        )
+
+    def _post(self, path, payload):
+        payload = dict(payload, worker=self.worker)
+        response = self.http.request("POST", self.base_url + path, body=json.dumps(payload).encode('utf-8'),
+                                     headers=self.headers)
+        if response.status != 200:
+            raise RuntimeError(f"协调服务返回 HTTP {response.status}: {response.data[:200]!r}")
+        return json.loads(response.data.decode('utf-8'))
+
+    def lease(self, limit=1):
+        return self._post("/lease", {'limit': limit})
+
+    def heartbeat(self, job_ids):
+        return self._post("/heartbeat", {'job_ids': list(job_ids)})
+
+    def complete(self, job, success, message, duration):
+        return self._post("/complete", {'job_id': job['id'], 'device_sn': job['device_sn'], 'success': success,
+                                        'message': message, 'duration': duration})
+
+
+class DriverResolver:
+    """
+    chromedriver 路径解析
+    按本机 Chrome 主版本号把已校验的 chromedriver 路径缓存到磁盘，多次运行、多个工作进程共享；
+    只有缓存缺失或版本不匹配时才通过 webdriver-manager 联网下载
+    """
+
+    # 各平台 Chrome / Chromium 可执行文件的常见位置（按顺序尝试）
+    CHROME_BINARIES = {
+        'darwin': ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+                   "/Applications/Chromium.app/Contents/MacOS/Chromium"],
+        'linux': ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"],
+    }
+    # Windows 下从注册表读取版本号
+    WINDOWS_REGISTRY_KEYS = [
+        r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon",
+        r"HKEY_LOCAL_MACHINE\Software\Google\Chrome\BLBeacon",
+    ]
+
+    def __init__(self, path=None):
+        """
+        :param path: 缓存文件路径，默认为脚本目录下的 driver_cache.json
+        """
+        self.path = path or os.path.join(BASE_DIR, "driver_cache.json")
+
+    @staticmethod
+    def _run_version(command):
+        """执行版本查询命令，返回输出中的版本号，失败返回 None"""
+        try:
+            output = subprocess.run(command, capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            return None
+        match = re.search(r"(\d+)\.\d+\.\d+\.\d+", output)
+        return match.group(0) if match else None
+
+    def chrome_version(self):
+        """本机 Chrome 版本号，检测不到时返回 None"""
+        if sys.platform.startswith('win'):
+            for key in self.WINDOWS_REGISTRY_KEYS:
+                version = self._run_version(["reg", "query", key, "/v", "version"])
+                if version:
+                    return version
+            return None
+        platform_key = 'darwin' if sys.platform == 'darwin' else 'linux'
+        for binary in self.CHROME_BINARIES[platform_key]:
+            version = self._run_version([binary, "--version"])
+            if version:
+                return version
+        return None
+
+    def driver_version(self, driver_path):
+        """chromedriver 版本号，文件不可执行时返回 None"""
+        return self._run_version([driver_path, "--version"])
+
+    @staticmethod
+    def major(version):
+        """主版本号"""
+        return version.split('.')[0] if version else None
+
+    def _read(self):
+        """读取磁盘上的缓存，文件不存在或损坏时返回空缓存"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _cached(self, cache, key):
+        """缓存中的可用路径（文件仍存在），否则返回 None"""
+        entry = cache.get(key)
+        if entry and os.path.isfile(entry.get('path', '')):
+            return entry['path']
+        return None
+
+    def resolve(self):
+        """
+        解析 chromedriver 路径
+        优先级：环境变量 CHROMEDRIVER_PATH > 磁盘缓存（按 Chrome 主版本号）> 联网下载
+        :return: chromedriver 路径
+        """
+        override = os.environ.get("CHROMEDRIVER_PATH")
+        if override and os.path.isfile(override):
+            return override
+
+        chrome_major = self.major(self.chrome_version())
+        # 检测不到 Chrome 版本时使用最近一次解析的结果
+        key = chrome_major or 'last'
+        path = self._cached(self._read(), key)
+        if path:
+            return path
+
+        lock_file = None
+        try:
+            if fcntl:
+                lock_file = open(self.path + ".lock", 'w')
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            # 等锁期间其他进程可能已经完成下载
+            cache = self._read()
+            path = self._cached(cache, key)
+            if path:
+                return path
+
+            print(f"⬇️ 未找到与 Chrome {chrome_major or '?'} 匹配的 chromedriver 缓存，联网解析...")
+            path = ChromeDriverManager().install()
+            driver_major = self.major(self.driver_version(path))
+            if chrome_major and driver_major and driver_major != chrome_major:
+                print(f"⚠️ chromedriver {driver_major} 与 Chrome {chrome_major} 主版本号不一致")
+
+            entry = {'path': path, 'driver_major': driver_major,
+                     'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}
+            cache['last'] = entry
+            if chrome_major and driver_major == chrome_major:
+                cache[chrome_major] = entry
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            return path
+        finally:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
 
 
 class KaadasAutomation:
     """凯迪仕DMS系统自动化测试类"""
 
-    def __init__(self, headless=False):
+    # 登录表单分析：一次调用完成所有输入框的分类
+    JS_ANALYZE_INPUTS = WaitEngine.JS_HELPERS + """
+    var inputs = Array.prototype.slice.call(document.querySelectorAll('input.el-input__inner'));
+    if (!inputs.length) inputs = Array.prototype.slice.call(document.querySelectorAll('input'));
+
+    var result = {fields: [], username: null, password: null, captcha: null,
+                  username_index: -1, password_index: -1, captcha_index: -1};
+    function assign(name, inp, i) { result[name] = inp; result[name + '_index'] = i; }
+
+    inputs.forEach(function (inp, i) {
+        var type = inp.getAttribute('type') || '', placeholder = inp.getAttribute('placeholder') || '';
+        var visible = isVisible(inp);
+        result.fields.push([type, placeholder, visible]);
+        if (!visible) return;
+
+        if (type === 'password') {
+            assign('password', inp, i);
+        } else if (type === 'text' || type === '') {
+            if (placeholder.indexOf('账号') !== -1 || placeholder.indexOf('用户') !== -1) {
+                assign('username', inp, i);
+            } else if (placeholder.indexOf('验证码') !== -1 || placeholder.indexOf('码') !== -1) {
+                assign('captcha', inp, i);
+            } else if (result.username === null && result.password === null) {
+                assign('username', inp, i);
+            }
+        }
+    });
+
+    // 如果还没找到验证码框，取最后一个可见的非密码框
+    if (result.captcha === null) {
+        var candidates = inputs.filter(function (inp) {
+            return isVisible(inp) && inp.getAttribute('type') !== 'password';
+        });
+        if (candidates.length >= 3) {
+            var last = candidates[candidates.length - 1];
+            assign('captcha', last, inputs.indexOf(last));
+        }
+    }
+    return result;
+    """
+
+    # 批量填写输入框：用原生 setter 赋值并派发事件，保证 Vue 的 v-model 同步
+    JS_FILL_INPUTS = """
+    var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+    return arguments[0].map(function (pair) {
+        var el = pair[0];
+        el.focus();
+        setter.call(el, pair[1]);
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+        el.blur();
+        return el.value;
+    });
+    """
+
+    # 提交后的落定条件：对话框已关闭，或出现表单校验错误
+    JS_SUBMIT_SETTLED = """
+    return visibleNodes('.el-dialog__wrapper').length === 0 ||
+           visibleNodes('.el-dialog__wrapper .el-form-item__error').length > 0;
+    """
+
+    # 下拉选项查找（异步脚本，一次调用完成搜索、查找和点击）：
+    # 可搜索的下拉框先输入搜索词；选项仍在加载时继续等待；当前渲染的选项中没有命中时，
+    # 从顶部按可视高度逐页滚动，每次滚动后等待列表重新渲染再检查（兼容虚拟滚动列表），
+    # 直到命中、滚动到底或超时
+    JS_PICK_OPTION = WaitEngine.JS_HELPERS + """
+    var input = arguments[0], terms = arguments[1], searchText = arguments[2], timeoutMs = arguments[3];
+    var done = arguments[arguments.length - 1];
+    var deadline = Date.now() + timeoutMs, emptySince = null, scanning = false, settleAt = 0;
+
+    // el-select 在 input 事件中同步输入值，在 keyup 事件中（可能带防抖）触发过滤/远程搜索
+    if (input && input.tagName === 'INPUT' && !input.readOnly && input.value !== searchText) {
+        var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+        setter.call(input, searchText);
+        input.dispatchEvent(new Event('input', {bubbles: true}));
+        input.dispatchEvent(new KeyboardEvent('keyup', {bubbles: true}));
+        settleAt = Date.now() + 350;
+    }
+
+    function matches(item) {
+        if (item.classList.contains('is-disabled') || !isVisible(item)) return false;
+        var text = item.textContent;
+        return terms.every(function (term) { return text.indexOf(term) !== -1; });
+    }
+
+    // 优先使用下拉框组件自己的弹出层，避免命中之前残留的下拉面板
+    var selectRoot = input && input.closest ? input.closest('.el-select') : null;
+    var ownPopper = selectRoot && selectRoot.__vue__ && selectRoot.__vue__.popperElm;
+
+    function step() {
+        if (Date.now() > deadline) return done(null);
+        var poppers = visibleNodes('.el-select-dropdown');
+        var popper = isVisible(ownPopper) ? ownPopper : poppers[poppers.length - 1];
+        if (!popper || inTransition(popper)) return setTimeout(step, 20);
+
+        var items = popper.querySelectorAll('.el-select-dropdown__item');
+        for (var i = 0; i < items.length; i++) {
+            if (matches(items[i])) {
+                items[i].scrollIntoView({block: 'nearest'});
+                items[i].click();
+                return done(items[i].textContent.trim());
+            }
+        }
+
+        // 搜索防抖期间、远程搜索或列表加载中：继续等待；稳定为空 500ms 视为没有该选项
+        if (Date.now() < settleAt) return setTimeout(step, 20);
+        if (isVisible(popper.querySelector('.el-select-dropdown__loading'))) return setTimeout(step, 20);
+        if (!items.length) {
+            emptySince = emptySince || Date.now();
+            if (Date.now() - emptySince > 500) return done(null);
+            return setTimeout(step, 20);
+        }
+        emptySince = null;
+
+        var wrap = popper.querySelector('.el-select-dropdown__wrap') || popper;
+        if (!scanning) {
+            scanning = true;
+            wrap.scrollTop = 0;
+        } else if (wrap.scrollTop + wrap.clientHeight >= wrap.scrollHeight - 1) {
+            return done(null);
+        } else {
+            wrap.scrollTop += wrap.clientHeight;
+        }
+        setTimeout(step, 20);
+    }
+    step();
+    """
+
+    # 按值直接选择下拉选项（异步脚本）：等待 el-select 组件实例中出现该值的选项后，
+    # 调用组件自身的选项点击处理（与用户点击等价），无需展开下拉面板；
+    # 没有组件实例，或选项已加载但其中没有该值（缓存的值已失效）时立即返回 null
+    JS_SELECT_VALUE = """
+    var input = arguments[0], value = arguments[1], timeoutMs = arguments[2];
+    var done = arguments[arguments.length - 1];
+    var root = input && input.closest ? input.closest('.el-select') : null;
+    var vm = root && root.__vue__;
+    if (!vm || !vm.options || !vm.handleOptionClick) return done(null);
+    var deadline = Date.now() + timeoutMs;
+
+    (function poll() {
+        var options = vm.options;
+        for (var i = 0; i < options.length; i++) {
+            if (options[i].value === value) {
+                vm.handleOptionClick(options[i]);
+                return done(String(options[i].currentLabel || options[i].label || value));
+            }
+        }
+        if ((options.length && !vm.loading) || Date.now() > deadline) return done(null);
+        setTimeout(poll, 20);
+    })();
+    """
+
+    # 授权表单的公共脚本函数：按表单项标签找到 el-select，按值（目录直选）或关键词查找选项并调用
+    # 组件自身的选项点击处理（与用户点击等价，会触发角色变化后加载安装师傅列表等联动）；
+    # 全部选择后核对组件值与输入框显示一致，再调用 el-form 的 validate
+    JS_FORM_HELPERS = WaitEngine.JS_HELPERS + """
+    function labelOf(option) { return String(option.currentLabel || option.label || ''); }
+
+    function findForm(dialog) {
+        var forms = visibleNodes('.el-dialog__wrapper .el-form');
+        return dialog ? dialog.querySelector('.el-form') : forms[forms.length - 1];
+    }
+
+    function findSelect(form, label) {
+        var items = form.querySelectorAll('.el-form-item');
+        for (var i = 0; i < items.length; i++) {
+            var labelEl = items[i].querySelector('.el-form-item__label');
+            if (labelEl && labelEl.textContent.indexOf(label) !== -1) {
+                return items[i].querySelector('.el-select');
+            }
+        }
+        return null;
+    }
+
+    function findOption(vm, step) {
+        var match = null;
+        for (var i = 0; i < vm.options.length; i++) {
+            var option = vm.options[i], label = labelOf(option);
+            if (step.value !== null) {
+                if (option.value === step.value) return option;
+                continue;
+            }
+            if (!step.terms.every(function (term) { return label.indexOf(term) !== -1; })) continue;
+            if (label.trim() === step.text) return option;
+            match = match || option;
+        }
+        return match;
+    }
+
+    // 选择一项：选项尚未出现时返回 null（调用方继续等待），失败返回 {ok: false, reason}，
+    // 选中返回 {ok: true, label, value}；按值选择而选项已加载但其中没有该值时立即失败
+    function pickStep(form, step) {
+        var root = findSelect(form, step.label), vm = root && root.__vue__;
+        if (!root) return null;
+        if (!vm || !vm.options || !vm.handleOptionClick) {
+            return {ok: false, reason: '【' + step.label + '】下拉框没有 Vue 组件实例'};
+        }
+        var option = findOption(vm, step);
+        if (!option) {
+            if (step.value !== null && vm.options.length && !vm.loading) {
+                return {ok: false, reason: '【' + step.label + '】中已没有缓存的选项【' + step.text + '】'};
+            }
+            return null;
+        }
+        vm.handleOptionClick(option);
+        return {ok: true, label: labelOf(option), value: option.value};
+    }
+
+    function verifyForm(form, steps, chosen, done) {
+        for (var i = 0; i < chosen.length; i++) {
+            var root = findSelect(form, steps[i].label), vm = root && root.__vue__;
+            var input = root && root.querySelector('input');
+            if (!vm || vm.value !== chosen[i].value || !input || input.value !== chosen[i].label) {
+                return done({ok: false, reason: '【' + steps[i].label + '】组件值与界面显示不一致'});
+            }
+        }
+        form.__vue__.validate(function (valid) {
+            if (!valid || visibleNodes('.el-dialog__wrapper .el-form-item__error').length) {
+                return done({ok: false, reason: '表单校验未通过'});
+            }
+            done({ok: true, labels: chosen.map(function (item) { return item.label; })});
+        });
+    }
+    """
+
+    # 通过 Vue 组件一次填写授权表单（异步脚本）：在传入的对话框（未传入时取最后一个可见对话框）的表单内
+    # 按顺序选择各项，选项异步出现时等待到超时
+    JS_FAST_FILL = JS_FORM_HELPERS + """
+    var steps = arguments[0], timeoutMs = arguments[1], dialog = arguments[2];
+    var done = arguments[arguments.length - 1];
+    var deadline = Date.now() + timeoutMs;
+    var form = findForm(dialog);
+    if (!form || !form.__vue__ || !form.__vue__.validate) return done({ok: false, reason: '表单没有 Vue 组件实例'});
+    var index = 0, chosen = [];
+
+    function next() {
+        if (index === steps.length) return setTimeout(function () { verifyForm(form, steps, chosen, done); }, 20);
+        var step = steps[index], picked = pickStep(form, step);
+        if (picked === null) {
+            if (Date.now() > deadline) return done({ok: false, reason: '未找到【' + step.label + '】选项【' + step.text + '】'});
+            return setTimeout(next, 20);
+        }
+        if (!picked.ok) return done(picked);
+        chosen.push(picked);
+        index++;
+        next();
+    }
+
+    next();
+    """
+
+    # 单项选择（同步脚本，不等待）：多标签页模式把它作为就绪条件轮询，选项出现时即完成选择
+    JS_FILL_STEP = JS_FORM_HELPERS + """
+    var form = findForm(arguments[1]);
+    if (!form || !form.__vue__ || !form.__vue__.validate) return {ok: false, reason: '表单没有 Vue 组件实例'};
+    return pickStep(form, arguments[0]);
+    """
+
+    # 核对逐项选择的结果并校验表单（异步脚本，validate 通过回调返回）
+    JS_VERIFY_FORM = JS_FORM_HELPERS + """
+    var done = arguments[arguments.length - 1];
+    verifyForm(findForm(arguments[2]), arguments[0], arguments[1], done);
+    """
+
+    # 热循环判定：仍在目标详情页、【授权信息】标签已激活、没有打开的对话框且加载已结束
+    JS_WARM_READY = WaitEngine.JS_HELPERS + """
+    if (window.location.href.indexOf(arguments[0]) === -1) return false;
+    var tabs = document.querySelectorAll('.el-tabs__item.is-active');
+    var active = Array.prototype.some.call(tabs, function (tab) {
+        return tab.textContent.indexOf('授权信息') !== -1;
+    });
+    return active && visibleNodes('.el-dialog__wrapper').length === 0 &&
+           visibleNodes('.el-loading-mask').length === 0;
+    """
+
+    # 单次下拉选项查找的超时上限（毫秒）
+    PICK_OPTION_TIMEOUT_MS = 5000
+
+    def __init__(self, headless=False, wait_timeout=10, locator_cache_file=None, device_sn=DEFAULT_DEVICE_SN,
+                 session_file=None, base_url=DMS_BASE_URL, lean=False, capture_responses=None):
         """
         初始化
         :param headless: 是否无头模式运行
+        :param wait_timeout: 事件等待的默认超时上限（秒）
+        :param locator_cache_file: 定位器学习缓存文件路径，默认为脚本目录下的 locator_cache.json
+        :param device_sn: 门锁设备序列号
+        :param session_file: 登录态文件路径，默认为脚本目录下的 dms_session.json
+        :param base_url: DMS 地址（测试时可指向本地模拟服务）
+        :param lean: 使用性能浏览器配置（屏蔽图片/字体/统计脚本、eager 页面加载、精简渲染进程）
+        :param capture_responses: 是否从网络日志读取新增授权接口的响应判定结果，
+                                  None 表示接口路径已确认（DMS_API_CONFIG['create_path_confirmed']）时启用
         """
         # 目标页面URL（打开后会自动跳转到登录页）
-        self.target_url = "https://dms.kaadas.com/#/deviceList/detail/doorLockDetail/W5575A2401230AA1011195"
-        self.login_url = "https://dms.kaadas.com/#/login"
+        self.base_url = base_url.rstrip('/')
+        self.target_url = self.device_url(device_sn)
+        self.login_url = self.base_url + "/#/login"
 
         self.driver = None
-        self.wait = None
+        self.waiter = None
+        self.locator = None
+        self.scope = None
         self.headless = headless
-        self.ocr = CaptchaOCR()
+        self.lean = lean
+        self.wait_timeout = wait_timeout
+        self.locator_cache = LocatorCache(locator_cache_file)
+        self.session_store = SessionStore(session_file)
+        self._session_script_id = None
+        self.metrics = Instrumentation()
+        self.tracer = CommandTracer(self.metrics)
+        self.installers = InstallerDirectory()
+        if capture_responses is None:
+            capture_responses = DMS_API_CONFIG['create_path_confirmed']
+        self.capture_responses = capture_responses
+        # ResponseCapture 实例，未启用接口响应捕获时为 None
+        self.responses = None
+        # 最近一次授权操作的结果 {success, code, status, message, source}
+        self.last_outcome = None
+
+        # OCR 模型在后台线程加载，识别任务排在加载之后，与浏览器启动、表单填写并行
+        self._ocr_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ocr")
+        self._ocr_future = None
+        self.captcha_stats = CaptchaStats()
+
+    @property
+    def ocr(self):
+        """验证码识别器（首次访问时等待后台加载完成）"""
+        self.preload_ocr()
+        return self._ocr_future.result()
+
+    def preload_ocr(self):
+        """在后台线程开始加载 OCR 模型（重复调用无副作用）"""
+        if self._ocr_future is None:
+            self._ocr_future = self._ocr_executor.submit(
+                CaptchaOCR,
+                charset=CAPTCHA_CONFIG['charset'],
+                length=CAPTCHA_CONFIG['length'],
+                min_confidence=CAPTCHA_CONFIG['min_confidence'],
+            )
 
     def setup_driver(self):
         """配置并启动Chrome浏览器"""
+        # 没有可复用的登录态时大概率需要验证码登录，OCR 模型与浏览器启动并行加载；
+        # 有登录态时推迟到真正需要登录时再加载
+        if self.session_store.load() is None:
+            self.preload_ocr()
+
         chrome_options = Options()
 
         if self.headless:
-            chrome_options.add_argument("--headless")
+            chrome_options.add_argument("--headless=new")
 
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
 
+        if self.lean:
+            # DOMContentLoaded 后即返回，页面就绪由 WaitEngine 按真实状态判断
+            chrome_options.page_load_strategy = 'eager'
+            for argument in LEAN_PROFILE['chrome_args']:
+                chrome_options.add_argument(argument)
+        else:
+            chrome_options.add_argument("--window-size=1920,1080")
+
+        # 后台标签页不降频，多标签页并发时各标签页的定时器和渲染照常进行
+        chrome_options.add_argument("--disable-background-timer-throttling")
+        chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+        chrome_options.add_argument("--disable-renderer-backgrounding")
+
         # 防止被检测为自动化脚本
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option("useAutomationExtension", False)
 
-        service = Service(ChromeDriverManager().install())
+        # 只有启用接口响应捕获时才开启性能日志（记录全部网络事件有额外开销）
+        if self.capture_responses:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+        service = Service(DriverResolver().resolve())
         self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        self.driver.implicitly_wait(10)
-        self.wait = WebDriverWait(self.driver, 15)
+        # 不使用隐式等待：所有等待都由 WaitEngine / LocatorResolver 显式控制，
+        # 避免备选定位器每次未命中都白等10秒
+        self.driver.implicitly_wait(0)
+        # 异步脚本（下拉选项查找）自带超时，这里只作兜底
+        self.driver.set_script_timeout(self.wait_timeout + KaadasAutomation.PICK_OPTION_TIMEOUT_MS / 1000)
+        self.tracer.attach(self.driver)
+        self.waiter = WaitEngine(self.driver, timeout=self.wait_timeout)
+        self.locator = LocatorResolver(self.driver, self.waiter, cache=self.locator_cache)
+        self.scope = DialogScope(self.driver, self.waiter, self.locator)
+        if self.capture_responses:
+            self.responses = ResponseCapture(self.driver, DMS_API_CONFIG['create_path'])
+
+        self.apply_blocked_urls()
+
+        print(f"✅ 浏览器启动成功{'（性能配置）' if self.lean else ''}")
+
+    def apply_blocked_urls(self):
+        """
+        性能配置下屏蔽图片、字体等资源
+        Network.setBlockedURLs 只作用于当前标签页，新打开的标签页切换过去后需要再调用一次
+        """
+        if self.lean:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_PROFILE['blocked_urls']})
 
-        print("✅ 浏览器启动成功")
+    def device_url(self, device_sn):
+        """门锁详情页URL"""
+        return self.base_url + DOOR_LOCK_DETAIL_PATH.format(device_sn=device_sn)
 
+    @timed_step("open_target_page")
     def open_target_page(self):
         """
         打开目标页面（门锁详情页）
@@ -97,7 +2389,13 @@ class KaadasAutomation:
 
         self.driver.get(self.target_url)
         print(f"✅ 已打开: {self.target_url}")
-        time.sleep(3)
+
+        # 等待路由落定：跳转到登录页，或详情页内容已渲染
+        self.waiter.until_js("""
+            if (window.location.href.toLowerCase().indexOf('login') !== -1) return true;
+            return document.evaluate("//*[contains(text(),'授权信息')]", document, null,
+                                     XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null;
+        """)
 
         # 检查是否跳转到登录页
         current_url = self.driver.current_url
@@ -110,115 +2408,98 @@ class KaadasAutomation:
             print("✅ 已登录状态，无需重新登录")
             return False
 
+    @timed_step("login.analyze_inputs")
     def analyze_input_fields(self):
-        """分析页面上的所有输入框，精确定位"""
+        """分析页面上的所有输入框，精确定位（一次脚本调用完成分类）"""
         print("\n🔍 分析页面输入框...")
 
-        all_inputs = self.driver.find_elements(By.CSS_SELECTOR, "input.el-input__inner")
+        analysis = self.driver.execute_script(self.JS_ANALYZE_INPUTS)
+        fields = analysis['fields']
+        print(f"   找到 {len(fields)} 个输入框")
+        for i, (input_type, placeholder, is_displayed) in enumerate(fields):
+            print(f"   输入框{i + 1}: type='{input_type}', placeholder='{placeholder}', visible={is_displayed}")
 
-        if not all_inputs:
-            all_inputs = self.driver.find_elements(By.TAG_NAME, "input")
+        for name, title in (('username', "用户名框"), ('password', "密码框"), ('captcha', "验证码框")):
+            if analysis[name] is not None:
+                print(f"   ✅ {title}: 输入框{analysis[name + '_index'] + 1}")
 
-        print(f"   找到 {len(all_inputs)} 个输入框")
+        return analysis['username'], analysis['password'], analysis['captcha']
 
-        username_input = None
-        password_input = None
-        captcha_input = None
-
-        for i, inp in enumerate(all_inputs):
-            try:
-                input_type = inp.get_attribute('type') or ''
-                placeholder = inp.get_attribute('placeholder') or ''
-                is_displayed = inp.is_displayed()
-
-                print(f"   输入框{i + 1}: type='{input_type}', placeholder='{placeholder}', visible={is_displayed}")
-
-                if not is_displayed:
-                    continue
-
-                # 密码框
-                if input_type == 'password':
-                    password_input = inp
-                    print(f"   ✅ 密码框: 输入框{i + 1}")
-
-                # 用户名框或验证码框
-                elif input_type == 'text' or input_type == '':
-                    if '账号' in placeholder or '用户' in placeholder:
-                        username_input = inp
-                        print(f"   ✅ 用户名框: 输入框{i + 1}")
-                    elif '验证码' in placeholder or '码' in placeholder:
-                        captcha_input = inp
-                        print(f"   ✅ 验证码框: 输入框{i + 1}")
-                    elif username_input is None and password_input is None:
-                        username_input = inp
-                        print(f"   ✅ 用户名框(推断): 输入框{i + 1}")
-
-            except Exception as e:
-                continue
-
-        # 如果还没找到验证码框，取最后一个非密码框
-        if captcha_input is None:
-            visible_inputs = [inp for inp in all_inputs
-                              if inp.is_displayed() and inp.get_attribute('type') != 'password']
-            if len(visible_inputs) >= 3:
-                captcha_input = visible_inputs[-1]
-                print(f"   ✅ 验证码框(推断): 最后一个可见输入框")
+    def fill_inputs(self, pairs):
+        """
+        一次脚本调用填写多个输入框，并触发 Vue 需要的 input/change 事件
+        :param pairs: [(输入框元素, 值), ...]
+        :return: 填写后各输入框的实际值（快照，用于校验）
+        """
+        return self.driver.execute_script(self.JS_FILL_INPUTS, [[element, value] for element, value in pairs])
 
-        return username_input, password_input, captcha_input
+    def _recognize_captcha(self, captcha_src):
+        """识别验证码图片，返回 (验证码, 置信度)；不可信时验证码为 None"""
+        return self.ocr.solve_base64(captcha_src)
 
-    def get_captcha_code(self):
-        """获取并识别验证码"""
+    def _await_captcha(self, captcha_future):
+        """
+        等待后台识别结果；结果不可信时立即刷新验证码重新识别，而不是提交后等服务端拒绝
+        :return: (验证码, 置信度)；多次刷新仍不可信时验证码为 None
+        """
+        max_refreshes = CAPTCHA_CONFIG['max_refreshes']
+        for refresh in range(max_refreshes + 1):
+            captcha_code, confidence = captcha_future.result()
+            if captcha_code:
+                return captcha_code, confidence
+
+            self.captcha_stats.record(None, confidence, 'rejected')
+            # 最后一次结果仍不可信时不再刷新和识别（结果不会被使用），交给登录重试处理
+            if refresh == max_refreshes:
+                break
+            self.metrics.retry()
+            self.click_captcha_to_refresh()
+            captcha_src = self.get_captcha_src()
+            if not captcha_src:
+                break
+            captcha_future = self._ocr_executor.submit(self._recognize_captcha, captcha_src)
+
+        return None, None
+
+    @timed_step("login.captcha_image", failure=returned_none)
+    def get_captcha_src(self):
+        """获取验证码图片的 Base64 src"""
         try:
             print("\n🔄 获取验证码...")
 
-            captcha_img = None
             locators = [
-                (By.XPATH, "//img[contains(@src,'data:image')]"),
+                (By.XPATH, "//img[contains(@src,'data:image')][contains(@src,'base64')]"),
                 (By.XPATH, "//img[contains(@src,'base64')]"),
-                (By.CSS_SELECTOR, "img[src^='data:image']"),
+                (By.CSS_SELECTOR, "img[src^='data:image'][src*='base64']"),
             ]
 
-            for locator in locators:
-                try:
-                    elements = self.driver.find_elements(*locator)
-                    for elem in elements:
-                        src = elem.get_attribute('src') or ''
-                        if 'base64' in src and elem.is_displayed():
-                            captcha_img = elem
-                            print(f"   ✅ 找到验证码图片")
-                            break
-                    if captcha_img:
-                        break
-                except:
-                    continue
-
+            captcha_img, _ = self.locator.resolve(locators, step="captcha_image")
             if not captcha_img:
                 print("   ❌ 未找到验证码图片")
                 return None
+            print("   ✅ 找到验证码图片")
 
-            captcha_src = captcha_img.get_attribute('src')
-            captcha_code = self.ocr.recognize_base64(captcha_src)
-
-            if captcha_code:
-                captcha_code = re.sub(r'[^a-zA-Z0-9]', '', captcha_code)
-                return captcha_code
-
-            return None
+            return captcha_img.get_attribute('src')
 
         except Exception as e:
             print(f"   ❌ 获取验证码出错: {str(e)}")
             return None
 
+    @timed_step("login.captcha_refresh")
     def click_captcha_to_refresh(self):
         """点击验证码图片刷新"""
         try:
             captcha_img = self.driver.find_element(By.XPATH, "//img[contains(@src,'data:image')]")
+            old_src = captcha_img.get_attribute('src')
             captcha_img.click()
-            time.sleep(1)
-            print("   🔄 验证码已刷新")
+            if self.waiter.attribute_changed(captcha_img, 'src', old_src, timeout=3):
+                print("   🔄 验证码已刷新")
+            else:
+                print("   ⚠️ 验证码未在超时时间内刷新")
         except:
             pass
 
+    @timed_step("login", failure=returned_false)
     def login(self, username, password, max_attempts=3):
         """
         执行登录操作
@@ -227,6 +2508,8 @@ class KaadasAutomation:
         :param max_attempts: 最大尝试次数
         :return: 是否登录成功
         """
+        self.preload_ocr()
+
         for attempt in range(max_attempts):
             try:
                 print(f"\n{'=' * 60}")
@@ -234,76 +2517,53 @@ class KaadasAutomation:
                 print(f"{'=' * 60}")
 
                 if attempt > 0:
+                    self.metrics.retry()
                     self.click_captcha_to_refresh()
-                    time.sleep(1)
 
                 # 1. 分析并定位所有输入框
                 username_input, password_input, captcha_input = self.analyze_input_fields()
 
                 if not all([username_input, password_input, captcha_input]):
                     print("❌ 无法定位所有输入框")
-                    self.driver.refresh()
-                    time.sleep(2)
+                    self.refresh_login_page()
                     continue
 
-                # 2. 获取验证码
-                captcha_code = self.get_captcha_code()
-
-                if not captcha_code:
-                    print("❌ 无法识别验证码，刷新重试...")
+                # 2. 获取验证码图片，识别在后台线程进行
+                captcha_src = self.get_captcha_src()
+                if not captcha_src:
+                    print("❌ 无法获取验证码，刷新重试...")
                     self.click_captcha_to_refresh()
                     continue
+                captcha_future = self._ocr_executor.submit(self._recognize_captcha, captcha_src)
 
-                # 3. 清空并填写表单
-                username_input.clear()
-                password_input.clear()
-                captcha_input.clear()
-                time.sleep(0.3)
-
-                # 输入用户名
-                username_input.click()
-                time.sleep(0.2)
-                username_input.send_keys(username)
+                # 3. 识别进行的同时填写用户名和密码
+                actual = self.fill_inputs([(username_input, username), (password_input, password)])
                 print(f"✅ 已输入用户名: {username}")
-
-                # 输入密码
-                password_input.click()
-                time.sleep(0.2)
-                password_input.send_keys(password)
                 print(f"✅ 已输入密码: {'*' * len(password)}")
 
-                # 输入验证码
-                captcha_input.click()
-                time.sleep(0.2)
-                captcha_input.send_keys(captcha_code)
-                print(f"✅ 已输入验证码: {captcha_code}")
+                captcha_code, confidence = self._await_captcha(captcha_future)
+                if not captcha_code:
+                    # 下一次登录尝试开始时会刷新验证码
+                    print("❌ 无法识别验证码，刷新重试...")
+                    continue
 
-                time.sleep(0.5)
+                actual += self.fill_inputs([(captcha_input, captcha_code)])
+                print(f"✅ 已输入验证码: {captcha_code}")
 
-                # 4. 验证输入是否正确
-                actual_captcha = captcha_input.get_attribute('value')
-                if actual_captcha != captcha_code:
-                    print("⚠️ 验证码输入异常，重试...")
-                    self.driver.refresh()
-                    time.sleep(2)
+                # 4. 用填写返回的快照验证输入是否正确
+                if actual != [username, password, captcha_code]:
+                    print("⚠️ 表单输入异常，重试...")
+                    self.refresh_login_page()
                     continue
 
                 # 5. 点击登录按钮
-                login_button = None
                 button_locators = [
                     (By.XPATH, "//button[contains(.,'登录')]"),
                     (By.XPATH, "//button[contains(.,'登 录')]"),
                     (By.XPATH, "//button[.//span[contains(text(),'登')]]"),
                     (By.CSS_SELECTOR, "button.el-button--primary"),
                 ]
-
-                for locator in button_locators:
-                    try:
-                        login_button = self.driver.find_element(*locator)
-                        if login_button and login_button.is_displayed():
-                            break
-                    except:
-                        continue
+                login_button, _ = self.locator.resolve(button_locators, step="login_button")
 
                 if login_button:
                     login_button.click()
@@ -312,25 +2572,33 @@ class KaadasAutomation:
                     print("❌ 未找到登录按钮")
                     continue
 
-                # 6. 验证登录结果
-                time.sleep(3)
+                # 6. 验证登录结果：等待离开登录页，或出现错误提示
+                login_url = self.driver.current_url
+                self.waiter.until_js("""
+                    if (window.location.href !== arguments[0] &&
+                        window.location.href.toLowerCase().indexOf('login') === -1) return true;
+                    return visibleNodes('.el-message').length > 0;
+                """, login_url)
 
                 current_url = self.driver.current_url
                 print(f"\n📍 当前URL: {current_url}")
 
                 if "login" not in current_url.lower():
+                    self.captcha_stats.record(captcha_code, confidence, 'accepted')
                     print("\n" + "🎉" * 20)
                     print("       登录成功！")
                     print("🎉" * 20)
+                    self._print_captcha_summary()
                     return True
 
+                self.captcha_stats.record(captcha_code, confidence, 'server_rejected')
+
                 # 检查错误提示
                 try:
-                    error_element = self.driver.find_element(
-                        By.XPATH,
-                        "//*[contains(@class,'el-message') or contains(@class,'error')]"
+                    error_element, _ = self.locator.resolve(
+                        ["//*[contains(@class,'el-message') or contains(@class,'error')]"]
                     )
-                    if error_element.is_displayed():
+                    if error_element:
                         print(f"⚠️ 提示信息: {error_element.text}")
                 except:
                     pass
@@ -338,29 +2606,172 @@ class KaadasAutomation:
             except Exception as e:
                 print(f"❌ 登录过程出错: {str(e)}")
                 self.take_screenshot(f"login_error_{attempt + 1}.png")
-                self.driver.refresh()
-                time.sleep(2)
+                self.refresh_login_page()
+
+        print("\n💔 登录失败，已达最大尝试次数")
+        return False
+
+    def _print_captcha_summary(self):
+        """打印验证码累计统计"""
+        summary = self.captcha_stats.summary()
+        if summary['submit_accuracy'] is not None:
+            print(f"📈 验证码累计: 提交 {summary['submitted']} 次, 成功登录 {summary['logins']} 次, "
+                  f"提交正确率 {summary['submit_accuracy'] * 100:.1f}%, "
+                  f"平均每次登录提交 {summary['attempts_per_login'] or 0:.2f} 次")
+
+    def refresh_login_page(self):
+        """刷新登录页并等待登录表单重新渲染"""
+        self.driver.refresh()
+        self.waiter.page_ready()
+        self.waiter.until_js("return visibleNodes('input[type=password]').length > 0;")
+
+    def export_session(self):
+        """导出当前登录态：cookies + localStorage + sessionStorage"""
+        storage = self.driver.execute_script("""
+            function dump(store) {
+                var data = {};
+                for (var i = 0; i < store.length; i++) {
+                    var key = store.key(i);
+                    data[key] = store.getItem(key);
+                }
+                return data;
+            }
+            return {origin: window.location.origin,
+                    local: dump(window.localStorage),
+                    session: dump(window.sessionStorage)};
+        """)
+        return {
+            'origin': storage['origin'],
+            'cookies': self.driver.get_cookies(),
+            'local_storage': storage['local'],
+            'session_storage': storage['session'],
+        }
+
+    def save_session(self):
+        """保存当前登录态，供后续运行和其它工作进程复用"""
+        try:
+            self.session_store.save(self.export_session())
+        except Exception as e:
+            print(f"⚠️ 导出登录态失败: {e}")
+
+    def restore_session(self):
+        """
+        在打开目标页面前恢复登录态
+        cookies 通过 CDP 直接写入；storage 通过新文档注入脚本写入，
+        这样无需先额外加载一次页面
+        :return: 是否有可恢复的登录态
+        """
+        data = self.session_store.load()
+        if not data:
+            return False
+
+        try:
+            cookies = []
+            for cookie in data.get('cookies', []):
+                item = {key: cookie[key] for key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly')
+                        if key in cookie}
+                if 'expiry' in cookie:
+                    item['expires'] = cookie['expiry']
+                if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+                    item['sameSite'] = cookie['sameSite']
+                cookies.append(item)
+            if cookies:
+                self.driver.execute_cdp_cmd("Network.setCookies", {'cookies': cookies})
+
+            script = """
+            (function (data) {
+                if (window.location.origin !== data.origin) return;
+                try {
+                    Object.keys(data.local).forEach(function (k) { localStorage.setItem(k, data.local[k]); });
+                    Object.keys(data.session).forEach(function (k) { sessionStorage.setItem(k, data.session[k]); });
+                } catch (e) {}
+            })(%s);
+            """ % json.dumps({
+                'origin': data.get('origin', self.base_url),
+                'local': data.get('local_storage', {}),
+                'session': data.get('session_storage', {}),
+            })
+            result = self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {'source': script})
+            self._session_script_id = result.get('identifier')
+            print("✅ 已恢复保存的登录态")
+            return True
+
+        except Exception as e:
+            print(f"⚠️ 恢复登录态失败: {e}")
+            return False
+
+    def _remove_session_script(self):
+        """移除登录态注入脚本，避免之后的刷新/重新登录被旧 token 覆盖"""
+        if self._session_script_id:
+            try:
+                self.driver.execute_cdp_cmd("Page.removeScriptToEvaluateOnNewDocument",
+                                            {'identifier': self._session_script_id})
+            except Exception:
+                pass
+            self._session_script_id = None
+
+    def ensure_logged_in(self, username, password, max_attempts=3):
+        """
+        打开目标页面，必要时登录，并等待详情页加载完成
+        优先恢复保存的登录态，只有被服务端拒绝时才走验证码登录
+        :return: 是否处于已登录状态
+        """
+        restored = self.restore_session()
+        need_login = self.open_target_page()
+        self._remove_session_script()
+
+        if need_login:
+            if restored:
+                print("⚠️ 保存的登录态已失效，重新登录")
+                self.session_store.clear()
+            if not self.login(username, password, max_attempts=max_attempts):
+                return False
+            self.save_session()
+
+        self.wait_for_page_load()
+        return True
+
+    def authorize_device(self, device_sn, **params):
+        """
+        切换到指定门锁的详情页并执行一次授权操作
+        :param device_sn: 门锁设备序列号
+        :param params: 授权参数（auth_type / role / installer / duration），未指定的使用 AUTH_DEFAULTS
+        :return: 操作是否成功
+        """
+        self.target_url = self.device_url(device_sn)
+        with self.metrics.span("page_ready"):
+            self.driver.get(self.target_url)
+            self.wait_for_page_load()
+
+        if "login" in self.driver.current_url.lower():
+            print("❌ 登录状态已失效")
+            return False
 
-        print("\n💔 登录失败，已达最大尝试次数")
-        return False
+        return self.perform_authorization_operation(**params)
 
+    @timed_step("wait_for_page_load")
     def wait_for_page_load(self):
         """等待页面加载完成"""
         print("\n⏳ 等待页面加载...")
-        time.sleep(3)
 
-        # 等待页面主要元素出现
-        try:
-            self.wait.until(
-                EC.presence_of_element_located((By.XPATH, "//*[contains(text(),'授权信息')]"))
-            )
+        # 等待页面主要元素出现且加载遮罩消失
+        if self.waiter.xpath_present("//*[contains(@class,'el-tabs__item')][contains(.,'授权信息')]",
+                                      timeout=15) and self.waiter.loading_done():
             print("✅ 页面加载完成")
-        except:
-            print("⚠️ 继续等待...")
-            time.sleep(2)
+        else:
+            print("⚠️ 页面加载超时，继续执行...")
 
-    def click_authorization_tab(self):
-        """点击授权信息标签"""
+    def authorization_tab_ready(self):
+        """当前页面是否可以直接点击【新增授权】（上一次操作后仍停留在授权信息标签）"""
+        fragment = self.target_url[len(self.base_url):]
+        return bool(self.waiter.until_js(self.JS_WARM_READY, fragment, timeout=0))
+
+    @timed_step("click_authorization_tab", failure=returned_false)
+    def click_authorization_tab(self, wait=True):
+        """
+        点击授权信息标签
+        :param wait: 是否等待标签激活及列表加载完成（多标签页模式由调度器负责等待）
+        """
         print(f"\n{'=' * 60}")
         print("🏷️ 步骤1: 点击【授权信息】标签")
         print(f"{'=' * 60}")
@@ -370,30 +2781,26 @@ class KaadasAutomation:
                 (By.XPATH, "//div[contains(@class,'el-tabs__item') and contains(text(),'授权信息')]"),
                 (By.XPATH, "//*[contains(@class,'el-tabs__item')][contains(.,'授权信息')]"),
                 (By.XPATH, "//div[@role='tab' and contains(text(),'授权信息')]"),
+            ]
+            # 兜底：任意包含该文字的元素（页面标题、表格内容等也可能匹配）
+            tab_fallbacks = [
                 (By.XPATH, "//*[text()='授权信息']"),
                 (By.XPATH, "//span[text()='授权信息']"),
                 (By.XPATH, "//*[contains(text(),'授权信息')]"),
             ]
 
-            tab_element = None
-            for locator in tab_locators:
-                try:
-                    tab_element = self.wait.until(
-                        EC.element_to_be_clickable(locator)
-                    )
-                    if tab_element:
-                        print(f"   找到标签元素: {locator}")
-                        break
-                except:
-                    continue
-
+            tab_element, index = self.locator.wait_resolve(tab_locators, enabled=True, step="authorization_tab",
+                                                           fallbacks=tab_fallbacks)
             if tab_element:
+                print(f"   找到标签元素: {(tab_locators + tab_fallbacks)[index]}")
                 # 滚动到元素可见
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tab_element)
-                time.sleep(0.5)
                 tab_element.click()
                 print("✅ 已点击【授权信息】标签")
-                time.sleep(2)
+                # 等待标签激活且授权列表加载完成
+                if wait:
+                    self.waiter.tab_active('授权信息')
+                    self.waiter.loading_done()
                 return True
             else:
                 print("❌ 未找到【授权信息】标签")
@@ -404,8 +2811,12 @@ class KaadasAutomation:
             print(f"❌ 点击授权信息标签失败: {str(e)}")
             return False
 
-    def click_add_authorization_button(self):
-        """点击新增授权按钮"""
+    @timed_step("click_add_authorization_button", failure=returned_false)
+    def click_add_authorization_button(self, wait=True):
+        """
+        点击新增授权按钮
+        :param wait: 是否等待对话框打开
+        """
         print(f"\n{'=' * 60}")
         print("➕ 步骤2: 点击【新增授权】按钮")
         print(f"{'=' * 60}")
@@ -416,27 +2827,24 @@ class KaadasAutomation:
                 (By.XPATH, "//button[.//span[contains(text(),'新增授权')]]"),
                 (By.XPATH, "//span[contains(text(),'新增授权')]/parent::button"),
                 (By.XPATH, "//*[contains(@class,'el-button') and contains(.,'新增授权')]"),
+            ]
+            # 兜底：其他“新增”主按钮
+            button_fallbacks = [
                 (By.XPATH, "//button[contains(@class,'el-button--primary')][contains(.,'新增')]"),
             ]
 
-            add_button = None
-            for locator in button_locators:
-                try:
-                    add_button = self.wait.until(
-                        EC.element_to_be_clickable(locator)
-                    )
-                    if add_button:
-                        print(f"   找到按钮元素: {locator}")
-                        break
-                except:
-                    continue
-
+            add_button, index = self.locator.wait_resolve(button_locators, enabled=True,
+                                                          step="add_authorization_button", fallbacks=button_fallbacks)
             if add_button:
+                print(f"   找到按钮元素: {(button_locators + button_fallbacks)[index]}")
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", add_button)
-                time.sleep(0.5)
+                # 即将打开新的对话框，之前缓存的查找范围作废
+                self.scope.reset()
                 add_button.click()
                 print("✅ 已点击【新增授权】按钮")
-                time.sleep(2)
+                # 等待对话框打开动画结束
+                if wait and not self.waiter.dialog_open():
+                    print("⚠️ 对话框未在超时时间内打开")
                 return True
             else:
                 print("❌ 未找到【新增授权】按钮")
@@ -447,6 +2855,7 @@ class KaadasAutomation:
             print(f"❌ 点击新增授权按钮失败: {str(e)}")
             return False
 
+    @timed_step(lambda label_text, *args, **kwargs: f"select_dropdown:{label_text}", failure=returned_false)
     def select_dropdown_by_label(self, label_text, option_text):
         """
         通过标签文本定位下拉框并选择选项
@@ -457,41 +2866,34 @@ class KaadasAutomation:
             print(f"\n   📌 {label_text} -> 选择【{option_text}】")
 
             # 定位包含标签的表单项
-            form_item = None
             form_item_locators = [
                 f"//label[contains(text(),'{label_text}')]/ancestor::div[contains(@class,'el-form-item')]",
                 f"//*[contains(text(),'{label_text}')]/ancestor::div[contains(@class,'el-form-item')]",
                 f"//div[contains(@class,'el-form-item')][.//label[contains(text(),'{label_text}')]]",
             ]
 
-            for xpath in form_item_locators:
-                try:
-                    form_item = self.driver.find_element(By.XPATH, xpath)
-                    if form_item:
-                        break
-                except:
-                    continue
+            form_item, _ = self.scope.find(form_item_locators, step="form_item")
 
             # 点击下拉框
             if form_item:
-                try:
-                    select_input = form_item.find_element(By.CSS_SELECTOR, ".el-select input.el-input__inner")
-                    select_input.click()
-                except:
-                    try:
-                        select_div = form_item.find_element(By.CSS_SELECTOR, ".el-select")
-                        select_div.click()
-                    except:
-                        form_item.click()
+                select_input, _ = self.locator.resolve([
+                    (By.CSS_SELECTOR, ".el-select input.el-input__inner"),
+                    (By.CSS_SELECTOR, ".el-select"),
+                ], root=form_item)
+                dropdown = select_input or form_item
             else:
                 # 备选方案
-                dropdown = self.driver.find_element(
-                    By.XPATH,
+                dropdown, _ = self.scope.find([
                     f"//*[contains(text(),'{label_text}')]/following::div[contains(@class,'el-select')][1]"
-                )
-                dropdown.click()
+                ])
+                if not dropdown:
+                    print(f"   ❌ 未找到【{label_text}】下拉框")
+                    return False
+            dropdown.click()
 
-            time.sleep(0.5)  # 减少等待时间
+            # 等待下拉面板展开，之后只在该下拉框自己的弹出层内查找选项
+            self.waiter.dropdown_open(timeout=3)
+            self.scope.popper(label_text, dropdown)
 
             # 选择选项
             option_locators = [
@@ -501,19 +2903,14 @@ class KaadasAutomation:
                 f"//span[contains(text(),'{option_text}')]/ancestor::li",
             ]
 
-            for xpath in option_locators:
-                try:
-                    options = self.driver.find_elements(By.XPATH, xpath)
-                    for opt in options:
-                        if opt.is_displayed():
-                            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", opt)
-                            time.sleep(0.2)  # 减少等待时间
-                            opt.click()
-                            print(f"   ✅ 已选择【{option_text}】")
-                            time.sleep(0.3)  # 减少等待时间
-                            return True
-                except:
-                    continue
+            opt, _ = self.scope.find(option_locators, timeout=3, popper=label_text, step="dropdown_option")
+            if opt:
+                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", opt)
+                opt.click()
+                print(f"   ✅ 已选择【{option_text}】")
+                # 等待下拉面板收起
+                self.waiter.dropdown_closed(timeout=3)
+                return True
 
             print(f"   ❌ 未找到选项【{option_text}】")
             return False
@@ -522,6 +2919,7 @@ class KaadasAutomation:
             print(f"   ❌ 选择 {label_text} 失败: {str(e)}")
             return False
 
+    @timed_step("select_installer", failure=returned_false)
     def select_installer(self, installer_name):
         """
         选择安装师傅（优化版 - 更快的查找和选择）
@@ -538,180 +2936,139 @@ class KaadasAutomation:
                 "//*[contains(text(),'安装师傅')]/following::div[contains(@class,'el-select')][1]//input",
                 "//input[@placeholder='请选择安装师傅']",
                 "//input[contains(@placeholder,'安装师傅')]",
-                "//input[contains(@placeholder,'选择')]",
             ]
+            # 兜底：任意“请选择”输入框，会先匹配到已渲染的授权类型等下拉框，只在上面的候选等满超时后使用
+            installer_fallbacks = ["//input[contains(@placeholder,'选择')]"]
 
-            dropdown = None
-            for xpath in installer_locators:
-                try:
-                    dropdown = self.driver.find_element(By.XPATH, xpath)
-                    if dropdown and dropdown.is_displayed():
-                        print(f"   找到下拉框: {xpath}")
-                        break
-                except:
-                    continue
-
-            if not dropdown:
+            # 安装师傅下拉框可能在选择角色后才渲染，给一个较短的等待上限
+            dropdown, index = self.scope.find(installer_locators, timeout=3, step="installer_dropdown",
+                                              fallbacks=installer_fallbacks)
+            if dropdown:
+                print(f"   找到下拉框: {(installer_locators + installer_fallbacks)[index]}")
+            else:
                 # 尝试点击对话框中的第三个下拉框
-                all_selects = self.driver.find_elements(By.CSS_SELECTOR, ".el-dialog .el-select")
+                all_selects = self.scope.find_all(".el-select")
                 print(f"   找到 {len(all_selects)} 个下拉框")
                 if len(all_selects) >= 3:
                     dropdown = all_selects[2]
 
-            if dropdown:
-                # 滚动到视图并点击
-                self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown)
-                time.sleep(0.2)  # 减少等待时间
-                dropdown.click()
-                time.sleep(0.3)  # 减少等待时间
-            else:
+            if not dropdown:
                 print("   ❌ 未找到安装师傅下拉框")
                 return False
 
-            # 等待下拉列表加载
-            time.sleep(0.2)
-            option_found = False
-
-            # 获取下拉列表容器
-            dropdown_wrapper = None
-            try:
-                dropdown_wrapper = self.driver.find_element(
-                    By.XPATH,
-                    "//div[contains(@class,'el-select-dropdown') and not(contains(@style,'display: none'))]"
-                )
-            except:
-                pass
-
-            # 优化策略1: 先尝试直接查找选项，不需要滚动
-            try:
-                option = self.driver.find_element(
-                    By.XPATH,
-                    f"//li[contains(@class,'el-select-dropdown__item')][contains(.,'{installer_name}')]"
-                )
-                if option.is_displayed():
-                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", option)
-                    time.sleep(0.1)  # 减少等待时间
-                    option.click()
-                    print(f"   ✅ 已选择【{installer_name}】(直接查找)")
-                    option_found = True
-            except:
-                pass
-
-            # 优化策略2: 如果直接查找失败，尝试JavaScript查找
-            if not option_found:
-                try:
-                    js_code = f"""
-                    var items = document.querySelectorAll('.el-select-dropdown__item');
-                    for (var i = 0; i < items.length; i++) {{
-                        if (items[i].textContent.includes('{installer_name}')) {{
-                            items[i].scrollIntoView({{block: 'center'}});
-                            items[i].click();
-                            return true;
-                        }}
-                    }}
-                    return false;
-                    """
-                    result = self.driver.execute_script(js_code)
-                    if result:
-                        print(f"   ✅ 已选择【{installer_name}】(JavaScript查找)")
-                        option_found = True
-                except:
-                    pass
-
-            # 优化策略3: 智能滚动查找（减少滚动次数，增加滚动步长）
-            if not option_found and dropdown_wrapper:
-                max_scroll = 8  # 减少滚动次数
-                scroll_step = 120  # 增加滚动步长
-
-                for scroll_count in range(max_scroll):
-                    try:
-                        option = self.driver.find_element(
-                            By.XPATH,
-                            f"//li[contains(@class,'el-select-dropdown__item')][contains(.,'{installer_name}')]"
-                        )
-                        if option.is_displayed():
-                            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", option)
-                            time.sleep(0.1)  # 减少等待时间
-                            option.click()
-                            print(f"   ✅ 已选择【{installer_name}】(滚动查找)")
-                            option_found = True
-                            break
-                    except:
-                        pass
-
-                    # 向下滚动列表（更大的步长）
-                    if dropdown_wrapper:
-                        try:
-                            scroll_element = dropdown_wrapper.find_element(By.CSS_SELECTOR, ".el-select-dropdown__wrap")
-                            self.driver.execute_script(f"arguments[0].scrollTop += {scroll_step};", scroll_element)
-                            time.sleep(0.1)  # 减少等待时间
-                        except:
-                            break
-
-            # 优化策略4: 最后尝试遍历所有选项
-            if not option_found:
-                all_options = self.driver.find_elements(
-                    By.XPATH,
-                    "//li[contains(@class,'el-select-dropdown__item')]"
-                )
-                for opt in all_options:
-                    try:
-                        if installer_name in opt.text:
-                            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", opt)
-                            time.sleep(0.1)  # 减少等待时间
-                            opt.click()
-                            print(f"   ✅ 已选择【{installer_name}】(遍历查找)")
-                            option_found = True
-                            break
-                    except:
-                        continue
+            # 会话级安装师傅目录：过期或未命中时重新读取一次，命中后按值直接选择；
+            # 缓存的选项已不在下拉框中时作废目录，重新读取后再选一次；目录不可用时直接点击选择
+            entry = self.installers.find(installer_name)
+            reloaded = False
+            while True:
+                if entry is None and not reloaded and self.installers.available():
+                    count = self.installers.load(self.driver, dropdown)
+                    reloaded = True
+                    print(f"   📇 安装师傅目录已加载: {count} 项（{self.installers.source}）")
+                    entry = self.installers.find(installer_name)
+                if entry is None or entry['value'] is None:
+                    break
+                picked = self.driver.execute_async_script(self.JS_SELECT_VALUE, dropdown, entry['value'],
+                                                          self.PICK_OPTION_TIMEOUT_MS)
+                if picked is not None:
+                    print(f"   ✅ 已选择【{picked}】(目录直选)")
+                    print(f"   ⏱️ 选择安装师傅耗时: {time.time() - start_time:.2f}秒")
+                    return True
+                if reloaded:
+                    break
+                print(f"   ⚠️ 目录中的【{entry['label']}】已不在下拉框中，重新读取目录")
+                self.metrics.retry()
+                self.installers.invalidate()
+                entry = None
+
+            # 滚动到视图并点击
+            self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", dropdown)
+            dropdown.click()
+
+            # 等待下拉列表展开
+            self.waiter.dropdown_open(timeout=3)
+
+            # 先用搜索框按手机号缩小列表，再在页面内一次完成查找和点击；
+            # 搜索未命中时清空搜索词，对完整列表逐页扫描一次
+            terms, search_text = self.installer_search_terms(entry['label'] if entry else installer_name)
+            picked = self._pick_option(dropdown, terms, search_text)
+            if picked is None and search_text:
+                self.metrics.retry()
+                picked = self._pick_option(dropdown, terms, "")
+
+            option_found = picked is not None
+            if option_found:
+                print(f"   ✅ 已选择【{picked}】")
+            else:
+                print(f"   ❌ 未找到安装师傅【{installer_name}】")
 
             # 计算执行时间
             end_time = time.time()
             execution_time = end_time - start_time
             print(f"   ⏱️ 选择安装师傅耗时: {execution_time:.2f}秒")
 
-            time.sleep(0.2)  # 减少等待时间
+            if option_found:
+                self.waiter.dropdown_closed(timeout=3)
             return option_found
 
         except Exception as e:
             print(f"   ❌ 选择安装师傅失败: {str(e)}")
             return False
 
-    def click_confirm_button(self):
-        """点击确定按钮（优化版）"""
+    @staticmethod
+    def installer_search_terms(installer_name):
+        """
+        拆分安装师傅名称
+        :param installer_name: 例如 "尹传清(18566227407)"
+        :return: (选项必须包含的关键词列表, 搜索框输入内容)；有手机号时按手机号搜索
+        """
+        name, phone = InstallerDirectory.parse(installer_name)
+        if phone:
+            return [term for term in (name, phone) if term], phone
+        return [installer_name], installer_name
+
+    def _pick_option(self, select_input, terms, search_text):
+        """
+        在展开的下拉面板中选择包含全部关键词的选项
+        :param select_input: 下拉框的输入框（可搜索时向其输入 search_text）
+        :param terms: 选项文本必须包含的关键词
+        :param search_text: 搜索框输入内容，空字符串表示清空搜索
+        :return: 选中选项的文本，未找到返回 None
+        """
+        return self.driver.execute_async_script(self.JS_PICK_OPTION, select_input, terms, search_text,
+                                                self.PICK_OPTION_TIMEOUT_MS)
+
+    @timed_step("click_confirm_button", failure=returned_false)
+    def click_confirm_button(self, wait=True):
+        """
+        点击确定按钮（优化版）
+        :param wait: 是否等待对话框关闭（提交完成）
+        """
         try:
-            print(f"\n   📌 点击【确定】按钮")
+            print("\n   📌 点击【确定】按钮")
 
-            # 等待一下，确保表单数据填写完成
-            time.sleep(0.5)  # 减少等待时间
+            # 确保下拉面板已收起、表单没有处于加载状态
+            self.waiter.dropdown_closed(timeout=3)
+            self.waiter.loading_done(timeout=3)
 
             confirm_locators = [
                 "//div[contains(@class,'el-dialog')]//button[contains(.,'确定')]",
                 "//div[contains(@class,'el-dialog')]//button[contains(.,'确 定')]",
-                "//div[contains(@class,'el-dialog__footer')]//button[contains(@class,'el-button--primary')]",
                 "//span[text()='确定']/parent::button",
                 "//span[text()='确 定']/parent::button",
+            ]
+            # 兜底：按位置/样式匹配的按钮，不看按钮文字
+            confirm_fallbacks = [
+                "//div[contains(@class,'el-dialog__footer')]//button[contains(@class,'el-button--primary')]",
                 "//div[@class='el-dialog__footer']//button[2]",  # 通常确定是第二个按钮
             ]
 
-            confirm_button = None
-            for xpath in confirm_locators:
-                try:
-                    buttons = self.driver.find_elements(By.XPATH, xpath)
-                    for btn in buttons:
-                        if btn.is_displayed() and btn.is_enabled():
-                            confirm_button = btn
-                            print(f"   找到按钮: {xpath}")
-                            break
-                    if confirm_button:
-                        break
-                except:
-                    continue
-
+            confirm_button, index = self.scope.find(confirm_locators, timeout=3, enabled=True,
+                                                    step="confirm_button", fallbacks=confirm_fallbacks)
             if not confirm_button:
                 print("   ❌ 未找到确定按钮")
                 return False
+            print(f"   找到按钮: {(confirm_locators + confirm_fallbacks)[index]}")
 
             # ========== 多种点击方式尝试 ==========
             click_success = False
@@ -719,7 +3076,6 @@ class KaadasAutomation:
             # 方式1：滚动到元素并常规点击
             try:
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", confirm_button)
-                time.sleep(0.3)  # 减少等待时间
                 confirm_button.click()
                 click_success = True
                 print("   ✅ 方式1(常规点击)成功")
@@ -728,6 +3084,7 @@ class KaadasAutomation:
 
             # 方式2：JavaScript点击
             if not click_success:
+                self.metrics.retry()
                 try:
                     self.driver.execute_script("arguments[0].click();", confirm_button)
                     click_success = True
@@ -737,6 +3094,7 @@ class KaadasAutomation:
 
             # 方式3：ActionChains点击
             if not click_success:
+                self.metrics.retry()
                 try:
                     actions = ActionChains(self.driver)
                     actions.move_to_element(confirm_button).click().perform()
@@ -746,8 +3104,14 @@ class KaadasAutomation:
                     print(f"   ⚠️ 方式3失败: {e}")
 
             if click_success:
-                time.sleep(0.5)  # 减少等待时间
                 print("   ✅ 已点击确定按钮")
+                # 等待对话框关闭（提交完成），出现表单校验错误时立即结束等待
+                if wait:
+                    self.waiter.until_js(self.JS_SUBMIT_SETTLED)
+                    if self.waiter.dialog_closed(timeout=0):
+                        self.scope.reset()
+                    else:
+                        print("   ⚠️ 对话框未关闭，提交可能未成功")
                 return True
             else:
                 print("   ❌ 所有点击方式均失败")
@@ -757,9 +3121,15 @@ class KaadasAutomation:
             print(f"   ❌ 点击确定按钮失败: {str(e)}")
             return False
 
-    def perform_authorization_operation(self):
+    @timed_step("perform_authorization_operation", failure=returned_false)
+    def perform_authorization_operation(self, auth_type=AUTH_DEFAULTS['auth_type'], role=AUTH_DEFAULTS['role'],
+                                        installer=AUTH_DEFAULTS['installer'], duration=AUTH_DEFAULTS['duration']):
         """
         执行完整的授权操作
+        :param auth_type: 授权类型
+        :param role: 被授权人角色
+        :param installer: 安装师傅
+        :param duration: 授权时长
         返回: 操作是否成功
         """
         try:
@@ -767,21 +3137,36 @@ class KaadasAutomation:
             print("🔄 开始执行授权操作")
             print(f"{'=' * 60}")
 
-            # 1. 点击"授权信息"标签
-            if not self.click_authorization_tab():
+            # 1. 点击"授权信息"标签（上一次操作后仍停留在该标签时跳过）
+            if self.authorization_tab_ready():
+                print("\n♻️ 【授权信息】标签已激活，直接新增授权")
+            elif not self.click_authorization_tab():
                 print("❌ 无法点击授权信息标签")
                 return False
 
             # 2. 点击"新增授权"按钮
+            self.last_outcome = None
+            table_snapshot = self.waiter.mark_feedback()
+            if self.responses:
+                self.responses.reset()
             if not self.click_add_authorization_button():
                 print("❌ 无法点击新增授权按钮")
                 return False
 
             # 3. 填写授权表单
-            if not self.fill_authorization_form():
+            if not self.fill_authorization_form(auth_type=auth_type, role=role, installer=installer,
+                                                duration=duration):
                 print("❌ 填写授权表单失败")
                 return False
 
+            # 4. 以新增授权接口的返回判定结果
+            outcome = self.confirm_outcome(table_snapshot)
+            self.last_outcome = outcome
+            if not outcome['success']:
+                print(f"❌ 授权未成功: {outcome['message']}")
+                return False
+            print(f"✅ 服务端确认: {outcome['message']}")
+
             print("\n" + "🎉" * 20)
             print("       授权操作完成！")
             print("🎉" * 20)
@@ -793,53 +3178,144 @@ class KaadasAutomation:
             self.take_screenshot("authorization_operation_error.png")
             return False
 
-    def fill_authorization_form(self):
-        """填写新增授权表单"""
+    def fast_fill_steps(self, auth_type, role, installer, duration):
+        """
+        快速填写的各表单项（按页面联动顺序）；目录中有该安装师傅时按值选择
+        :return: [{label, text, terms, value}, ...]
+        """
+        entry = self.installers.find(installer)
+        installer_terms, _ = self.installer_search_terms(installer)
+        return [
+            {'label': "授权类型", 'text': auth_type, 'terms': [auth_type], 'value': None},
+            {'label': "被授权人角色", 'text': role, 'terms': [role], 'value': None},
+            {'label': "安装师傅", 'text': entry['label'] if entry else installer, 'terms': installer_terms,
+             'value': entry['value'] if entry else None},
+            {'label': "授权时长", 'text': duration, 'terms': [duration], 'value': None},
+        ]
+
+    @timed_step("fast_fill_form")
+    def fast_fill_form(self, auth_type, role, installer, duration):
+        """
+        通过 Vue 组件一次填写授权表单并校验
+        :return: 成功返回 True；页面没有组件实例、选项缺失或校验与界面不一致时返回 False
+        """
+        steps = self.fast_fill_steps(auth_type, role, installer, duration)
+        result = self.driver.execute_async_script(self.JS_FAST_FILL, steps, self.PICK_OPTION_TIMEOUT_MS,
+                                                  self.scope.dialog())
+        if result['ok']:
+            print(f"   ⚡ 快速填写完成: {' / '.join(result['labels'])}")
+        else:
+            print(f"   ⚠️ 快速填写未通过: {result['reason']}，改用逐项点击")
+            # 缓存的安装师傅选项可能已失效，逐项点击时重新读取目录
+            self.installers.invalidate()
+        return result['ok']
+
+    def confirm_outcome(self, table_snapshot, handle=None, timeout=None):
+        """
+        确认提交结果
+        表单校验未通过时直接返回；否则在同一个轮询循环里同时检查新增授权接口的响应（启用捕获时）
+        和界面信号（消息提示 / 授权列表刷新），先出现者为准，接口响应优先
+        :param table_snapshot: 打开对话框前 mark_feedback 返回的表格快照
+        :param handle: 多标签页时只认该标签页发出的请求
+        :param timeout: 等待响应和界面信号的上限（秒），默认 wait_timeout
+        :return: {success, code, status, message, source}
+        """
+        if timeout is None:
+            timeout = self.wait_timeout
+        form_errors = self.waiter.until_js("""
+            return visibleNodes('.el-dialog__wrapper .el-form-item__error').map(function (el) {
+                return el.textContent.trim();
+            }).join('；');
+        """, timeout=0)
+        if form_errors:
+            return {'success': False, 'code': None, 'status': None, 'message': form_errors, 'source': 'form'}
+
+        responses = self.responses
+        deadline = time.time() + timeout
+        while True:
+            if responses:
+                try:
+                    outcome = responses.result(handle)
+                except Exception as e:
+                    print(f"   ⚠️ 读取网络日志失败: {e}")
+                    responses = None
+                else:
+                    if outcome is not None:
+                        return outcome
+            settled = self.waiter.operation_settled(table_snapshot, timeout=0)
+            if settled or time.time() > deadline:
+                break
+            time.sleep(self.waiter.poll_frequency)
+
+        # 界面先落定时，响应通常也已写入网络日志，再取一次
+        if responses:
+            try:
+                outcome = responses.result(handle)
+            except Exception:
+                outcome = None
+            if outcome is not None:
+                return outcome
+
+        messages = {'success': "成功提示", 'table': "授权列表已刷新", 'error': "错误提示"}
+        return {'success': settled in ('success', 'table'), 'code': None, 'status': None,
+                'message': messages.get(settled, "未确认提交结果"), 'source': 'ui'}
+
+    @timed_step("fill_authorization_form", failure=returned_false)
+    def fill_authorization_form(self, wait_close=True, auth_type=AUTH_DEFAULTS['auth_type'],
+                                role=AUTH_DEFAULTS['role'], installer=AUTH_DEFAULTS['installer'],
+                                duration=AUTH_DEFAULTS['duration'], fast=True):
+        """
+        填写新增授权表单
+        :param wait_close: 点击确定后是否等待对话框关闭
+        :param auth_type: 授权类型
+        :param role: 被授权人角色
+        :param installer: 安装师傅
+        :param duration: 授权时长
+        :param fast: 先尝试通过 Vue 组件一次填写，失败时回退到逐项点击
+        """
         print(f"\n{'=' * 60}")
         print("📝 步骤3: 填写新增授权表单")
         print(f"{'=' * 60}")
 
         try:
-            # 等待对话框出现
-            self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".el-dialog__wrapper"))
-            )
-            time.sleep(0.5)  # 减少等待时间
+            # 等待对话框出现，并记下它作为后续查找的范围
+            if self.scope.dialog(timeout=15) is None:
+                raise TimeoutException("授权对话框未打开")
             print("✅ 授权对话框已打开")
 
+            if fast and self.fast_fill_form(auth_type, role, installer, duration):
+                self.click_confirm_button(wait=wait_close)
+                return True
+
             # ========== 第一步：授权类型选择"密码" ==========
             print("\n" + "-" * 40)
             print("第一步：授权类型")
             print("-" * 40)
-            self.select_dropdown_by_label("授权类型", "密码")
-            time.sleep(0.5)  # 减少等待时间
+            self.select_dropdown_by_label("授权类型", auth_type)
 
             # ========== 第二步：被授权人角色选择"安装师傅" ==========
             print("\n" + "-" * 40)
             print("第二步：被授权人角色")
             print("-" * 40)
-            self.select_dropdown_by_label("被授权人角色", "安装师傅")
-            time.sleep(0.5)  # 减少等待时间
+            self.select_dropdown_by_label("被授权人角色", role)
 
             # ========== 第三步：选择安装师傅 ==========
             print("\n" + "-" * 40)
             print("第三步：选择安装师傅")
             print("-" * 40)
-            self.select_installer("尹传清(18566227407)")
-            time.sleep(0.5)  # 减少等待时间
+            self.select_installer(installer)
 
             # ========== 第四步：授权时长选择"一个月" ==========
             print("\n" + "-" * 40)
             print("第四步：授权时长")
             print("-" * 40)
-            self.select_dropdown_by_label("授权时长", "一个月")
-            time.sleep(0.5)  # 减少等待时间
+            self.select_dropdown_by_label("授权时长", duration)
 
             # ========== 第五步：点击确定按钮 ==========
             print("\n" + "-" * 40)
             print("第五步：确认提交")
             print("-" * 40)
-            self.click_confirm_button()
+            self.click_confirm_button(wait=wait_close)
 
             return True
 
@@ -848,6 +3324,42 @@ class KaadasAutomation:
             self.take_screenshot("authorization_error.png")
             return False
 
+    def browser_stats(self):
+        """
+        页面就绪耗时与浏览器资源占用
+        :return: {page_ready_p50, page_ready_p95, dom_content_loaded_ms, load_ms, js_heap_mb, dom_nodes, rss_mb}
+                 page_ready_* 为切换设备详情页的耗时（秒）；rss_mb 需要安装 psutil，否则为 None
+        """
+        ready = sorted(record['duration'] for record in self.metrics.spans if record['name'] == "page_ready")
+        stats = {
+            'page_ready_p50': ready[len(ready) // 2] if ready else None,
+            'page_ready_p95': ready[min(len(ready) - 1, int(len(ready) * 0.95))] if ready else None,
+        }
+
+        timing = self.driver.execute_script("""
+            var nav = performance.getEntriesByType('navigation')[0];
+            return nav ? [nav.domContentLoadedEventEnd, nav.loadEventEnd] : [null, null];
+        """)
+        stats['dom_content_loaded_ms'] = round(timing[0]) if timing[0] else None
+        stats['load_ms'] = round(timing[1]) if timing[1] else None
+
+        self.driver.execute_cdp_cmd('Performance.enable', {})
+        metrics = {item['name']: item['value']
+                   for item in self.driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']}
+        stats['js_heap_mb'] = round(metrics.get('JSHeapUsedSize', 0) / 1024 / 1024, 1)
+        stats['dom_nodes'] = int(metrics.get('Nodes', 0))
+
+        # chromedriver 及其启动的 Chrome 进程树的常驻内存
+        stats['rss_mb'] = None
+        if psutil is not None:
+            try:
+                root = psutil.Process(self.driver.service.process.pid)
+                processes = [root] + root.children(recursive=True)
+                stats['rss_mb'] = round(sum(p.memory_info().rss for p in processes) / 1024 / 1024, 1)
+            except (psutil.Error, AttributeError):
+                pass
+        return stats
+
     def take_screenshot(self, filename="screenshot.png"):
         """截图保存"""
         try:
@@ -856,15 +3368,1113 @@ class KaadasAutomation:
         except Exception as e:
             print(f"⚠️ 截图失败: {e}")
 
+    def quit_browser(self):
+        """只关闭浏览器，保留 OCR、指标、安装师傅目录等会话级资源（之后可再次 setup_driver）"""
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"⚠️ 关闭浏览器失败: {e}")
+            self.driver = None
+
     def close(self):
         """关闭浏览器"""
+        self._ocr_executor.shutdown(wait=False)
+        self.tracer.report()
+        self.metrics.export()
         if self.driver:
-            self.driver.quit()
+            self.quit_browser()
             print("\n✅ 浏览器已关闭")
 
 
+class BrowserLifecycle:
+    """
+    浏览器生命周期管理
+    记录每次操作的耗时，并定期采样页面 JS 堆和渲染进程内存；超过阈值或浏览器失去响应时透明地重启浏览器：
+    先导出最新登录态，重启后直接恢复（不需要验证码登录），再继续执行后续任务
+    """
+
+    def __init__(self, bot, username, password, config=None):
+        """
+        :param bot: KaadasAutomation 实例
+        :param config: 覆盖 BROWSER_RECYCLE 中的阈值
+        """
+        self.bot = bot
+        self.username = username
+        self.password = password
+        self.config = dict(BROWSER_RECYCLE, **(config or {}))
+        self.durations = []   # 当前浏览器实例的操作耗时
+        self.recycles = 0
+
+    def start(self):
+        """启动浏览器并进入已登录状态"""
+        self.bot.setup_driver()
+        self.durations = []
+        if not self.bot.ensure_logged_in(self.username, self.password):
+            return False
+        try:
+            self.bot.driver.execute_cdp_cmd('Performance.enable', {})
+        except Exception:
+            pass
+        return True
+
+    def alive(self):
+        """浏览器是否仍可响应"""
+        try:
+            self.bot.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def memory(self):
+        """
+        采样内存
+        :return: (JS 堆 MB, 渲染进程常驻内存合计 MB)；无法获取的项为 None
+        """
+        heap_mb = rss_mb = None
+        try:
+            metrics = self.bot.driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+            heap = next((item['value'] for item in metrics if item['name'] == 'JSHeapUsedSize'), None)
+            heap_mb = heap / 1024 / 1024 if heap is not None else None
+        except Exception:
+            pass
+        if psutil is not None:
+            try:
+                root = psutil.Process(self.bot.driver.service.process.pid)
+                renderers = [p for p in root.children(recursive=True)
+                             if '--type=renderer' in ' '.join(p.cmdline())]
+                rss_mb = sum(p.memory_info().rss for p in renderers) / 1024 / 1024
+            except (psutil.Error, AttributeError):
+                pass
+        return heap_mb, rss_mb
+
+    def recycle_reason(self):
+        """检查阈值，需要重启时返回原因，否则返回 None"""
+        config = self.config
+        count = len(self.durations)
+        if count >= config['max_operations']:
+            return f"已执行 {count} 次操作"
+
+        window = config['latency_window']
+        if count >= 2 * window:
+            baseline = sorted(self.durations[:window])[window // 2]
+            recent = sorted(self.durations[-window:])[window // 2]
+            if recent > baseline * config['latency_factor']:
+                return f"操作耗时中位数 {recent:.2f}秒，基准 {baseline:.2f}秒"
+
+        if count % config['check_every'] == 0:
+            heap_mb, rss_mb = self.memory()
+            if heap_mb is not None and heap_mb > config['max_heap_mb']:
+                return f"JS 堆 {heap_mb:.0f}MB"
+            if rss_mb is not None and rss_mb > config['max_renderer_rss_mb']:
+                return f"渲染进程内存 {rss_mb:.0f}MB"
+        return None
+
+    def recycle(self, reason):
+        """保存登录态后重启浏览器并恢复登录"""
+        print(f"\n♻️ 重启浏览器（{reason}）")
+        if self.alive():
+            self.bot.save_session()
+        self.bot.quit_browser()
+        self.recycles += 1
+        if not self.start():
+            raise RuntimeError("浏览器重启后登录失败")
+
+    def run(self, operation, *args, **kwargs):
+        """
+        执行一次操作（例如 bot.authorize_device），结束后按阈值决定是否重启浏览器
+        :return: 操作的返回值
+        """
+        start_time = time.time()
+        try:
+            result = operation(*args, **kwargs)
+        except Exception:
+            if not self.alive():
+                self.recycle("浏览器无响应")
+            raise
+
+        self.durations.append(time.time() - start_time)
+        reason = self.recycle_reason()
+        if reason:
+            self.recycle(reason)
+        return result
+
+
+class BrowserDaemon:
+    """
+    常驻浏览器服务
+    预先启动若干个已登录、停在门锁详情页的浏览器，通过本机 HTTP 接口接收授权任务并同步返回结果，
+    省去每次运行时的驱动解析、浏览器启动、OCR 模型加载、页面加载和登录
+    """
+
+    def __init__(self, username, password, size=2, host="127.0.0.1", port=8766, headless=True, lean=True,
+                 token=None, job_timeout=120, keepalive=300):
+        """
+        :param size: 浏览器数量（可同时执行的任务数）
+        :param host: 监听地址，默认只允许本机访问
+        :param port: 监听端口，0 表示自动分配
+        :param token: 共享口令，客户端需在 X-Kaadas-Token 请求头中携带，None 表示不校验
+        :param job_timeout: 单个任务排队等待浏览器的上限（秒），超时未开始执行的任务被取消
+        :param keepalive: 浏览器空闲超过该秒数时重新打开详情页，保持登录态
+        """
+        self.username = username
+        self.password = password
+        self.size = size
+        self.headless = headless
+        self.lean = lean
+        self.token = token
+        self.job_timeout = job_timeout
+        self.keepalive = keepalive
+        self.jobs = queue.Queue()
+        self.slots = []
+        self.threads = []
+        self.completed = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        handler = type("DaemonHandler", (JsonServiceHandler,), {
+            'service': self,
+            'get_routes': {"/status": 'status'},
+            'post_routes': {"/authorize": 'authorize'},
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """并行预热所有浏览器，全部就绪（或失败）后开始接收任务"""
+        ready = threading.Semaphore(0)
+        for index in range(self.size):
+            thread = threading.Thread(target=self._worker, args=(index, ready), name=f"browser-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        for _ in range(self.size):
+            ready.acquire()
+        if not self.slots:
+            raise RuntimeError("没有可用的浏览器")
+        threading.Thread(target=self.httpd.serve_forever, name="daemon-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        """停止接收任务并关闭所有浏览器"""
+        self.stopping.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=30)
+
+    def _worker(self, index, ready):
+        """浏览器线程：预热后循环执行任务，空闲时定期保持登录态"""
+        bot = KaadasAutomation(headless=self.headless, lean=self.lean)
+        lifecycle = BrowserLifecycle(bot, self.username, self.password)
+        slot = {'name': f"browser-{index}", 'bot': bot, 'lifecycle': lifecycle, 'busy': False}
+        try:
+            warm = lifecycle.start()
+        except Exception as e:
+            print(f"❌ [{slot['name']}] 启动失败: {e}")
+            warm = False
+        if warm:
+            with self.lock:
+                self.slots.append(slot)
+            print(f"🔥 [{slot['name']}] 已就绪")
+        ready.release()
+
+        try:
+            while warm and not self.stopping.is_set():
+                try:
+                    item = self.jobs.get(timeout=self.keepalive)
+                except queue.Empty:
+                    self._keep_warm(slot)
+                    continue
+                if item is None:
+                    break
+                job, holder, done = item
+                with self.lock:
+                    # 排队超时的任务已答复客户端，不再执行（客户端可能已重新提交）
+                    if holder['state'] == 'cancelled':
+                        continue
+                    holder['state'] = 'running'
+                slot['busy'] = True
+                holder['result'] = self._execute(slot, job)
+                slot['busy'] = False
+                done.set()
+        finally:
+            bot.close()
+
+    def _keep_warm(self, slot):
+        """空闲时重新打开详情页（登录态失效时自动恢复或重新登录）"""
+        lifecycle = slot['lifecycle']
+        try:
+            if lifecycle.alive():
+                slot['bot'].ensure_logged_in(self.username, self.password)
+            else:
+                lifecycle.recycle("浏览器无响应")
+        except Exception as e:
+            print(f"⚠️ [{slot['name']}] 保持登录态失败: {e}")
+
+    def _execute(self, slot, job):
+        """执行一次授权；登录态失效时重新登录后重试一次"""
+        bot, lifecycle = slot['bot'], slot['lifecycle']
+        params = {key: job[key] for key in ('auth_type', 'role', 'installer', 'duration') if job.get(key)}
+        start_time = time.time()
+        try:
+            success = lifecycle.run(bot.authorize_device, job['device_sn'], **params)
+            if not success and bot.last_outcome is None and "login" in bot.driver.current_url.lower():
+                if bot.ensure_logged_in(self.username, self.password):
+                    success = lifecycle.run(bot.authorize_device, job['device_sn'], **params)
+            message = (bot.last_outcome or {}).get('message', "")
+        except Exception as e:
+            success, message = False, str(e)
+
+        with self.lock:
+            self.completed += 1
+        return {
+            'device_sn': job['device_sn'],
+            'success': success,
+            'message': message,
+            'duration': round(time.time() - start_time, 3),
+            'worker': slot['name'],
+        }
+
+    def authorize(self, payload):
+        """
+        提交一个授权任务并等待结果：{device_sn, installer?, auth_type?, role?, duration?} -> 结果字典
+        排队超过 job_timeout 仍未开始的任务被取消，不会在答复之后再执行；
+        已开始执行的任务（授权无法撤回）等待执行结束后如实返回结果
+        """
+        if not payload.get('device_sn'):
+            raise ValueError("缺少 device_sn")
+        holder, done = {'state': 'queued'}, threading.Event()
+        self.jobs.put((payload, holder, done))
+        if not done.wait(self.job_timeout):
+            with self.lock:
+                cancelled = holder['state'] == 'queued'
+                if cancelled:
+                    holder['state'] = 'cancelled'
+            if cancelled:
+                return {'device_sn': payload['device_sn'], 'success': False,
+                        'message': "排队超时，任务已取消（未执行）", 'duration': None, 'worker': None}
+            done.wait()
+        return holder['result']
+
+    def status(self, payload=None):
+        """浏览器数量、忙碌数、排队任务数和已完成任务数"""
+        with self.lock:
+            return {
+                'browsers': len(self.slots),
+                'busy': sum(1 for slot in self.slots if slot['busy']),
+                'queued': self.jobs.qsize(),
+                'completed': self.completed,
+            }
+
+
+class MultiTabRunner:
+    """
+    单浏览器多标签页并发
+    一个已登录的 KaadasAutomation 会话打开 N 个标签页分别处理不同门锁，
+    某个标签页等待对话框或接口返回时，驱动切换去推进其它标签页
+    """
+
+    # 以下为各等待点的就绪条件，在对应标签页内单次评估（不阻塞）
+    # 详情页就绪：新文档已加载（导航标记已消失）且授权信息标签已渲染；跳转到登录页也视为就绪
+    JS_DETAIL_READY = """
+    if (window.__kaadasNavigating) return false;
+    if (window.location.href.toLowerCase().indexOf('login') !== -1) return true;
+    if (document.readyState !== 'complete') return false;
+    var tabs = document.querySelectorAll('.el-tabs__item');
+    for (var i = 0; i < tabs.length; i++) {
+        if (tabs[i].textContent.indexOf('授权信息') !== -1) return visibleNodes('.el-loading-mask').length === 0;
+    }
+    return false;
+    """
+
+    JS_TAB_LOADED = """
+    var tabs = document.querySelectorAll('.el-tabs__item.is-active');
+    for (var i = 0; i < tabs.length; i++) {
+        if (tabs[i].textContent.indexOf('授权信息') !== -1) return visibleNodes('.el-loading-mask').length === 0;
+    }
+    return false;
+    """
+
+    JS_DIALOG_OPEN = """
+    var wrappers = visibleNodes('.el-dialog__wrapper');
+    for (var i = 0; i < wrappers.length; i++) {
+        if (!inTransition(wrappers[i])) return true;
+    }
+    return false;
+    """
+
+    # 在标签页内跳转到详情页；只有 hash 不同时强制刷新，保证详情组件重新加载
+    JS_NAVIGATE = """
+    var target = arguments[0];
+    window.__kaadasNavigating = true;
+    if (window.location.href.split('#')[0] === target.split('#')[0]) {
+        window.location.hash = target.split('#')[1] || '';
+        window.location.reload();
+    } else {
+        window.location.href = target;
+    }
+    """
+
+    def __init__(self, bot, tabs=3, step_timeout=None, poll_interval=0.05):
+        """
+        :param bot: 已登录的 KaadasAutomation 实例
+        :param tabs: 标签页数量
+        :param step_timeout: 单个等待点的超时上限（秒），默认使用 bot.wait_timeout
+        :param poll_interval: 所有标签页都未就绪时的轮询间隔（秒）
+        """
+        self.bot = bot
+        self.driver = bot.driver
+        self.tabs = tabs
+        self.step_timeout = step_timeout or bot.wait_timeout
+        self.poll_interval = poll_interval
+
+    def _open_tabs(self):
+        """打开标签页，返回全部窗口句柄（第一个为当前已登录的页面）"""
+        handles = [self.driver.current_window_handle]
+        for _ in range(self.tabs - 1):
+            self.driver.switch_to.new_window('tab')
+            self.bot.apply_blocked_urls()
+            handles.append(self.driver.current_window_handle)
+        self.driver.switch_to.window(handles[0])
+        return handles
+
+    def _flow(self, slot, handle):
+        """
+        单台门锁的授权流程（生成器）
+        每个 yield 交出一个就绪条件（JS 条件脚本，或不阻塞的 Python 函数），调度器在条件成立后再恢复执行；
+        返回值为 False（流程中断）或与单标签页相同的提交结果字典 {success, code, status, message, source}
+        :param slot: 标签页状态，流程使用其中的 device_sn / target_url / params（各标签页互不影响）
+        :param handle: 流程所在标签页的窗口句柄（区分各标签页的接口响应）
+        """
+        bot = self.bot
+        device_sn = slot['device_sn']
+        self.driver.execute_script(self.JS_NAVIGATE, slot['target_url'])
+        yield self.JS_DETAIL_READY
+
+        if "login" in self.driver.current_url.lower():
+            print(f"❌ [{device_sn}] 登录状态已失效")
+            return False
+
+        if not bot.click_authorization_tab(wait=False):
+            return False
+        yield self.JS_TAB_LOADED
+
+        table_snapshot = bot.waiter.mark_feedback()
+        if bot.responses:
+            bot.responses.reset(handle)
+        if not bot.click_add_authorization_button(wait=False):
+            return False
+        yield self.JS_DIALOG_OPEN
+
+        filled = yield from self._fill_form(slot['params'])
+        if not filled:
+            return False
+        yield KaadasAutomation.JS_SUBMIT_SETTLED
+
+        # 对话框已关闭时等到本标签页的新增授权接口返回（或界面出现结果信号），再按服务端返回判定
+        if bot.waiter.dialog_closed(timeout=0):
+            yield lambda: ((bot.responses and bot.responses.finished(handle))
+                           or bot.waiter.operation_settled(table_snapshot, timeout=0))
+        return bot.confirm_outcome(table_snapshot, handle=handle, timeout=1)
+
+    def _fill_form(self, params):
+        """
+        填写授权表单并点击确定（生成器，供 _flow 使用 yield from）
+        逐项把单项选择脚本作为就绪条件交给调度器：选项出现时即完成选择，等待期间去推进其他标签页；
+        某项超时或失败时回退到逐项点击（阻塞，只在页面异常时发生）
+        :param params: 授权参数 {auth_type, role, installer, duration}
+        :return: 是否已提交
+        """
+        bot = self.bot
+        dialog = bot.scope.dialog(timeout=0)
+        if dialog is None:
+            print("❌ 授权对话框未打开")
+            return False
+
+        steps = bot.fast_fill_steps(**params)
+        chosen = []
+        for step in steps:
+            picked = {'result': None}
+            deadline = time.time() + bot.PICK_OPTION_TIMEOUT_MS / 1000
+
+            def ready(step=step, picked=picked, deadline=deadline):
+                picked['result'] = self.driver.execute_script(KaadasAutomation.JS_FILL_STEP, step, dialog)
+                return picked['result'] is not None or time.time() > deadline
+
+            yield ready
+            result = picked['result'] or {'ok': False, 'reason': f"未找到【{step['label']}】选项【{step['text']}】"}
+            if not result['ok']:
+                break
+            chosen.append(result)
+        else:
+            result = self.driver.execute_async_script(KaadasAutomation.JS_VERIFY_FORM, steps, chosen, dialog)
+
+        if result['ok']:
+            print(f"   ⚡ 快速填写完成: {' / '.join(result['labels'])}")
+            return bot.click_confirm_button(wait=False)
+
+        print(f"   ⚠️ 快速填写未通过: {result['reason']}，改用逐项点击")
+        bot.installers.invalidate()
+        return bot.fill_authorization_form(wait_close=False, fast=False, **params)
+
+    def _advance(self, slot):
+        """推进标签页上的流程到下一个等待点；流程结束时返回结果字典"""
+        try:
+            slot['condition'] = slot['flow'].send(None)
+            slot['deadline'] = time.time() + self.step_timeout
+            return None
+        except StopIteration as stop:
+            outcome = stop.value
+            if isinstance(outcome, dict):
+                self.bot.last_outcome = outcome
+                success = outcome['success']
+                error = "" if success else outcome['message']
+            else:
+                success, error = bool(outcome), ""
+        except Exception as e:
+            success, error = False, str(e)
+
+        return {
+            'device_sn': slot['device_sn'],
+            'success': success,
+            'duration': round(time.time() - slot['start'], 2),
+            'error': error,
+        }
+
+    def run(self, jobs):
+        """
+        在多个标签页间交错执行授权
+        :param jobs: 设备序列号列表，或 load_jobs 返回的任务字典列表（各任务可以使用不同的授权参数）
+        :return: 逐设备结果列表
+        """
+        pending = [{'device_sn': job} if isinstance(job, str) else job for job in jobs]
+        handles = self._open_tabs()
+        slots = {handle: None for handle in handles}
+        current = handles[0]
+        results = []
+
+        while pending or any(slots.values()):
+            progressed = False
+
+            for handle in handles:
+                slot = slots[handle]
+                if slot is None and not pending:
+                    continue
+
+                if handle != current:
+                    self.driver.switch_to.window(handle)
+                    current = handle
+                    # 缓存的对话框属于之前的标签页
+                    self.bot.scope.reset()
+
+                if slot is None:
+                    job = pending.pop(0)
+                    slot = {'device_sn': job['device_sn'], 'target_url': self.bot.device_url(job['device_sn']),
+                            'params': {key: job.get(key) or default for key, default in AUTH_DEFAULTS.items()},
+                            'condition': None, 'deadline': 0, 'start': time.time()}
+                    slot['flow'] = self._flow(slot, handle)
+                    slots[handle] = slot
+                else:
+                    # 单次评估就绪条件，未就绪就去推进下一个标签页
+                    condition = slot['condition']
+                    try:
+                        if callable(condition):
+                            ready = condition()
+                        else:
+                            ready = self.driver.execute_script(WaitEngine.JS_HELPERS + condition)
+                    except Exception:
+                        ready = False
+                    if not ready:
+                        if time.time() < slot['deadline']:
+                            continue
+                        slot['flow'].close()
+                        result = {'device_sn': slot['device_sn'], 'success': False,
+                                  'duration': round(time.time() - slot['start'], 2), 'error': "等待超时"}
+                        results.append(result)
+                        slots[handle] = None
+                        self._report(result)
+                        progressed = True
+                        continue
+
+                result = self._advance(slot)
+                progressed = True
+                if result:
+                    results.append(result)
+                    slots[handle] = None
+                    self._report(result)
+
+            if not progressed:
+                time.sleep(self.poll_interval)
+
+        return results
+
+    @staticmethod
+    def _report(result):
+        """打印单台设备的结果"""
+        status = "✅" if result['success'] else "❌"
+        print(f"{status} [tab] {result['device_sn']} {result['duration']:.2f}秒 {result['error']}".rstrip())
+
+
+def batch_worker(worker_id, username, password, headless, task_queue, result_queue, lean=False):
+    """
+    批量模式工作进程：使用独立的Chrome实例，循环领取设备序列号执行授权
+    :param worker_id: 工作进程编号
+    :param task_queue: 设备序列号队列，收到 None 时退出
+    :param result_queue: 结果队列
+    :param lean: 使用性能浏览器配置
+    """
+    bot = KaadasAutomation(headless=headless, lean=lean)
+    lifecycle = BrowserLifecycle(bot, username, password)
+    try:
+        if not lifecycle.start():
+            result_queue.put({'event': 'login_failed', 'worker': worker_id})
+            return
+
+        while True:
+            device_sn = task_queue.get()
+            if device_sn is None:
+                break
+
+            start_time = time.time()
+            error = ""
+            try:
+                success = lifecycle.run(bot.authorize_device, device_sn)
+                if not success and bot.last_outcome:
+                    error = bot.last_outcome['message']
+            except Exception as e:
+                success = False
+                error = str(e)
+
+            result_queue.put({
+                'event': 'result',
+                'worker': worker_id,
+                'device_sn': device_sn,
+                'success': success,
+                'duration': round(time.time() - start_time, 2),
+                'error': error,
+            })
+
+        result_queue.put({'event': 'stats', 'worker': worker_id, 'stats': bot.browser_stats()})
+
+    except Exception as e:
+        result_queue.put({'event': 'worker_error', 'worker': worker_id, 'error': str(e)})
+
+    finally:
+        bot.close()
+        result_queue.put({'event': 'exit', 'worker': worker_id})
+
+
+def run_batch(device_sns, username, password, workers=4, headless=True, results_file=None, lean=False):
+    """
+    批量并行授权：多个工作进程各自启动Chrome，动态领取设备执行授权
+    :param device_sns: 设备序列号列表
+    :param workers: 工作进程数
+    :param results_file: 逐设备结果输出文件（JSON Lines），None 表示不输出
+    :param lean: 使用性能浏览器配置
+    :return: 逐设备结果列表
+    """
+    workers = max(1, min(workers, len(device_sns)))
+    # 在主进程解析一次 chromedriver 路径，工作进程通过环境变量继承，不再各自检测版本
+    os.environ.setdefault("CHROMEDRIVER_PATH", DriverResolver().resolve())
+    print(f"\n🚀 批量授权: {len(device_sns)} 台设备, {workers} 个工作进程")
+
+    task_queue = multiprocessing.Queue()
+    result_queue = multiprocessing.Queue()
+    for device_sn in device_sns:
+        task_queue.put(device_sn)
+    for _ in range(workers):
+        task_queue.put(None)
+
+    processes = []
+    for worker_id in range(workers):
+        process = multiprocessing.Process(
+            target=batch_worker,
+            args=(worker_id, username, password, headless, task_queue, result_queue, lean),
+        )
+        process.start()
+        processes.append(process)
+
+    start_time = time.time()
+    results = []
+    # 按次数计数：同一设备在列表中出现多次时每次都会执行授权，每次都要等到结果
+    pending = Counter(device_sns)
+    running = workers
+
+    # 收集结果，直到所有设备都有结果或所有工作进程退出
+    while pending and running:
+        try:
+            message = result_queue.get(timeout=1)
+        except queue.Empty:
+            running = sum(1 for p in processes if p.is_alive())
+            continue
+
+        if message['event'] == 'result':
+            pending[message['device_sn']] -= 1
+            if pending[message['device_sn']] <= 0:
+                del pending[message['device_sn']]
+            results.append(message)
+            status = "✅" if message['success'] else "❌"
+            print(f"{status} [worker-{message['worker']}] {message['device_sn']} "
+                  f"{message['duration']:.2f}秒 {message['error']}".rstrip())
+        elif message['event'] == 'exit':
+            running -= 1
+        elif message['event'] == 'stats':
+            stats = message['stats']
+            rss = f"{stats['rss_mb']}MB" if stats['rss_mb'] is not None else "未知（需要 psutil）"
+            print(f"📈 [worker-{message['worker']}] 页面就绪 p50 {stats['page_ready_p50'] or 0:.2f}秒, "
+                  f"JS堆 {stats['js_heap_mb']}MB, DOM节点 {stats['dom_nodes']}, 内存 {rss}")
+        else:
+            print(f"⚠️ [worker-{message['worker']}] {message['event']} {message.get('error', '')}".rstrip())
+
+    for device_sn in sorted(pending.elements()):
+        results.append({'event': 'result', 'worker': None, 'device_sn': device_sn,
+                        'success': False, 'duration': 0, 'error': "没有可用的工作进程"})
+
+    for process in processes:
+        process.join(timeout=10)
+
+    report_batch_results(results, time.time() - start_time, results_file)
+    return results
+
+
+def run_multi_tab(device_sns, username, password, tabs=3, headless=True, results_file=None, lean=False):
+    """
+    多标签页模式：一个浏览器、一次登录，多个标签页交错执行授权
+    :param device_sns: 设备序列号列表
+    :param tabs: 标签页数量
+    :param results_file: 逐设备结果输出文件（JSON Lines），None 表示不输出
+    :param lean: 使用性能浏览器配置
+    :return: 逐设备结果列表
+    """
+    tabs = max(1, min(tabs, len(device_sns)))
+    print(f"\n🚀 多标签页授权: {len(device_sns)} 台设备, {tabs} 个标签页")
+
+    bot = KaadasAutomation(headless=headless, lean=lean)
+    try:
+        bot.setup_driver()
+        if not bot.ensure_logged_in(username, password):
+            print("\n❌ 登录失败，终止批量授权")
+            return []
+
+        start_time = time.time()
+        results = MultiTabRunner(bot, tabs=tabs).run(device_sns)
+        report_batch_results(results, time.time() - start_time, results_file)
+        return results
+
+    finally:
+        bot.close()
+
+
+def report_batch_results(results, elapsed, results_file=None):
+    """打印批量授权统计（含吞吐量），并按需输出逐设备结果"""
+    success_count = sum(1 for r in results if r['success'])
+
+    print(f"\n{'=' * 60}")
+    print("📊 批量授权统计")
+    print(f"{'=' * 60}")
+    print(f"   设备总数: {len(results)}")
+    print(f"   成功: {success_count}")
+    print(f"   失败: {len(results) - success_count}")
+    print(f"   总耗时: {elapsed:.1f}秒")
+    print(f"   吞吐量: {success_count / elapsed * 60 if elapsed else 0:.1f} 次/分钟")
+
+    if results_file:
+        with open(results_file, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"   结果已保存: {results_file}")
+
+
+def browser_session(username, password, headless=True):
+    """
+    通过浏览器登录一次并导出登录态（ensure_logged_in 同时写入 SessionStore）
+    :return: 登录态字典；登录失败时返回 None
+    """
+    bot = KaadasAutomation(headless=headless)
+    try:
+        bot.setup_driver()
+        if not bot.ensure_logged_in(username, password):
+            return None
+        return bot.export_session()
+    finally:
+        bot.close()
+
+
+def run_api_batch(device_sns, username, password, concurrency=8, headless=True, results_file=None):
+    """
+    接口模式批量授权：复用保存的登录态（没有时先用浏览器登录一次），然后直接调用接口；
+    保存的 token 被服务端拒绝（401）时删除登录态文件，用浏览器重新登录一次后重试被拒绝的设备
+    :param device_sns: 设备序列号列表
+    :param concurrency: 并发请求数
+    :param results_file: 逐设备结果输出文件（JSON Lines），None 表示不输出
+    :return: 逐设备结果列表
+    """
+    store = SessionStore()
+    session_data = store.load()
+    logged_in = False
+    if not session_data:
+        print("\n🔑 没有可用的登录态，先通过浏览器登录")
+        session_data = browser_session(username, password, headless=headless)
+        logged_in = True
+        if not session_data:
+            print("\n❌ 登录失败，终止接口模式")
+            return []
+
+    client = DmsApiClient.from_session(session_data, pool_size=concurrency)
+    if not client:
+        return []
+
+    print(f"\n🚀 接口模式授权: {len(device_sns)} 台设备, 并发 {concurrency}")
+    start_time = time.time()
+    results = client.create_authorizations(device_sns, concurrency=concurrency)
+
+    rejected = [index for index, result in enumerate(results) if client.token_rejected(result)]
+    if rejected and not logged_in:
+        print(f"\n⚠️ 保存的登录态已被服务端拒绝（{len(rejected)} 台设备），通过浏览器重新登录后重试")
+        store.clear()
+        session_data = browser_session(username, password, headless=headless)
+        client = DmsApiClient.from_session(session_data, pool_size=concurrency) if session_data else None
+        if client:
+            retried = client.create_authorizations([results[index]['device_sn'] for index in rejected],
+                                                   concurrency=concurrency)
+            for index, result in zip(rejected, retried):
+                results[index] = result
+        else:
+            print("❌ 重新登录失败，被拒绝的设备不再重试")
+
+    for result in results:
+        status = "✅" if result['success'] else "❌"
+        print(f"{status} [api] {result['device_sn']} {result['duration']:.3f}秒 {result['message']}")
+
+    report_batch_results(results, time.time() - start_time, results_file)
+    return results
+
+
+# 任务文件表头 -> 任务字段（支持中文表头）
+JOB_FIELD_ALIASES = {
+    'device_sn': 'device_sn', 'sn': 'device_sn', '设备序列号': 'device_sn',
+    'installer': 'installer', '安装师傅': 'installer',
+    'auth_type': 'auth_type', '授权类型': 'auth_type',
+    'role': 'role', '被授权人角色': 'role',
+    'duration': 'duration', '授权时长': 'duration',
+}
+
+
+def load_jobs(path):
+    """
+    读取授权任务文件
+    CSV（带表头）、JSON（对象数组）或 JSON Lines（每行一个对象）；其他格式按设备序列号列表读取。
+    未填写的授权参数使用 AUTH_DEFAULTS
+    :return: 任务字典列表 {device_sn, installer, auth_type, role, duration}
+    :raises ValueError: 任务不是对象（错误信息包含 JSON 数组下标或 JSON Lines 行号）
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            records = list(csv.DictReader(f))
+    elif extension == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            raise ValueError(f"{path} 应为任务对象数组")
+    elif extension == '.jsonl':
+        records = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError(f"{path} 第 {number} 行应为任务对象，实际为 {type(record).__name__}")
+                records.append(record)
+    else:
+        records = [{'device_sn': device_sn} for device_sn in load_device_list(path)]
+
+    jobs = []
+    for index, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            raise ValueError(f"{path} 第 {index} 项（下标 {index - 1}）应为任务对象，实际为 {type(record).__name__}")
+        job = dict(AUTH_DEFAULTS)
+        for key, value in record.items():
+            field = JOB_FIELD_ALIASES.get((key or "").strip().lower())
+            if field and value is not None and str(value).strip():
+                job[field] = str(value).strip()
+        if job.get('device_sn'):
+            jobs.append(job)
+    return jobs
+
+
+def run_job_queue(jobs_file, username, password, headless=True, results_file=None, lean=False, db_path=None,
+                  commit_every=10, batch=""):
+    """
+    任务队列模式：任务导入 SQLite，逐个执行并提交状态（成功立即提交，失败按批提交）；
+    中断后用同样的命令重新运行，只执行未完成和失败的任务
+    :param jobs_file: 任务文件（CSV / JSON / JSON Lines），None 表示只处理队列中已有的任务
+    :param db_path: 队列数据库路径，默认为脚本目录下的 jobs.db
+    :param commit_every: 累计多少个失败结果提交一次
+    :param batch: 导入批次（批次内已成功的任务不再执行），重新授权时使用新的批次
+    :return: 本次执行的逐任务结果列表
+    """
+    job_queue = JobQueue(db_path, commit_every=commit_every)
+    if jobs_file:
+        jobs = load_jobs(jobs_file)
+        print(f"\n📥 读取任务 {len(jobs)} 个，新增 {job_queue.add(jobs, batch=batch)} 个")
+    recovered = job_queue.recover()
+    if recovered:
+        print(f"♻️ 上次未完成或失败的任务重新排队: {recovered} 个")
+    print(f"📋 队列状态: {job_queue.summary()}")
+
+    bot = KaadasAutomation(headless=headless, lean=lean)
+    lifecycle = BrowserLifecycle(bot, username, password)
+    results = []
+    start_time = time.time()
+    try:
+        if not lifecycle.start():
+            print("\n❌ 登录失败，终止任务队列")
+            return []
+
+        start_time = time.time()
+        while True:
+            jobs = job_queue.claim(commit_every)
+            if not jobs:
+                break
+            for job in jobs:
+                job_start = time.time()
+                try:
+                    success = lifecycle.run(bot.authorize_device, job['device_sn'], auth_type=job['auth_type'],
+                                            role=job['role'], installer=job['installer'], duration=job['duration'])
+                    error = "" if success else (bot.last_outcome or {}).get('message', "")
+                except Exception as e:
+                    success, error = False, str(e)
+
+                job_queue.complete(job['id'], success, error)
+                result = {'job_id': job['id'], 'device_sn': job['device_sn'], 'installer': job['installer'],
+                          'success': success, 'duration': round(time.time() - job_start, 2), 'error': error}
+                results.append(result)
+                status = "✅" if success else "❌"
+                print(f"{status} [job-{job['id']}] {job['device_sn']} {result['duration']:.2f}秒 {error}".rstrip())
+
+    finally:
+        job_queue.flush()
+        summary = job_queue.summary()
+        job_queue.close()
+        bot.close()
+
+    report_batch_results(results, time.time() - start_time, results_file)
+    print(f"📋 队列状态: {summary}")
+    return results
+
+
+def coordinator_worker(coordinator_url, worker, username, password, headless=True, lean=False, token=None):
+    """
+    分布式工作进程：从协调服务租用任务执行授权，后台线程定期心跳续约
+    :param coordinator_url: 协调服务地址
+    :param worker: 工作进程标识
+    :param token: 协调服务共享口令
+    """
+    client = CoordinatorClient(coordinator_url, worker, token=token)
+    bot = KaadasAutomation(headless=headless, lean=lean)
+    held = set()
+    stop = threading.Event()
+
+    def heartbeat_loop(interval):
+        while not stop.wait(interval):
+            job_ids = sorted(held)
+            if not job_ids:
+                continue
+            try:
+                renewed = set(client.heartbeat(job_ids)['renewed'])
+                for job_id in set(job_ids) - renewed:
+                    print(f"⚠️ [{worker}] 任务 {job_id} 租约已失效")
+            except Exception as e:
+                print(f"⚠️ [{worker}] 心跳失败: {e}")
+
+    lifecycle = BrowserLifecycle(bot, username, password)
+    heartbeat_thread = None
+    try:
+        if not lifecycle.start():
+            print(f"❌ [{worker}] 登录失败，退出")
+            return
+
+        while True:
+            response = client.lease(limit=1)
+            if heartbeat_thread is None:
+                heartbeat_thread = threading.Thread(target=heartbeat_loop, args=(response['lease_seconds'] / 3,),
+                                                    name="heartbeat", daemon=True)
+                heartbeat_thread.start()
+            if not response['jobs']:
+                # 其他工作进程手上还有任务时继续等待，它们失联后任务会重新分配
+                if response['remaining'] == 0:
+                    break
+                time.sleep(1)
+                continue
+
+            for job in response['jobs']:
+                held.add(job['id'])
+                job_start = time.time()
+                try:
+                    success = lifecycle.run(bot.authorize_device, job['device_sn'], auth_type=job['auth_type'],
+                                            role=job['role'], installer=job['installer'], duration=job['duration'])
+                    message = (bot.last_outcome or {}).get('message', "")
+                except Exception as e:
+                    success, message = False, str(e)
+                if not client.complete(job, success, message, round(time.time() - job_start, 2))['ok']:
+                    print(f"⚠️ [{worker}] 任务 {job['id']} 租约已失效，结果未被接受")
+                held.discard(job['id'])
+
+    except Exception as e:
+        print(f"❌ [{worker}] 工作进程异常: {e}")
+
+    finally:
+        stop.set()
+        bot.close()
+
+
+def start_coordinator_workers(coordinator_url, username, password, workers, headless=True, lean=False, token=None):
+    """在本机启动多个分布式工作进程"""
+    # 在主进程解析一次 chromedriver 路径，工作进程通过环境变量继承
+    os.environ.setdefault("CHROMEDRIVER_PATH", DriverResolver().resolve())
+    hostname = socket.gethostname()
+    processes = []
+    for index in range(workers):
+        process = multiprocessing.Process(
+            target=coordinator_worker,
+            args=(coordinator_url, f"{hostname}-{index}", username, password, headless, lean, token),
+        )
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def run_coordinator(jobs_file, username, password, port=8765, workers=0, headless=True, lean=False, db_path=None,
+                    results_file=None, token=None, lease_seconds=60, host="127.0.0.1", batch=""):
+    """
+    分布式模式（协调端）：启动任务协调服务，可同时在本机启动若干工作进程；
+    其他主机用 --join 加入。所有任务完成后退出
+    :param port: 协调服务端口
+    :param host: 监听地址，其他主机加入时使用 0.0.0.0 并设置 token
+    :param workers: 本机工作进程数，0 表示只负责分发
+    :param lease_seconds: 任务租约时长（秒）
+    :param batch: 导入批次（批次内已成功的任务不再执行）
+    :return: 本次执行的逐任务结果列表
+    """
+    if not token and not JsonServiceHandler.is_loopback(host):
+        print(f"❌ 监听 {host} 时必须使用 --token 设置共享口令")
+        return []
+
+    job_queue = JobQueue(db_path)
+    if jobs_file:
+        jobs = load_jobs(jobs_file)
+        print(f"\n📥 读取任务 {len(jobs)} 个，新增 {job_queue.add(jobs, batch=batch)} 个")
+    recovered = job_queue.recover()
+    if recovered:
+        print(f"♻️ 上次未完成或失败的任务重新排队: {recovered} 个")
+
+    coordinator = Coordinator(job_queue, host=host, port=port, lease_seconds=lease_seconds, token=token,
+                              results_file=results_file).start()
+    print(f"🛰️ 任务协调服务已启动: 端口 {coordinator.httpd.server_address[1]}, 租约 {lease_seconds}秒, "
+          f"队列状态 {job_queue.summary()}")
+
+    start_time = time.time()
+    processes = start_coordinator_workers(coordinator.url, username, password, workers, headless, lean, token)
+    try:
+        while True:
+            with coordinator.lock:
+                remaining = coordinator.remaining()
+            if remaining == 0:
+                break
+            # 本机工作进程全部退出且没有执行中的任务（远程工作进程也已空闲）时结束
+            if processes and not any(p.is_alive() for p in processes):
+                with coordinator.lock:
+                    running = job_queue.summary().get('running', 0)
+                if not running:
+                    print("⚠️ 本机工作进程已全部退出，仍有未完成任务")
+                    break
+            time.sleep(1)
+    finally:
+        for process in processes:
+            process.join(timeout=30)
+        coordinator.stop()
+        with coordinator.lock:
+            job_queue.flush()
+            summary = job_queue.summary()
+            job_queue.close()
+
+    report_batch_results(coordinator.results, time.time() - start_time)
+    print(f"📋 队列状态: {summary}")
+    return coordinator.results
+
+
+def run_join(coordinator_url, username, password, workers=1, headless=True, lean=False, token=None):
+    """分布式模式（工作端）：在本机启动若干工作进程加入协调服务，任务全部完成后退出"""
+    print(f"\n🛰️ 加入任务协调服务 {coordinator_url}，本机工作进程 {workers} 个")
+    for process in start_coordinator_workers(coordinator_url, username, password, workers, headless, lean, token):
+        process.join()
+
+
+def run_daemon(username, password, port=8766, size=2, headless=True, lean=True, token=None):
+    """常驻浏览器服务：预热浏览器池后持续接收授权任务，Ctrl+C 退出"""
+    start_time = time.time()
+    daemon = BrowserDaemon(username, password, size=size, port=port, headless=headless, lean=lean,
+                           token=token).start()
+    print(f"\n🛎️ 常驻浏览器服务已就绪: {daemon.url}（{len(daemon.slots)} 个浏览器，预热 {time.time() - start_time:.1f}秒）")
+    print("   提交任务: python kaadas_client.py <设备序列号>")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\n⏹️ 正在停止常驻浏览器服务...")
+    finally:
+        daemon.stop()
+
+
+def load_device_list(path):
+    """读取设备序列号列表（每行一个，忽略空行和 # 注释）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="凯迪仕DMS系统 - UI自动化测试")
+    parser.add_argument("--devices", help="批量模式：设备序列号列表文件（每行一个）")
+    parser.add_argument("--workers", type=int, default=4, help="批量模式工作进程数（默认4）")
+    parser.add_argument("--tabs", type=int, default=0,
+                        help="批量模式改用单浏览器多标签页并发，指定标签页数量（不再启动多个进程）")
+    parser.add_argument("--api", action="store_true",
+                        help="批量模式改用接口直连（复用登录态，--workers 作为并发请求数）")
+    parser.add_argument("--results", help="批量模式逐设备结果输出文件（JSON Lines）")
+    parser.add_argument("--jobs", help="任务队列模式：任务文件（CSV / JSON / JSON Lines，含设备序列号、安装师傅、授权类型、授权时长）")
+    parser.add_argument("--queue-db", help="任务队列数据库路径（默认 jobs.db），中断后重新运行即可续跑")
+    parser.add_argument("--batch", default="",
+                        help="任务导入批次：同一批次内已成功的任务不再执行，对同一设备重新授权时指定新的批次（如日期）")
+    parser.add_argument("--commit-every", type=int, default=10, help="任务队列每累计多少个失败结果提交一次（成功结果立即提交）")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="分布式模式：在指定端口启动任务协调服务（配合 --jobs，--workers 为本机工作进程数，可为0）")
+    parser.add_argument("--join", metavar="URL", help="分布式模式：以 --workers 个工作进程加入指定的任务协调服务")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="任务协调服务监听地址（默认只允许本机访问；其他主机加入时使用 0.0.0.0，并且必须设置 --token）")
+    parser.add_argument("--lease", type=int, default=60, help="分布式模式任务租约时长（秒）")
+    parser.add_argument("--daemon", type=int, metavar="PORT",
+                        help="常驻浏览器服务：在本机指定端口接收授权任务（--workers 为浏览器数量，默认使用性能浏览器配置）")
+    parser.add_argument("--token", default=os.environ.get("KAADAS_TOKEN"),
+                        help="分布式模式 / 常驻浏览器服务的共享口令（默认读取环境变量 KAADAS_TOKEN）")
+    parser.add_argument("--headless", action="store_true", help="无头模式运行")
+    parser.add_argument("--lean", action="store_true",
+                        help="性能浏览器配置：屏蔽图片/字体/统计脚本，eager 页面加载，精简渲染进程")
+    return parser.parse_args()
+
+
 def main():
     """主函数"""
+    args = parse_args()
+
     print("\n" + "=" * 60)
     print("      凯迪仕DMS系统 - UI自动化测试（优化版）")
     print("=" * 60)
@@ -879,27 +4489,53 @@ def main():
     print(f"   目标: 门锁授权操作（支持重复执行）")
     print(f"   优化: 提高选择安装师傅的速度")
 
+    # ========== 常驻浏览器服务 ==========
+    if args.daemon:
+        run_daemon(USERNAME, PASSWORD, port=args.daemon, size=args.workers, headless=args.headless,
+                   token=args.token)
+        return
+
+    # ========== 分布式模式 ==========
+    if args.serve:
+        run_coordinator(args.jobs, USERNAME, PASSWORD, port=args.serve, workers=args.workers,
+                        headless=args.headless, lean=args.lean, db_path=args.queue_db, results_file=args.results,
+                        token=args.token, lease_seconds=args.lease, host=args.host, batch=args.batch)
+        return
+    if args.join:
+        run_join(args.join, USERNAME, PASSWORD, workers=args.workers, headless=args.headless, lean=args.lean,
+                 token=args.token)
+        return
+
+    # ========== 任务队列模式 ==========
+    if args.jobs or args.queue_db:
+        run_job_queue(args.jobs, USERNAME, PASSWORD, headless=args.headless, results_file=args.results,
+                      lean=args.lean, db_path=args.queue_db, commit_every=args.commit_every, batch=args.batch)
+        return
+
+    # ========== 批量模式 ==========
+    if args.devices:
+        device_sns = load_device_list(args.devices)
+        if args.api:
+            run_api_batch(device_sns, USERNAME, PASSWORD,
+                          concurrency=args.workers, headless=args.headless, results_file=args.results)
+        elif args.tabs:
+            run_multi_tab(device_sns, USERNAME, PASSWORD,
+                          tabs=args.tabs, headless=args.headless, results_file=args.results, lean=args.lean)
+        else:
+            run_batch(device_sns, USERNAME, PASSWORD,
+                      workers=args.workers, headless=args.headless, results_file=args.results, lean=args.lean)
+        return
+
     # ========== 执行自动化测试 ==========
-    bot = KaadasAutomation(headless=False)
+    bot = KaadasAutomation(headless=args.headless, lean=args.lean)
+    lifecycle = BrowserLifecycle(bot, USERNAME, PASSWORD)
 
     try:
-        # 1. 启动浏览器
-        bot.setup_driver()
-
-        # 2. 打开目标页面（会自动跳转到登录页）
-        need_login = bot.open_target_page()
-
-        # 3. 如果需要登录，执行登录操作
-        if need_login:
-            login_success = bot.login(USERNAME, PASSWORD, max_attempts=3)
-
-            if not login_success:
-                print("\n❌ 登录失败，终止测试")
-                bot.take_screenshot("login_failed.png")
-                return
-
-        # 4. 等待页面加载（登录成功后会自动跳转到目标页面）
-        bot.wait_for_page_load()
+        # 1~4. 启动浏览器，打开目标页面，需要时登录，并等待页面加载
+        if not lifecycle.start():
+            print("\n❌ 登录失败，终止测试")
+            bot.take_screenshot("login_failed.png")
+            return
 
         # 5. 重复执行授权操作
         repeat_count = 3  # 设置重复执行次数
@@ -911,16 +4547,13 @@ def main():
             print(f"{'=' * 60}")
 
             # 执行授权操作
-            if bot.perform_authorization_operation():
+            if lifecycle.run(bot.perform_authorization_operation):
                 success_count += 1
                 print(f"✅ 第 {i + 1} 次授权操作成功")
 
-                # 操作间隔，避免过于频繁
-                if i < repeat_count - 1:  # 如果不是最后一次
-                    print(f"\n⏳ 等待3秒后执行下一次操作...")  # 减少等待时间
-                    time.sleep(3)  # 减少等待时间
             else:
-                print(f"❌ 第 {i + 1} 次授权操作失败")
+                reason = f": {bot.last_outcome['message']}" if bot.last_outcome else ""
+                print(f"❌ 第 {i + 1} 次授权操作失败{reason}")
                 # 截图保存失败状态
                 bot.take_screenshot(f"authorization_failed_{i + 1}.png")
 
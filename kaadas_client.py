@@ -0,0 +1,91 @@
+"""
+凯迪仕DMS系统 - 常驻浏览器服务客户端
+功能：向 create_pwd_repeat-optimize.py --daemon 启动的本机服务提交授权任务并等待结果
+      （只依赖标准库，不加载 selenium / OCR，启动开销很小）
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+DEFAULT_URL = os.environ.get("KAADAS_DAEMON_URL", "http://127.0.0.1:8766")
+
+
+def request(url, path, payload=None, token=None, timeout=600):
+    """
+    调用常驻浏览器服务
+    :param payload: 请求体字典，None 表示 GET 请求
+    :param timeout: 等待答复的上限（秒）；服务端只取消仍在排队的任务，已开始的授权会执行完再答复，
+                    这里留足余量，避免客户端先超时后重复提交
+    :return: 响应字典
+    """
+    headers = {'Content-Type': "application/json"}
+    if token:
+        headers['X-Kaadas-Token'] = token
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url.rstrip('/') + path, data=data, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return {'success': False, 'message': f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')}"}
+
+
+def authorize(device_sn, url=DEFAULT_URL, token=None, **params):
+    """
+    提交一个授权任务并等待结果
+    :param params: 授权参数（auth_type / role / installer / duration），未指定的由服务端使用默认值
+    :return: {device_sn, success, message, duration, worker}
+    """
+    payload = {'device_sn': device_sn}
+    payload.update({key: value for key, value in params.items() if value})
+    try:
+        result = request(url, "/authorize", payload, token=token)
+    except (OSError, ValueError) as e:
+        result = {'success': False, 'message': f"无法连接常驻浏览器服务: {e}"}
+    result.setdefault('device_sn', device_sn)
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="凯迪仕DMS系统 - 常驻浏览器服务客户端")
+    parser.add_argument("device_sns", nargs="*", help="门锁设备序列号（多个时并发提交）")
+    parser.add_argument("--installer", help="安装师傅，例如 尹传清(18566227407)")
+    parser.add_argument("--auth-type", help="授权类型")
+    parser.add_argument("--role", help="被授权人角色")
+    parser.add_argument("--duration", help="授权时长")
+    parser.add_argument("--url", default=DEFAULT_URL, help="服务地址（默认读取环境变量 KAADAS_DAEMON_URL）")
+    parser.add_argument("--token", default=os.environ.get("KAADAS_TOKEN"),
+                        help="共享口令（默认读取环境变量 KAADAS_TOKEN）")
+    parser.add_argument("--status", action="store_true", help="查看服务状态")
+    args = parser.parse_args()
+
+    if args.status or not args.device_sns:
+        try:
+            print(json.dumps(request(args.url, "/status", token=args.token), ensure_ascii=False, indent=2))
+        except (OSError, ValueError) as e:
+            print(f"❌ 无法连接常驻浏览器服务: {e}")
+            return 1
+        return 0
+
+    params = {'installer': args.installer, 'auth_type': args.auth_type, 'role': args.role,
+              'duration': args.duration}
+    with ThreadPoolExecutor(max_workers=len(args.device_sns)) as executor:
+        results = list(executor.map(
+            lambda device_sn: authorize(device_sn, url=args.url, token=args.token, **params), args.device_sns
+        ))
+
+    for result in results:
+        status = "✅" if result.get('success') else "❌"
+        duration = f"{result['duration']:.2f}秒" if result.get('duration') is not None else ""
+        print(f"{status} {result.get('device_sn')} {duration} {result.get('message', '')}".rstrip())
+    return 0 if all(result.get('success') for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,751 @@
+"""
+凯迪仕DMS系统 - 本地模拟服务
+功能：复现登录页（Base64验证码 + Element UI 输入框）和门锁详情页
+      （授权信息标签、新增授权对话框、el-select 下拉框、虚拟滚动的长安装师傅列表），
+      以及对应的后端接口，支持可配置的人为延迟
+用途：在不访问生产环境 dms.kaadas.com 的情况下调试和压测 KaadasAutomation
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import argparse
+import base64
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+
+
+# 选项取值与 create_pwd_repeat-optimize.py 中 DMS_API_CONFIG 的默认值保持一致
+AUTH_TYPES = [("密码", 1), ("指纹", 2), ("卡片", 3)]
+ROLES = [("管理员", 1), ("安装师傅", 2), ("普通用户", 3)]
+DURATIONS = [("一天", 4), ("一周", 5), ("一个月", 1), ("三个月", 3), ("永久", 0)]
+TARGET_INSTALLER = ("尹传清", "18566227407")
+
+# 5x7 点阵数字字体，用于生成验证码 PNG
+DIGIT_FONT = {
+    '0': ["01110", "10001", "10011", "10101", "11001", "10001", "01110"],
+    '1': ["00100", "01100", "00100", "00100", "00100", "00100", "01110"],
+    '2': ["01110", "10001", "00001", "00010", "00100", "01000", "11111"],
+    '3': ["11111", "00010", "00100", "00010", "00001", "10001", "01110"],
+    '4': ["00010", "00110", "01010", "10010", "11111", "00010", "00010"],
+    '5': ["11111", "10000", "11110", "00001", "00001", "10001", "01110"],
+    '6': ["00110", "01000", "10000", "11110", "10001", "10001", "01110"],
+    '7': ["11111", "00001", "00010", "00100", "01000", "01000", "01000"],
+    '8': ["01110", "10001", "10001", "01110", "10001", "10001", "01110"],
+    '9': ["01110", "10001", "10001", "01111", "00001", "00010", "01100"],
+}
+
+
+def render_captcha_png(code, scale=4, padding=8, spacing=6):
+    """把数字验证码渲染为灰度 PNG（纯标准库实现）"""
+    char_width, char_height = 5 * scale, 7 * scale
+    width = padding * 2 + len(code) * char_width + (len(code) - 1) * spacing
+    height = padding * 2 + char_height
+    pixels = bytearray([255] * (width * height))
+
+    for index, char in enumerate(code):
+        left = padding + index * (char_width + spacing)
+        for row, bits in enumerate(DIGIT_FONT[char]):
+            for col, bit in enumerate(bits):
+                if bit != '1':
+                    continue
+                for dy in range(scale):
+                    for dx in range(scale):
+                        y = padding + row * scale + dy
+                        x = left + col * scale + dx
+                        pixels[y * width + x] = 0
+
+    raw = b''.join(b'\x00' + bytes(pixels[y * width:(y + 1) * width]) for y in range(height))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw))
+            + chunk(b'IEND', b''))
+
+
+class MockDmsState:
+    """模拟服务的共享状态（线程安全）"""
+
+    def __init__(self, username, password, installer_count=2000, captcha_mode="strict"):
+        """
+        :param username: 允许登录的账号
+        :param password: 允许登录的密码
+        :param installer_count: 安装师傅列表长度（目标安装师傅位于列表末尾附近）
+        :param captcha_mode: strict 校验验证码；any 接受任意验证码（压测时排除 OCR 的影响）
+        """
+        self.username = username
+        self.password = password
+        self.captcha_mode = captcha_mode
+        self.lock = threading.Lock()
+        self.captchas = {}
+        self.tokens = set()
+        self.authorizations = {}
+        self.stats = {'logins': 0, 'login_failures': 0, 'authorizations': 0}
+
+        rng = random.Random(42)
+        surnames = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+        given = "伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚"
+        self.installers = []
+        for i in range(installer_count - 1):
+            name = rng.choice(surnames) + rng.choice(given) + rng.choice(given)
+            self.installers.append(f"{name}(13{rng.randint(100000000, 999999999)})")
+        # 目标安装师傅放在靠后位置，模拟需要滚动才能看到的场景
+        self.installers.insert(max(0, len(self.installers) - 5), "%s(%s)" % TARGET_INSTALLER)
+
+    def new_captcha(self):
+        """生成验证码，返回 (uuid, data URI)"""
+        code = ''.join(random.choice("0123456789") for _ in range(4))
+        captcha_id = uuid.uuid4().hex
+        with self.lock:
+            self.captchas[captcha_id] = code
+        image = base64.b64encode(render_captcha_png(code)).decode('ascii')
+        return captcha_id, "data:image/png;base64," + image
+
+    def login(self, username, password, code, captcha_id):
+        """校验登录，成功返回 token，失败返回 (None, 提示信息)"""
+        with self.lock:
+            expected = self.captchas.pop(captcha_id, None)
+            if self.captcha_mode != "any" and (expected is None or expected != code):
+                self.stats['login_failures'] += 1
+                return None, "验证码错误"
+            if username != self.username or password != self.password:
+                self.stats['login_failures'] += 1
+                return None, "账号或密码错误"
+            token = uuid.uuid4().hex
+            self.tokens.add(token)
+            self.stats['logins'] += 1
+            return token, "登录成功"
+
+    def is_valid_token(self, token):
+        with self.lock:
+            return token in self.tokens
+
+    def add_authorization(self, payload):
+        """新增授权，返回 (是否成功, 提示信息)"""
+        required = ['deviceSn', 'authType', 'roleType', 'installerPhone', 'duration']
+        missing = [field for field in required if payload.get(field) in (None, "")]
+        if missing:
+            return False, "缺少参数: " + ", ".join(missing)
+        with self.lock:
+            records = self.authorizations.setdefault(payload['deviceSn'], [])
+            records.append(dict(payload, id=len(records) + 1, createdAt=time.strftime('%Y-%m-%d %H:%M:%S')))
+            self.stats['authorizations'] += 1
+        return True, "新增授权成功"
+
+    def list_authorizations(self, device_sn):
+        with self.lock:
+            return list(self.authorizations.get(device_sn, []))
+
+
+class MockDmsHandler(BaseHTTPRequestHandler):
+    """HTTP 请求处理：单页应用 + JSON 接口"""
+
+    # 由 MockDmsServer 注入
+    state = None
+    latency = 0.0
+    jitter = 0.0
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        """静默访问日志，避免干扰压测输出"""
+        pass
+
+    def _delay(self):
+        """接口人为延迟"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send(self, status, body, content_type="application/json;charset=UTF-8"):
+        data = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload, ensure_ascii=False))
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError:
+            return {}
+
+    def _authorized(self):
+        token = self.headers.get("Authorization", "")
+        if self.state.is_valid_token(token):
+            return True
+        self._json({'code': 401, 'msg': "登录已过期，请重新登录"}, status=401)
+        return False
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if path in ("/", "/index.html"):
+            self._send(200, APP_HTML, "text/html;charset=UTF-8")
+            return
+
+        if path == "/api/captcha":
+            self._delay()
+            captcha_id, image = self.state.new_captcha()
+            self._json({'code': 200, 'data': {'uuid': captcha_id, 'img': image}})
+            return
+
+        if path == "/api/installers":
+            self._delay()
+            if self._authorized():
+                self._json({'code': 200, 'data': self.state.installers})
+            return
+
+        if path.startswith("/api/device/") and path.endswith("/authorizations"):
+            self._delay()
+            if self._authorized():
+                device_sn = path[len("/api/device/"):-len("/authorizations")]
+                self._json({'code': 200, 'data': self.state.list_authorizations(device_sn)})
+            return
+
+        if path == "/api/stats":
+            self._json({'code': 200, 'data': self.state.stats})
+            return
+
+        self._json({'code': 404, 'msg': "Not Found"}, status=404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        payload = self._read_json()
+
+        if path == "/api/login":
+            self._delay()
+            token, message = self.state.login(payload.get('username'), payload.get('password'),
+                                              payload.get('code'), payload.get('uuid'))
+            if token:
+                self._json({'code': 200, 'msg': message, 'data': {'token': token}})
+            else:
+                self._json({'code': 500, 'msg': message})
+            return
+
+        if path == "/api/device/authorization/add":
+            self._delay()
+            if self._authorized():
+                success, message = self.state.add_authorization(payload)
+                self._json({'code': 200 if success else 400, 'msg': message})
+            return
+
+        self._json({'code': 404, 'msg': "Not Found"}, status=404)
+
+
+class MockDmsServer:
+    """模拟服务封装，支持在当前进程的后台线程中启动（供压测脚本使用）"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0, installer_count=2000,
+                 captcha_mode="strict", username="18566227407", password="zh@8888"):
+        """
+        :param port: 监听端口，0 表示自动分配
+        :param latency_ms: 每个接口的固定延迟（毫秒）
+        :param jitter_ms: 额外随机延迟上限（毫秒）
+        :param installer_count: 安装师傅列表长度
+        :param captcha_mode: strict / any
+        """
+        self.state = MockDmsState(username, password, installer_count=installer_count, captcha_mode=captcha_mode)
+        handler = type("BoundMockDmsHandler", (MockDmsHandler,), {
+            'state': self.state,
+            'latency': latency_ms / 1000.0,
+            'jitter': jitter_ms / 1000.0,
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """在后台线程启动服务"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-dms", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """停止服务"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+APP_HTML = r"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="UTF-8">
+<title>DMS 模拟服务</title>
+<style>
+body { font-family: sans-serif; margin: 0; }
+.login { width: 360px; margin: 120px auto; }
+.el-input { margin-bottom: 12px; }
+.el-input__inner { width: 100%; box-sizing: border-box; height: 36px; padding: 0 10px; }
+.captcha-row { display: flex; gap: 8px; align-items: center; }
+.el-button { height: 36px; padding: 0 20px; cursor: pointer; }
+.el-button--primary { background: #409eff; color: #fff; border: none; }
+.el-tabs__header { display: flex; gap: 24px; border-bottom: 1px solid #ddd; padding: 0 20px; }
+.el-tabs__item { padding: 12px 0; cursor: pointer; }
+.el-tabs__item.is-active { color: #409eff; border-bottom: 2px solid #409eff; }
+.page { padding: 20px; position: relative; min-height: 400px; }
+.el-loading-mask { position: absolute; inset: 0; background: rgba(255,255,255,.8); }
+.el-dialog__wrapper { position: fixed; inset: 0; background: rgba(0,0,0,.4); }
+.el-dialog { width: 520px; margin: 80px auto; background: #fff; padding: 20px; }
+.el-form-item { display: flex; margin-bottom: 18px; }
+.el-form-item__label { width: 110px; }
+.el-form-item__content { flex: 1; position: relative; }
+.el-form-item__error { color: #f56c6c; font-size: 12px; position: absolute; top: 100%; }
+.el-select { width: 100%; }
+.el-dialog__footer { text-align: right; }
+.el-select-dropdown { position: absolute; background: #fff; border: 1px solid #ddd; z-index: 3000; }
+.el-select-dropdown__wrap { max-height: 274px; overflow-y: auto; }
+.el-select-dropdown__list { list-style: none; margin: 0; padding: 6px 0; }
+.el-select-dropdown__item { height: 34px; line-height: 34px; padding: 0 20px; cursor: pointer; white-space: nowrap; }
+.el-select-dropdown__item.selected { color: #409eff; font-weight: bold; }
+.el-message { position: fixed; top: 20px; left: 50%; transform: translateX(-50%); padding: 10px 20px;
+              background: #f0f9eb; border: 1px solid #e1f3d8; z-index: 4000; }
+.el-message--error { background: #fef0f0; border-color: #fde2e2; }
+</style>
+</head>
+<body>
+<div id="app"></div>
+<script>
+(function () {
+    var app = document.getElementById('app');
+    var TRANSITION_MS = 250;
+    var OPTIONS = {
+        authType: __AUTH_TYPES__,
+        roleType: __ROLES__,
+        duration: __DURATIONS__
+    };
+
+    function api(method, url, body) {
+        return fetch(url, {
+            method: method,
+            headers: {'Content-Type': 'application/json', 'Authorization': localStorage.getItem('token') || ''},
+            body: body ? JSON.stringify(body) : undefined
+        }).then(function (resp) {
+            return resp.json().then(function (data) {
+                if (resp.status === 401) {
+                    localStorage.removeItem('token');
+                    location.hash = '#/login?redirect=' + encodeURIComponent(location.hash.slice(1));
+                }
+                return data;
+            });
+        });
+    }
+
+    function message(text, type) {
+        var el = document.createElement('div');
+        el.className = 'el-message el-message--' + (type || 'success');
+        el.innerHTML = '<p class="el-message__content"></p>';
+        el.firstChild.textContent = text;
+        document.body.appendChild(el);
+        setTimeout(function () { el.remove(); }, 3000);
+    }
+
+    function transition(el, name, show, done) {
+        if (show) el.style.display = '';
+        el.classList.add(name + (show ? '-enter-active' : '-leave-active'));
+        setTimeout(function () {
+            el.classList.remove(name + (show ? '-enter-active' : '-leave-active'));
+            if (!show) el.style.display = 'none';
+            if (done) done();
+        }, TRANSITION_MS);
+    }
+
+    // ---------- el-select 模拟：下拉面板挂载到 body ----------
+    var openSelect = null;
+
+    // virtual 为 true 时只渲染可视区域附近的选项（模拟虚拟滚动的长列表）
+    var ITEM_HEIGHT = 34;
+
+    function createSelect(placeholder, filterable, virtual) {
+        var root = document.createElement('div');
+        root.className = 'el-select';
+        root.innerHTML = '<div class="el-input el-input--suffix"><input class="el-input__inner" autocomplete="off"></div>';
+        var input = root.querySelector('input');
+        input.placeholder = placeholder;
+        input.readOnly = !filterable;
+
+        var popper = document.createElement('div');
+        popper.className = 'el-select-dropdown el-popper';
+        popper.style.display = 'none';
+        popper.innerHTML = '<div class="el-scrollbar"><div class="el-select-dropdown__wrap el-scrollbar__wrap">' +
+                           '<ul class="el-select-dropdown__list"></ul></div></div>';
+        document.body.appendChild(popper);
+        var list = popper.querySelector('ul');
+        var wrap = popper.querySelector('.el-select-dropdown__wrap');
+
+        var select = {root: root, input: input, popper: popper, options: [], value: null, label: '',
+                      onChange: null, filter: ''};
+
+        select.setOptions = function (options) {
+            select.options = options;
+            select.render();
+        };
+        select.render = function () {
+            list.innerHTML = '';
+            var visible = select.options.filter(function (opt) {
+                return !select.filter || opt[0].indexOf(select.filter) !== -1;
+            });
+            var first = 0, last = visible.length;
+            if (virtual) {
+                first = Math.max(0, Math.floor(wrap.scrollTop / ITEM_HEIGHT) - 5);
+                last = Math.min(visible.length, first + Math.ceil(wrap.clientHeight / ITEM_HEIGHT) + 10);
+                list.style.paddingTop = (first * ITEM_HEIGHT + 6) + 'px';
+                list.style.paddingBottom = ((visible.length - last) * ITEM_HEIGHT + 6) + 'px';
+            }
+            visible.slice(first, last).forEach(function (opt) {
+                var li = document.createElement('li');
+                li.className = 'el-select-dropdown__item' + (opt[1] === select.value ? ' selected' : '');
+                li.innerHTML = '<span></span>';
+                li.firstChild.textContent = opt[0];
+                li.addEventListener('click', function (e) {
+                    e.stopPropagation();
+                    select.choose(opt);
+                });
+                list.appendChild(li);
+            });
+        };
+        select.choose = function (opt) {
+            select.value = opt[1];
+            select.label = opt[0];
+            input.value = opt[0];
+            select.filter = '';
+            select.close();
+            if (select.onChange) select.onChange(opt[1]);
+        };
+        select.open = function () {
+            if (openSelect && openSelect !== select) openSelect.close();
+            if (openSelect === select) return;
+            openSelect = select;
+            var rect = input.getBoundingClientRect();
+            popper.style.top = (rect.bottom + window.scrollY + 4) + 'px';
+            popper.style.left = (rect.left + window.scrollX) + 'px';
+            popper.style.minWidth = rect.width + 'px';
+            select.render();
+            transition(popper, 'el-zoom-in-top', true);
+        };
+        select.close = function () {
+            if (openSelect !== select) return;
+            openSelect = null;
+            if (select.label) input.value = select.label;
+            transition(popper, 'el-zoom-in-top', false);
+        };
+        select.reset = function () {
+            select.value = null;
+            select.label = '';
+            select.filter = '';
+            input.value = '';
+        };
+
+        // 模拟 Element UI el-select 组件实例（root.__vue__）中脚本会用到的部分
+        root.__vue__ = {
+            $el: root,
+            popperElm: popper,
+            get value() { return select.value; },
+            get options() {
+                return select.options.map(function (opt) {
+                    return {value: opt[1], label: opt[0], currentLabel: opt[0]};
+                });
+            },
+            handleOptionClick: function (option) { select.choose([option.currentLabel, option.value]); }
+        };
+
+        input.addEventListener('click', function (e) {
+            e.stopPropagation();
+            select.open();
+        });
+        input.addEventListener('input', function () {
+            if (!filterable) return;
+            select.filter = input.value;
+            if (openSelect !== select) select.open();
+            wrap.scrollTop = 0;
+            select.render();
+        });
+        if (virtual) wrap.addEventListener('scroll', function () { select.render(); });
+        return select;
+    }
+
+    document.addEventListener('click', function () {
+        if (openSelect) openSelect.close();
+    });
+
+    // ---------- 登录页 ----------
+    function renderLogin() {
+        app.innerHTML =
+            '<div class="login">' +
+            '<div class="el-input"><input class="el-input__inner" type="text" placeholder="请输入账号"></div>' +
+            '<div class="el-input"><input class="el-input__inner" type="password" placeholder="请输入密码"></div>' +
+            '<div class="captcha-row"><div class="el-input"><input class="el-input__inner" type="text" placeholder="请输入验证码"></div>' +
+            '<img class="captcha-img" alt="验证码"></div>' +
+            '<button class="el-button el-button--primary" type="button"><span>登 录</span></button>' +
+            '</div>';
+        var inputs = app.querySelectorAll('input');
+        var img = app.querySelector('img');
+        var captchaId = null;
+
+        function loadCaptcha() {
+            api('GET', '/api/captcha').then(function (resp) {
+                captchaId = resp.data.uuid;
+                img.src = resp.data.img;
+            });
+        }
+        img.addEventListener('click', loadCaptcha);
+        loadCaptcha();
+
+        app.querySelector('button').addEventListener('click', function () {
+            api('POST', '/api/login', {
+                username: inputs[0].value, password: inputs[1].value, code: inputs[2].value, uuid: captchaId
+            }).then(function (resp) {
+                if (resp.code === 200) {
+                    localStorage.setItem('token', resp.data.token);
+                    var match = location.hash.match(/redirect=([^&]+)/);
+                    location.hash = match ? decodeURIComponent(match[1]) : '#/deviceList';
+                } else {
+                    message(resp.msg, 'error');
+                    loadCaptcha();
+                }
+            });
+        });
+    }
+
+    // ---------- 门锁详情页 ----------
+    function renderDetail(deviceSn) {
+        app.innerHTML =
+            '<div class="el-tabs"><div class="el-tabs__header">' +
+            '<div class="el-tabs__item is-active" role="tab">基本信息</div>' +
+            '<div class="el-tabs__item" role="tab">授权信息</div></div></div>' +
+            '<div class="page"><div class="basic">设备序列号：<span class="sn"></span></div>' +
+            '<div class="auth" style="display:none">' +
+            '<button class="el-button el-button--primary" type="button"><span>新增授权</span></button>' +
+            '<table class="el-table"><thead><tr><th>ID</th><th>授权类型</th><th>安装师傅</th><th>创建时间</th></tr></thead>' +
+            '<tbody></tbody></table></div></div>';
+        app.querySelector('.sn').textContent = deviceSn;
+
+        var tabs = app.querySelectorAll('.el-tabs__item');
+        var page = app.querySelector('.page');
+        var authPane = app.querySelector('.auth');
+        var tbody = app.querySelector('tbody');
+
+        function withLoading(promise) {
+            var mask = document.createElement('div');
+            mask.className = 'el-loading-mask';
+            page.appendChild(mask);
+            return promise.then(function (result) { mask.remove(); return result; });
+        }
+
+        function loadAuthorizations() {
+            return withLoading(api('GET', '/api/device/' + deviceSn + '/authorizations')).then(function (resp) {
+                tbody.innerHTML = '';
+                (resp.data || []).forEach(function (row) {
+                    var tr = document.createElement('tr');
+                    tr.className = 'el-table__row';
+                    [row.id, row.authType, row.installerPhone, row.createdAt].forEach(function (value) {
+                        var td = document.createElement('td');
+                        td.textContent = value;
+                        tr.appendChild(td);
+                    });
+                    tbody.appendChild(tr);
+                });
+            });
+        }
+
+        tabs[1].addEventListener('click', function () {
+            tabs[0].classList.remove('is-active');
+            tabs[1].classList.add('is-active');
+            app.querySelector('.basic').style.display = 'none';
+            authPane.style.display = '';
+            loadAuthorizations();
+        });
+
+        var dialog = buildDialog(deviceSn, loadAuthorizations);
+        authPane.querySelector('button').addEventListener('click', dialog.open);
+    }
+
+    function buildDialog(deviceSn, onCreated) {
+        var old = document.querySelector('.el-dialog__wrapper');
+        if (old) old.remove();
+        document.querySelectorAll('.el-select-dropdown').forEach(function (el) { el.remove(); });
+
+        var wrapper = document.createElement('div');
+        wrapper.className = 'el-dialog__wrapper';
+        wrapper.style.display = 'none';
+        wrapper.innerHTML =
+            '<div class="el-dialog" role="dialog"><div class="el-dialog__header"><span class="el-dialog__title">新增授权</span></div>' +
+            '<div class="el-dialog__body"><form class="el-form"></form></div>' +
+            '<div class="el-dialog__footer"><button class="el-button" type="button"><span>取 消</span></button>' +
+            '<button class="el-button el-button--primary" type="button"><span>确 定</span></button></div></div>';
+        document.body.appendChild(wrapper);
+        var form = wrapper.querySelector('form');
+
+        var fields = [
+            {prop: 'authType', label: '授权类型', select: createSelect('请选择', false)},
+            {prop: 'roleType', label: '被授权人角色', select: createSelect('请选择', false)},
+            {prop: 'installerPhone', label: '安装师傅', select: createSelect('请选择安装师傅', true, true)},
+            {prop: 'duration', label: '授权时长', select: createSelect('请选择', false)}
+        ];
+        fields.forEach(function (field) {
+            var item = document.createElement('div');
+            item.className = 'el-form-item is-required';
+            item.innerHTML = '<label class="el-form-item__label"></label><div class="el-form-item__content"></div>';
+            item.firstChild.textContent = field.label;
+            item.lastChild.appendChild(field.select.root);
+            form.appendChild(item);
+            field.item = item;
+            if (OPTIONS[field.prop]) field.select.setOptions(OPTIONS[field.prop]);
+        });
+
+        // 选择“安装师傅”角色后才异步加载安装师傅列表
+        var installerSelect = fields[2].select;
+        fields[1].select.onChange = function (value) {
+            installerSelect.reset();
+            installerSelect.setOptions([]);
+            if (value !== 2) return;
+            api('GET', '/api/installers').then(function (resp) {
+                installerSelect.setOptions((resp.data || []).map(function (label) {
+                    var phone = (label.match(/\((\d+)\)/) || [])[1] || label;
+                    return [label, phone];
+                }));
+            });
+        };
+
+        function clearErrors() {
+            wrapper.querySelectorAll('.el-form-item__error').forEach(function (el) { el.remove(); });
+        }
+
+        function validate() {
+            clearErrors();
+            var valid = true;
+            fields.forEach(function (field) {
+                if (field.select.value === null || field.select.value === undefined) {
+                    valid = false;
+                    var error = document.createElement('div');
+                    error.className = 'el-form-item__error';
+                    error.textContent = '请选择' + field.label;
+                    field.item.lastChild.appendChild(error);
+                }
+            });
+            return valid;
+        }
+
+        function close() {
+            if (openSelect) openSelect.close();
+            transition(wrapper, 'dialog-fade', false);
+        }
+
+        // 模拟 el-form 组件实例（form.__vue__）中脚本会用到的部分
+        form.__vue__ = {
+            get model() {
+                var model = {};
+                fields.forEach(function (field) { model[field.prop] = field.select.value; });
+                return model;
+            },
+            fields: fields.map(function (field) { return {prop: field.prop, label: field.label, $el: field.item}; }),
+            validate: function (callback) { callback(validate()); }
+        };
+
+        var footerButtons = wrapper.querySelectorAll('.el-dialog__footer button');
+        footerButtons[0].addEventListener('click', close);
+        footerButtons[1].addEventListener('click', function () {
+            if (!validate()) return;
+            var payload = {deviceSn: deviceSn};
+            fields.forEach(function (field) { payload[field.prop] = field.select.value; });
+            api('POST', '/api/device/authorization/add', payload).then(function (resp) {
+                if (resp.code === 200) {
+                    close();
+                    message(resp.msg, 'success');
+                    onCreated();
+                } else {
+                    message(resp.msg, 'error');
+                }
+            });
+        });
+
+        return {
+            open: function () {
+                clearErrors();
+                fields.forEach(function (field) { field.select.reset(); });
+                installerSelect.setOptions([]);
+                transition(wrapper, 'dialog-fade', true);
+            }
+        };
+    }
+
+    // ---------- hash 路由 ----------
+    function route() {
+        var hash = location.hash.slice(1) || '/';
+        var token = localStorage.getItem('token');
+        if (hash.indexOf('/login') === 0) {
+            renderLogin();
+            return;
+        }
+        if (!token) {
+            location.hash = '#/login?redirect=' + encodeURIComponent(hash);
+            return;
+        }
+        var match = hash.match(/^\/deviceList\/detail\/doorLockDetail\/([^/?]+)/);
+        if (match) {
+            renderDetail(decodeURIComponent(match[1]));
+        } else {
+            app.innerHTML = '<div class="page">设备列表</div>';
+        }
+    }
+
+    window.addEventListener('hashchange', route);
+    route();
+})();
+</script>
+</body>
+</html>
+"""
+APP_HTML = (APP_HTML
+            .replace("__AUTH_TYPES__", json.dumps(AUTH_TYPES, ensure_ascii=False))
+            .replace("__ROLES__", json.dumps(ROLES, ensure_ascii=False))
+            .replace("__DURATIONS__", json.dumps(DURATIONS, ensure_ascii=False)))
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="凯迪仕DMS系统 - 本地模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency-ms", type=int, default=0, help="每个接口的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=int, default=0, help="额外随机延迟上限（毫秒）")
+    parser.add_argument("--installers", type=int, default=2000, help="安装师傅列表长度")
+    parser.add_argument("--captcha", choices=["strict", "any"], default="strict",
+                        help="strict 校验验证码；any 接受任意验证码")
+    args = parser.parse_args()
+
+    server = MockDmsServer(host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           installer_count=args.installers, captcha_mode=args.captcha)
+    print(f"✅ 模拟服务已启动: {server.base_url}")
+    print(f"   使用方式: DMS_BASE_URL={server.base_url} python create_pwd_repeat-optimize.py")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print("\n✅ 模拟服务已停止")
+
+
+if __name__ == "__main__":
+    main()
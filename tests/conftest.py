@@ -0,0 +1,24 @@
+"""测试公共夹具：加载 create_pwd_repeat-optimize.py（文件名含连字符，不能直接 import）"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "create_pwd_repeat-optimize.py")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def automation():
+    """自动化脚本模块；脚本在导入时加载 selenium / ddddocr / urllib3，缺少依赖时跳过"""
+    for dependency in ("selenium", "ddddocr", "urllib3"):
+        pytest.importorskip(dependency)
+    spec = importlib.util.spec_from_file_location("kaadas_automation", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,107 @@
+"""parse_api_result 与 DmsApiClient（对接本地模拟服务）的单元测试"""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def mock_dms(automation):
+    from mock_dms_server import MockDmsServer
+
+    server = MockDmsServer(installer_count=10, captcha_mode="any").start()
+    yield server
+    server.stop()
+
+
+def login(server):
+    token, _ = server.state.login(server.state.username, server.state.password, "0000", None)
+    return token
+
+
+def make_client(automation, server, token):
+    config = dict(automation.DMS_API_CONFIG, base_url=server.base_url,
+                  create_path="/api/device/authorization/add")
+    return automation.DmsApiClient(token, config=config, pool_size=2, timeout=5)
+
+
+@pytest.mark.parametrize("status, body, success, code, message", [
+    (200, '{"code": 200, "msg": "新增授权成功"}', True, 200, "新增授权成功"),
+    (200, '{"code": 0, "message": "ok"}', True, 0, "ok"),
+    (200, '{"success": true, "code": 10001}', True, 10001, "HTTP 200"),
+    (200, '{"code": 400, "msg": "缺少参数"}', False, 400, "缺少参数"),
+    (401, '{"code": 401, "msg": "登录已过期"}', False, 401, "登录已过期"),
+    (502, '<html>Bad Gateway</html>', False, 502, "HTTP 502"),
+    (200, '["not", "an", "object"]', False, 200, "HTTP 200"),
+    (204, '', False, 204, "HTTP 204"),
+])
+def test_parse_api_result(automation, status, body, success, code, message):
+    assert automation.parse_api_result(status, body, [0, 200]) == (success, code, message)
+
+
+def test_create_authorization_posts_mapped_payload(automation, mock_dms):
+    client = make_client(automation, mock_dms, login(mock_dms))
+
+    result = client.create_authorization("SN1")
+
+    assert result['success'] is True
+    assert result['message'] == "新增授权成功"
+    record = mock_dms.state.list_authorizations("SN1")[0]
+    assert (record['authType'], record['roleType'], record['installerPhone'], record['duration']) == \
+           (1, 2, "18566227407", 1)
+
+
+def test_create_authorization_reports_expired_token(automation, mock_dms):
+    client = make_client(automation, mock_dms, "expired-token")
+
+    result = client.create_authorization("SN1")
+
+    assert result['success'] is False
+    assert "登录已过期" in result['message']
+    assert client.token_rejected(result)
+    assert mock_dms.state.list_authorizations("SN1") == []
+
+
+def test_create_authorizations_keeps_input_order(automation, mock_dms):
+    client = make_client(automation, mock_dms, login(mock_dms))
+    device_sns = [f"SN{i}" for i in range(6)]
+
+    results = client.create_authorizations(device_sns, concurrency=3)
+
+    assert [result['device_sn'] for result in results] == device_sns
+    assert all(result['success'] for result in results)
+    assert mock_dms.state.stats['authorizations'] == 6
+
+
+def test_from_session_finds_wrapped_token(automation):
+    session = {
+        'local_storage': {'Admin-Token': json.dumps({'value': "abc"})},
+        'cookies': [{'name': "JSESSIONID", 'value': "s1"}],
+    }
+
+    client = automation.DmsApiClient.from_session(session)
+
+    assert client.headers['Authorization'] == "abc"
+    assert client.headers['Cookie'] == "JSESSIONID=s1"
+    assert automation.DmsApiClient.from_session({'cookies': []}) is None
+
+
+def test_run_api_batch_logs_in_again_when_saved_token_is_rejected(automation, mock_dms, tmp_path, monkeypatch):
+    monkeypatch.setattr(automation, "BASE_DIR", str(tmp_path))
+    monkeypatch.setitem(automation.DMS_API_CONFIG, 'base_url', mock_dms.base_url)
+    monkeypatch.setitem(automation.DMS_API_CONFIG, 'create_path', "/api/device/authorization/add")
+    automation.SessionStore().save({'local_storage': {'token': "expired-token"}, 'cookies': []})
+    logins = []
+
+    def browser_session(username, password, headless=True):
+        logins.append(username)
+        assert automation.SessionStore().load() is None
+        return {'local_storage': {'token': login(mock_dms)}, 'cookies': []}
+
+    monkeypatch.setattr(automation, "browser_session", browser_session)
+
+    results = automation.run_api_batch(["SN1", "SN2"], "user", "pass", concurrency=2)
+
+    assert logins == ["user"]
+    assert [result['success'] for result in results] == [True, True]
+    assert mock_dms.state.stats['authorizations'] == 2
@@ -0,0 +1,49 @@
+"""CaptchaOCR.decode_probability 的单元测试"""
+
+import importlib.util
+import os
+
+import pytest
+
+# 脚本在导入时加载 selenium / ddddocr / urllib3
+for dependency in ("selenium", "ddddocr", "urllib3"):
+    pytest.importorskip(dependency)
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "create_pwd_repeat-optimize.py")
+
+
+def load_automation_module():
+    spec = importlib.util.spec_from_file_location("kaadas_automation", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+CHARSETS = ["", "a", "b", "7"]
+
+
+def frame(index, p=0.9):
+    """一帧概率：index 列为 p，其余平分剩余概率"""
+    rest = (1 - p) / (len(CHARSETS) - 1)
+    return [p if i == index else rest for i in range(len(CHARSETS))]
+
+
+def test_repeated_frames_are_merged_and_blanks_dropped():
+    decode = load_automation_module().CaptchaOCR.decode_probability
+    probability = [frame(0), frame(1), frame(1), frame(1), frame(0), frame(2), frame(2, 0.6),
+                   frame(0), frame(0), frame(3), frame(3)]
+
+    code, confidence = decode(probability, CHARSETS)
+
+    assert code == "ab7"
+    assert confidence == pytest.approx(0.9)
+
+
+def test_blank_separates_genuine_double_characters():
+    decode = load_automation_module().CaptchaOCR.decode_probability
+    probability = [frame(1, 0.8), frame(1), frame(0), frame(1, 0.7), frame(0), frame(3)]
+
+    code, confidence = decode(probability, CHARSETS)
+
+    assert code == "aa7"
+    assert confidence == pytest.approx(0.7)
@@ -0,0 +1,72 @@
+"""InstallerDirectory 的单元测试"""
+
+import pytest
+
+
+class FakeDriver:
+    """只实现 execute_async_script，返回预设的 JS_READ_OPTIONS 结果"""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def execute_async_script(self, script, *args):
+        self.calls += 1
+        return self.result
+
+
+OPTIONS = [["尹传清(18566227407)", 101], ["张三（13800000000）", 102], ["张三(13900000000)", 103],
+           ["李四", 104]]
+
+
+@pytest.mark.parametrize("label, expected", [
+    ("尹传清(18566227407)", ("尹传清", "18566227407")),
+    (" 张三 （ 13800000000 ） ", ("张三", "13800000000")),
+    ("李四", ("李四", None)),
+    ("王五(经理)", ("王五(经理)", None)),
+])
+def test_parse(automation, label, expected):
+    assert automation.InstallerDirectory.parse(label) == expected
+
+
+def test_find_by_phone_label_and_unique_name(automation):
+    directory = automation.InstallerDirectory()
+    assert directory.load(FakeDriver({'source': 'vue', 'options': OPTIONS}), None) == 4
+
+    assert directory.find("某某(13800000000)")['value'] == 102
+    assert directory.find("张三(13900000000)")['value'] == 103
+    assert directory.find("李四")['value'] == 104
+    assert directory.find("张三") is None
+    assert directory.find("赵六") is None
+
+
+def test_find_returns_none_when_stale_or_invalidated(automation):
+    directory = automation.InstallerDirectory(ttl=60)
+    assert directory.find("李四") is None
+
+    directory.load(FakeDriver({'source': 'vue', 'options': OPTIONS}), None)
+    directory.invalidate()
+    assert directory.find("李四") is None
+
+    directory.load(FakeDriver({'source': 'vue', 'options': OPTIONS}), None)
+    directory.loaded_at -= 61
+    assert directory.find("李四") is None
+
+
+@pytest.mark.parametrize("source", [None, 'remote'])
+def test_unreadable_select_disables_directory_for_the_session(automation, source):
+    directory = automation.InstallerDirectory()
+
+    assert directory.load(FakeDriver({'source': source, 'options': []}), None) == 0
+    assert directory.available() is False
+    assert directory.find("李四") is None
+
+
+def test_empty_options_disable_directory_until_ttl(automation):
+    directory = automation.InstallerDirectory(ttl=60)
+
+    directory.load(FakeDriver({'source': 'vue', 'options': []}), None)
+
+    assert directory.available() is False
+    directory.unavailable_until -= 61
+    assert directory.available() is True
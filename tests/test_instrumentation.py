@@ -0,0 +1,61 @@
+"""Instrumentation.to_prometheus 的单元测试"""
+
+import pytest
+
+
+def record(name, duration, commands=0, retries=0, ok=True):
+    return {'name': name, 'duration': duration, 'commands': commands, 'retries': retries, 'ok': ok}
+
+
+@pytest.fixture
+def metrics(automation, tmp_path):
+    instrumentation = automation.Instrumentation(run_id="run-1", output_dir=str(tmp_path))
+    instrumentation.spans = [
+        record("login", 0.3, commands=5, retries=1),
+        record("login", 2.0, commands=3, ok=False),
+        record('select "installer"', 0.04, commands=2),
+    ]
+    return instrumentation.to_prometheus().splitlines()
+
+
+def test_histogram_buckets_are_cumulative(metrics):
+    label = 'step="login",run_id="run-1"'
+    assert f'kaadas_step_duration_seconds_bucket{{{label},le="0.25"}} 0' in metrics
+    assert f'kaadas_step_duration_seconds_bucket{{{label},le="0.5"}} 1' in metrics
+    assert f'kaadas_step_duration_seconds_bucket{{{label},le="2.5"}} 2' in metrics
+    assert f'kaadas_step_duration_seconds_bucket{{{label},le="+Inf"}} 2' in metrics
+    assert f'kaadas_step_duration_seconds_sum{{{label}}} 2.3000' in metrics
+    assert f'kaadas_step_duration_seconds_count{{{label}}} 2' in metrics
+
+
+def test_counters_are_summed_per_step(metrics):
+    label = 'step="login",run_id="run-1"'
+    assert f'kaadas_step_webdriver_commands_total{{{label}}} 8' in metrics
+    assert f'kaadas_step_retries_total{{{label}}} 1' in metrics
+    assert f'kaadas_step_errors_total{{{label}}} 1' in metrics
+
+
+def test_label_values_are_escaped(metrics):
+    assert 'kaadas_step_errors_total{step="select \\"installer\\"",run_id="run-1"} 0' in metrics
+
+
+def test_every_metric_has_help_and_type(metrics):
+    for metric in ("kaadas_step_duration_seconds", "kaadas_step_webdriver_commands_total",
+                   "kaadas_step_retries_total", "kaadas_step_errors_total"):
+        assert any(line.startswith(f"# HELP {metric} ") for line in metrics)
+        assert any(line.startswith(f"# TYPE {metric} ") for line in metrics)
+
+
+def test_spans_record_nesting_and_errors(automation, tmp_path):
+    instrumentation = automation.Instrumentation(run_id="run-2", output_dir=str(tmp_path))
+    with pytest.raises(RuntimeError):
+        with instrumentation.span("outer"):
+            instrumentation.count_command()
+            with instrumentation.span("inner"):
+                instrumentation.count_command()
+                instrumentation.retry()
+            raise RuntimeError("boom")
+
+    inner, outer = instrumentation.spans
+    assert (inner['parent'], inner['depth'], inner['commands'], inner['retries']) == ("outer", 1, 1, 1)
+    assert (outer['commands'], outer['ok'], outer['error']) == (2, False, "boom")
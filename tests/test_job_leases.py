@@ -0,0 +1,85 @@
+"""JobQueue 租约与任务协调服务的单元测试"""
+
+import time
+
+import pytest
+
+
+def make_job(device_sn):
+    return {'device_sn': device_sn, 'installer': "尹传清(18566227407)", 'auth_type': "密码", 'role': "安装师傅",
+            'duration': "一个月"}
+
+
+@pytest.fixture
+def queue(automation, tmp_path):
+    job_queue = automation.JobQueue(str(tmp_path / "jobs.db"), commit_every=1, max_attempts=2)
+    job_queue.add([make_job("SN1")])
+    yield job_queue
+    job_queue.close()
+
+
+def expire(queue):
+    queue.conn.execute("UPDATE jobs SET lease_expires = ? WHERE status = 'running'", (time.time() - 1,))
+
+
+def test_expired_lease_is_reassigned(queue):
+    job = queue.claim(limit=1, worker="w1", lease_seconds=60)[0]
+    assert queue.claim(limit=1, worker="w2", lease_seconds=60) == []
+
+    expire(queue)
+    reassigned = queue.claim(limit=1, worker="w2", lease_seconds=60)
+
+    assert [item['id'] for item in reassigned] == [job['id']]
+    assert queue.owns(job['id'], "w2") and not queue.owns(job['id'], "w1")
+
+
+def test_heartbeat_renews_only_held_jobs(queue):
+    job = queue.claim(limit=1, worker="w1", lease_seconds=60)[0]
+
+    assert queue.heartbeat("w1", [job['id']], 60) == [job['id']]
+    assert queue.heartbeat("w2", [job['id']], 60) == []
+
+
+def test_late_result_from_previous_holder_is_rejected(queue):
+    job = queue.claim(limit=1, worker="w1", lease_seconds=60)[0]
+    expire(queue)
+    queue.claim(limit=1, worker="w2", lease_seconds=60)
+
+    assert queue.complete(job['id'], False, "超时", worker="w1") is False
+    assert queue.complete(job['id'], True, worker="w2") is True
+    assert queue.summary() == {'done': 1}
+
+
+def test_expired_lease_without_attempts_left_is_failed(queue):
+    queue.claim(limit=1, worker="w1", lease_seconds=60)
+    expire(queue)
+    queue.claim(limit=1, worker="w2", lease_seconds=60)
+    expire(queue)
+
+    assert queue.claim(limit=1, worker="w3", lease_seconds=60) == []
+    assert queue.summary() == {'failed': 1}
+    assert queue.recover() == 0
+
+
+def test_coordinator_requires_token_off_loopback(automation, queue):
+    with pytest.raises(ValueError):
+        automation.Coordinator(queue, host="0.0.0.0", port=0)
+
+
+def test_coordinator_rejects_lost_lease_over_http(automation, queue):
+    coordinator = automation.Coordinator(queue, port=0, token="secret").start()
+    try:
+        first = automation.CoordinatorClient(coordinator.url, "w1", token="secret")
+        second = automation.CoordinatorClient(coordinator.url, "w2", token="secret")
+        job = first.lease()['jobs'][0]
+        expire(queue)
+        assert second.lease()['jobs'][0]['id'] == job['id']
+
+        assert first.complete(job, True, "", 1.0) == {'ok': False, 'error': "lease lost"}
+        assert second.complete(job, True, "", 1.0) == {'ok': True}
+        assert [result['worker'] for result in coordinator.results] == ["w2"]
+
+        with pytest.raises(RuntimeError, match="401"):
+            automation.CoordinatorClient(coordinator.url, "w3").lease()
+    finally:
+        coordinator.stop()
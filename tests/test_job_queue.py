@@ -0,0 +1,111 @@
+"""JobQueue 的结果提交与恢复、load_jobs 的单元测试"""
+
+import json
+import sqlite3
+
+import pytest
+
+
+def make_job(device_sn, installer="尹传清(18566227407)"):
+    return {'device_sn': device_sn, 'installer': installer, 'auth_type': "密码", 'role': "安装师傅",
+            'duration': "一个月"}
+
+
+@pytest.fixture
+def queue(automation, tmp_path):
+    job_queue = automation.JobQueue(str(tmp_path / "jobs.db"), commit_every=3, commit_interval=3600)
+    yield job_queue
+    job_queue.close()
+
+
+def on_disk(queue):
+    """从另一个连接读取已提交的状态（任务ID -> 状态）"""
+    conn = sqlite3.connect(queue.path)
+    try:
+        return dict(conn.execute("SELECT id, status FROM jobs"))
+    finally:
+        conn.close()
+
+
+def test_failures_are_committed_in_batches(queue):
+    queue.add([make_job(f"SN{i}") for i in range(3)])
+    jobs = queue.claim(limit=3)
+
+    queue.complete(jobs[0]['id'], False, "超时")
+    queue.complete(jobs[1]['id'], False, "超时")
+    assert set(on_disk(queue).values()) == {'running'}
+
+    queue.complete(jobs[2]['id'], False, "超时")
+    assert set(on_disk(queue).values()) == {'failed'}
+
+
+def test_success_is_committed_immediately(queue):
+    queue.add([make_job("SN1"), make_job("SN2")])
+    first, second = queue.claim(limit=2)
+
+    queue.complete(first['id'], False, "超时")
+    queue.complete(second['id'], True)
+
+    assert on_disk(queue) == {first['id']: 'failed', second['id']: 'done'}
+
+
+def test_recover_requeues_interrupted_and_retryable_jobs(automation, tmp_path):
+    job_queue = automation.JobQueue(str(tmp_path / "jobs.db"), commit_every=1, max_attempts=2)
+    job_queue.add([make_job("RUNNING"), make_job("FAILED"), make_job("EXHAUSTED"), make_job("DONE")])
+    jobs = {job['device_sn']: job for job in job_queue.claim(limit=4)}
+    job_queue.complete(jobs["FAILED"]['id'], False, "超时")
+    job_queue.complete(jobs["EXHAUSTED"]['id'], False, "超时")
+    job_queue.complete(jobs["DONE"]['id'], True)
+    job_queue.conn.execute("UPDATE jobs SET attempts = 2 WHERE device_sn = 'EXHAUSTED'")
+
+    assert job_queue.recover() == 2
+    assert job_queue.summary() == {'pending': 2, 'failed': 1, 'done': 1}
+    job_queue.close()
+
+
+def test_add_skips_duplicates_within_a_batch(queue, capsys):
+    assert queue.add([make_job("SN1"), make_job("SN1"), make_job("SN2")]) == 2
+    job = queue.claim(limit=1)[0]
+    queue.complete(job['id'], True)
+
+    assert queue.add([make_job("SN1"), make_job("SN2")]) == 0
+    assert "已授权成功" in capsys.readouterr().out
+    assert queue.add([make_job("SN1")], batch="2026-10-18") == 1
+
+
+def test_load_jobs_reads_csv_with_aliases_and_defaults(automation, tmp_path):
+    path = tmp_path / "jobs.csv"
+    path.write_text("设备序列号,安装师傅\nSN1,张三(13800000000)\nSN2,\n,李四\n", encoding='utf-8')
+
+    jobs = automation.load_jobs(str(path))
+
+    assert [job['device_sn'] for job in jobs] == ["SN1", "SN2"]
+    assert jobs[0]['installer'] == "张三(13800000000)"
+    assert jobs[1]['installer'] == automation.AUTH_DEFAULTS['installer']
+
+
+def test_load_jobs_reads_json_and_json_lines(automation, tmp_path):
+    records = [{'device_sn': "SN1"}, {'device_sn': "SN2", 'duration': "一周"}]
+    json_path = tmp_path / "jobs.json"
+    json_path.write_text(json.dumps(records), encoding='utf-8')
+    jsonl_path = tmp_path / "jobs.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(record) for record in records) + "\n\n", encoding='utf-8')
+
+    assert automation.load_jobs(str(json_path)) == automation.load_jobs(str(jsonl_path))
+    assert automation.load_jobs(str(json_path))[1]['duration'] == "一周"
+
+
+def test_load_jobs_names_the_bad_record(automation, tmp_path):
+    json_path = tmp_path / "jobs.json"
+    json_path.write_text('[{"device_sn": "SN1"}, "SN2"]', encoding='utf-8')
+    jsonl_path = tmp_path / "jobs.jsonl"
+    jsonl_path.write_text('{"device_sn": "SN1"}\n\n["SN2"]\n', encoding='utf-8')
+    object_path = tmp_path / "object.json"
+    object_path.write_text('{"device_sn": "SN1"}', encoding='utf-8')
+
+    with pytest.raises(ValueError, match="下标 1"):
+        automation.load_jobs(str(json_path))
+    with pytest.raises(ValueError, match="第 3 行"):
+        automation.load_jobs(str(jsonl_path))
+    with pytest.raises(ValueError, match="对象数组"):
+        automation.load_jobs(str(object_path))
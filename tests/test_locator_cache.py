@@ -0,0 +1,58 @@
+"""LocatorCache 的单元测试"""
+
+import json
+
+LOCATORS = ["//button[text()='新增']", "//button[contains(.,'新增')]", "//span[text()='新增']/.."]
+
+
+def test_record_persists_and_is_shared(automation, tmp_path):
+    path = str(tmp_path / "locator_cache.json")
+    cache = automation.LocatorCache(path)
+    assert cache.lookup("新增按钮", LOCATORS) is None
+
+    cache.record("新增按钮", LOCATORS, 1)
+
+    assert cache.lookup("新增按钮", LOCATORS) == 1
+    assert automation.LocatorCache(path).lookup("新增按钮", LOCATORS) == 1
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)["新增按钮"]['locator'] == LOCATORS[1]
+
+
+def test_lookup_ignores_entries_for_a_changed_chain(automation, tmp_path):
+    cache = automation.LocatorCache(str(tmp_path / "locator_cache.json"))
+    cache.record("新增按钮", LOCATORS, 2)
+
+    assert cache.lookup("新增按钮", LOCATORS[:2]) is None
+
+
+def test_evict_removes_entry_from_disk(automation, tmp_path):
+    path = str(tmp_path / "locator_cache.json")
+    cache = automation.LocatorCache(path)
+    cache.record("新增按钮", LOCATORS, 1)
+    cache.record("确定按钮", LOCATORS, 0)
+
+    cache.evict("新增按钮")
+
+    reloaded = automation.LocatorCache(path)
+    assert reloaded.lookup("新增按钮", LOCATORS) is None
+    assert reloaded.lookup("确定按钮", LOCATORS) == 0
+
+
+def test_save_merges_changes_from_other_processes(automation, tmp_path):
+    path = str(tmp_path / "locator_cache.json")
+    first = automation.LocatorCache(path)
+    second = automation.LocatorCache(path)
+
+    first.record("新增按钮", LOCATORS, 1)
+    second.record("确定按钮", LOCATORS, 2)
+
+    reloaded = automation.LocatorCache(path)
+    assert reloaded.lookup("新增按钮", LOCATORS) == 1
+    assert reloaded.lookup("确定按钮", LOCATORS) == 2
+
+
+def test_corrupt_file_starts_empty(automation, tmp_path):
+    path = tmp_path / "locator_cache.json"
+    path.write_text("{not json", encoding='utf-8')
+
+    assert automation.LocatorCache(str(path)).entries == {}